@@ -0,0 +1,24 @@
+"""Baseline: the schema created by Base.metadata.create_all at startup
+
+Tables have always been created by main.py's lifespan (create_all), which
+does not touch tables that already exist. This empty revision marks that
+starting point, so `alembic upgrade head` works on existing databases and
+on freshly created ones alike.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+"""
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    pass
+
+
+def downgrade():
+    pass
@@ -0,0 +1,41 @@
+"""Indexes for hot query shapes
+
+Orders by customer/status/time, order items by order and by menu item,
+reservations by slot and by phone, menu items by category. Fresh databases
+already get these from create_all, hence IF NOT EXISTS. On PostgreSQL the
+indexes are built CONCURRENTLY so order writes are not blocked.
+
+Revision ID: 0002_hot_query_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002_hot_query_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_orders_customer_id_created_at", "orders", ["customer_id", "created_at", "id"]),
+    ("ix_orders_status_created_at", "orders", ["status", "created_at"]),
+    ("ix_orders_created_at", "orders", ["created_at"]),
+    ("ix_order_items_order_id_menu_item_id", "order_items", ["order_id", "menu_item_id"]),
+    ("ix_order_items_menu_item_id", "order_items", ["menu_item_id"]),
+    ("ix_reservations_date_time_status", "reservations", ["date", "time", "status"]),
+    ("ix_reservations_phone_created_at", "reservations", ["phone", "created_at"]),
+    ("ix_menu_items_category_id_is_available", "menu_items", ["category_id", "is_available"]),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
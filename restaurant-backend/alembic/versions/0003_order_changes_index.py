@@ -0,0 +1,33 @@
+"""Index orders by updated_at for the delta sync endpoint
+
+Orders now get updated_at on insert as well as on update. Rows written
+before that have NULL, so they are backfilled from created_at first.
+
+Revision ID: 0003_order_changes_index
+Revises: 0002_hot_query_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003_order_changes_index"
+down_revision = "0002_hot_query_indexes"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_orders_updated_at_id", "orders", ["updated_at", "id"]),
+]
+
+
+def upgrade():
+    op.execute("UPDATE orders SET updated_at = created_at WHERE updated_at IS NULL")
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,29 @@
+"""Index reservations for the paginated admin list
+
+Revision ID: 0004_reservation_listing_index
+Revises: 0003_order_changes_index
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0004_reservation_listing_index"
+down_revision = "0003_order_changes_index"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_reservations_date_time_id", "reservations", ["date", "time", "id"]),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
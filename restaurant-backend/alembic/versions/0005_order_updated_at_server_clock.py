@@ -0,0 +1,29 @@
+"""Stamp orders.updated_at with the database clock
+
+App servers with skewed clocks wrote updated_at out of commit order, which
+let /orders/changes skip rows. The column now defaults to now() on insert;
+updates set it through the ORM.
+
+Revision ID: 0005_order_updated_at_server_clock
+Revises: 0004_reservation_listing_index
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+from app.models import db_now
+
+revision = "0005_order_updated_at_server_clock"
+down_revision = "0004_reservation_listing_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite cannot alter a column default in place; batch mode copies the table there
+    with op.batch_alter_table("orders") as batch:
+        batch.alter_column("updated_at", server_default=db_now())
+
+
+def downgrade():
+    with op.batch_alter_table("orders") as batch:
+        batch.alter_column("updated_at", server_default=None)
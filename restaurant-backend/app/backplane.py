@@ -0,0 +1,239 @@
+# app/backplane.py
+"""
+Pub/sub backplane that carries WebSocket broadcasts between worker processes.
+
+Each worker's ConnectionManager publishes broadcast events to the backplane
+and delivers every event it receives to its own sockets. An event is a
+small dict: its kind ("role", "order" or "all"), the routing fields, and the
+message already serialized for the sockets, so no worker encodes it again.
+
+InMemoryBackplane only reaches the current process (single worker, tests).
+PostgresBackplane fans events out with LISTEN/NOTIFY on the application
+database. Events are delivered locally first and echoes of this worker's own
+notifications are skipped, so a database outage only cuts off other workers.
+NOTIFYs are sent by a background task from a bounded queue, so publishing
+never waits on the database; when the queue is full the event is dropped for
+other workers and counted.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Any, Awaitable, Callable, List, Optional
+
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], None]
+
+# NOTIFY payloads must stay under 8000 bytes
+MAX_NOTIFY_BYTES = 7900
+# Pause before reconnecting a dropped LISTEN connection
+RECONNECT_DELAY_SECONDS = 1.0
+
+
+class InMemoryBackplane:
+    """Delivers events to the handlers of this process only."""
+
+    def __init__(self):
+        self.handlers: List[Handler] = []
+        self.published = 0
+
+    def subscribe(self, handler: Handler):
+        self.handlers.append(handler)
+
+    def deliver(self, event: dict):
+        for handler in self.handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"❌ Backplane handler failed: {str(e)}")
+
+    async def publish(self, event: dict):
+        self.published += 1
+        self.deliver(event)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "published": self.published}
+
+
+def postgres_dsn(url: str) -> str:
+    """libpq DSN for a SQLAlchemy URL (drops the +driver suffix)."""
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+async def psycopg_connect(dsn: str):
+    import psycopg
+
+    return await psycopg.AsyncConnection.connect(dsn, autocommit=True)
+
+
+class PostgresBackplane(InMemoryBackplane):
+    """
+    Fans events out to every worker with LISTEN/NOTIFY.
+
+    connect(dsn) must return an autocommit async connection with execute()
+    and notifies(), like psycopg.AsyncConnection; tests pass a fake.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: Optional[str] = None,
+        connect: Callable[[str], Awaitable[Any]] = psycopg_connect,
+        queue_size: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+    ):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel or settings.WS_BACKPLANE_CHANNEL
+        self.connect = connect
+        self.connect_timeout = (
+            settings.WS_BACKPLANE_CONNECT_TIMEOUT_SECONDS if connect_timeout is None else connect_timeout
+        )
+        # Identifies this worker's own notifications when they come back
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._publisher = None
+        # NOTIFY payloads waiting for the sender task
+        self._outbox: asyncio.Queue = asyncio.Queue(
+            maxsize=settings.WS_BACKPLANE_QUEUE_SIZE if queue_size is None else queue_size
+        )
+        self._sender: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._listening = asyncio.Event()
+        self.received = 0
+        self.publish_errors = 0
+        self.dropped = 0
+
+    async def publish(self, event: dict):
+        """Deliver locally and queue the NOTIFY for other workers; never waits on the database."""
+        self.published += 1
+        self.deliver(event)
+        payload = json.dumps({"origin": self.origin, "event": event}, separators=(",", ":"))
+        if len(payload.encode()) > MAX_NOTIFY_BYTES:
+            self.publish_errors += 1
+            logger.error(f"❌ Backplane event too large for NOTIFY ({len(payload)} bytes); delivered locally only")
+            return
+        try:
+            self._outbox.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"⚠️ Backplane queue full, event delivered locally only ({self.dropped} dropped)")
+
+    async def _connect(self):
+        return await asyncio.wait_for(self.connect(self.dsn), timeout=self.connect_timeout)
+
+    async def _send(self):
+        while True:
+            payload = await self._outbox.get()
+            try:
+                if self._publisher is None:
+                    self._publisher = await self._connect()
+                await asyncio.wait_for(
+                    self._publisher.execute("SELECT pg_notify(%s, %s)", (self.channel, payload)),
+                    timeout=self.connect_timeout,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.publish_errors += 1
+                logger.error(f"❌ Backplane NOTIFY failed, delivered locally only: {str(e) or type(e).__name__}")
+                await self._close_publisher()
+
+    async def start(self):
+        """Start the NOTIFY sender and listen on the channel; returns once LISTEN is in place."""
+        if self._sender is None or self._sender.done():
+            self._sender = asyncio.create_task(self._send())
+        if self._listener is None or self._listener.done():
+            self._listening.clear()
+            self._listener = asyncio.create_task(self._listen())
+        waiter = asyncio.ensure_future(self._listening.wait())
+        # Return early if the listener dies before it gets to LISTEN (it keeps retrying)
+        await asyncio.wait({waiter, self._listener}, timeout=RECONNECT_DELAY_SECONDS * 5, return_when=asyncio.FIRST_COMPLETED)
+        waiter.cancel()
+
+    async def _listen(self):
+        while True:
+            connection = None
+            try:
+                connection = await self._connect()
+                await connection.execute(f'LISTEN "{self.channel}"')
+                self._listening.set()
+                logger.info(f"📡 Listening for WebSocket events on {self.channel!r}")
+                async for notify in connection.notifies():
+                    self._receive(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Backplane listener failed, reconnecting: {str(e)}")
+            finally:
+                self._listening.clear()
+                if connection is not None:
+                    try:
+                        await connection.close()
+                    except Exception:
+                        pass
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    def _receive(self, payload: str):
+        try:
+            envelope = json.loads(payload)
+        except ValueError:
+            logger.error(f"❌ Ignoring malformed backplane payload: {payload[:100]!r}")
+            return
+        if envelope.get("origin") == self.origin:
+            return  # Already delivered locally when published
+        self.received += 1
+        self.deliver(envelope["event"])
+
+    async def stop(self):
+        for task in (self._listener, self._sender):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._listener = self._sender = None
+        await self._close_publisher()
+
+    async def _close_publisher(self):
+        publisher, self._publisher = self._publisher, None
+        if publisher is not None:
+            try:
+                await publisher.close()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": "postgres",
+            "channel": self.channel,
+            "listening": self._listening.is_set(),
+            "published": self.published,
+            "received": self.received,
+            "publish_errors": self.publish_errors,
+            "queued": self._outbox.qsize(),
+            "dropped": self.dropped,
+        }
+
+
+def create_backplane():
+    """Backplane selected by WS_BACKPLANE."""
+    if settings.WS_BACKPLANE == "memory":
+        return InMemoryBackplane()
+    if settings.WS_BACKPLANE == "postgres":
+        if make_url(settings.DATABASE_URL).get_backend_name() != "postgresql":
+            raise ValueError("WS_BACKPLANE=postgres needs a PostgreSQL DATABASE_URL")
+        return PostgresBackplane(postgres_dsn(settings.DATABASE_URL))
+    raise ValueError(f"Unknown WS_BACKPLANE {settings.WS_BACKPLANE!r}; expected 'memory' or 'postgres'")
@@ -1,19 +1,60 @@
 # app/database.py
+from contextlib import asynccontextmanager
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
+from app.pool_metrics import instrumented_pool_class, register_pool_metrics
+
+
+def pool_options(url: str, pool_class: type, metrics) -> dict:
+    """Queue pool sizing from settings; SQLite keeps SQLAlchemy's own pool choice."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": instrumented_pool_class(pool_class, metrics),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
 
 # Create database engine
 # psycopg3 works with standard postgresql:// URLs
+sync_pool_metrics = register_pool_metrics("sync")
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    **pool_options(settings.DATABASE_URL, QueuePool, sync_pool_metrics)
 )
+sync_pool_metrics.attach(engine)
+
+# Order number blocks are reserved on a small pool of their own while the request's
+# session holds its connection; drawing a second one from the main pool could leave
+# every request waiting on every other. SQLite has no bounded pool, so it uses engine.
+sequence_engine = None
+if make_url(settings.DATABASE_URL).get_backend_name() != "sqlite":
+    sequence_engine = create_engine(
+        settings.DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=settings.ORDER_NUMBER_POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sessions behind SyncSessionAdapter: like AsyncSession, keep attributes loaded after
+# commit, since touching an expired one would lazy-load on the event loop
+AdapterSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # Base class for models
 Base = declarative_base()
@@ -26,3 +67,132 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (psycopg async / aiosqlite)."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "postgresql":
+        parsed = parsed.set(drivername="postgresql+psycopg")
+    elif parsed.get_backend_name() == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+# Async engine, only created when DB_ASYNC is enabled
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC:
+    async_pool_metrics = register_pool_metrics("async")
+    async_engine = create_async_engine(
+        async_database_url(settings.DATABASE_URL),
+        pool_pre_ping=True,
+        echo=settings.DEBUG,
+        **pool_options(settings.DATABASE_URL, AsyncAdaptedQueuePool, async_pool_metrics)
+    )
+    async_pool_metrics.attach(async_engine.sync_engine)
+    # Keep attributes loaded after commit; async sessions cannot lazy-load them again
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+class SyncSessionAdapter:
+    """
+    Exposes a sync Session through the awaitable AsyncSession API.
+
+    Each database call runs in the threadpool, so routers written against
+    AsyncSession work unchanged in sync mode without blocking the event loop.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    def get_bind(self):
+        return self.sync_session.get_bind()
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        """Call fn(session, *args, **kwargs) with the underlying sync Session."""
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def stream(self, statement, *args, **kwargs):
+        """Like AsyncSession.stream: a result whose partitions are fetched in the threadpool."""
+        result = await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+        return StreamedResult(result)
+
+
+class StreamedResult:
+    """The partitions() half of AsyncResult, for a sync Result fetched batch by batch."""
+
+    def __init__(self, result):
+        self.result = result
+
+    async def partitions(self, size=None):
+        partitions = self.result.partitions(size)
+        try:
+            while True:
+                rows = await run_in_threadpool(next, partitions, None)
+                if rows is None:
+                    return
+                yield rows
+        finally:
+            self.result.close()
+
+
+@asynccontextmanager
+async def async_session_scope():
+    """Open an AsyncSession (or adapter) outside a request, e.g. for background refreshes."""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SyncSessionAdapter(AdapterSessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+# Dependency for routers written against the AsyncSession API
+async def get_async_db():
+    async with async_session_scope() as db:
+        yield db
+
+
+def get_session_scope():
+    """Dependency for handlers that outlive a request (WebSockets): open sessions briefly with it."""
+    return async_session_scope
@@ -1,13 +1,36 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Enum, Date
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Enum, Date, Index
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from datetime import datetime
+from sqlalchemy.sql.functions import FunctionElement
+from datetime import datetime, timezone
 import enum
 
 from app.database import Base
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class db_now(FunctionElement):
+    """now() on the database clock, so every app server stamps rows alike."""
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+
+@compiles(db_now)
+def _db_now(element, compiler, **kw):
+    return compiler.process(func.now(), **kw)
+
+
+@compiles(db_now, "sqlite")
+def _db_now_sqlite(element, compiler, **kw):
+    # CURRENT_TIMESTAMP only has whole seconds; pad %f to the microseconds SQLAlchemy stores
+    return "STRFTIME('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
 class UserRole(str, enum.Enum):
     ADMIN = "admin"
     STAFF = "staff"
@@ -73,6 +96,12 @@ class MenuItem(Base):
     
     category = relationship("Category", back_populates="menu_items")
     order_items = relationship("OrderItem", back_populates="menu_item")
+    
+    # Hot-path indexes here and on the models below; existing databases get them
+    # from alembic/versions/0002_hot_query_indexes.py
+    __table_args__ = (
+        Index("ix_menu_items_category_id_is_available", "category_id", "is_available"),
+    )
 
 
 class Order(Base):
@@ -89,10 +118,47 @@ class Order(Base):
     total_amount = Column(Float, nullable=False)
     notes = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Set on insert too, by the database clock, so /orders/changes can key on it
+    updated_at = Column(DateTime(timezone=True), server_default=db_now(), onupdate=db_now())
     
     customer = relationship("User", back_populates="orders")
     order_items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # /my-orders keyset pagination and per-user profiles
+        Index("ix_orders_customer_id_created_at", "customer_id", "created_at", "id"),
+        # Admin order list filtered by status, newest first
+        Index("ix_orders_status_created_at", "status", "created_at"),
+        # Time-window analytics and the unfiltered admin list
+        Index("ix_orders_created_at", "created_at"),
+        # /orders/changes delta sync
+        Index("ix_orders_updated_at_id", "updated_at", "id"),
+    )
+    # Read back the database-stamped updated_at on flush instead of expiring it
+    __mapper_args__ = {"eager_defaults": True}
+
+
+class OrderNumberSequence(Base):
+    __tablename__ = "order_number_sequences"
+    
+    day = Column(Date, primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
+
+
+class DailySales(Base):
+    __tablename__ = "daily_sales"
+    
+    # One row per calendar day of Order.created_at, maintained by app/utils/sales_rollup.py
+    day = Column(Date, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    item_count = Column(Integer, nullable=False, default=0)
+    pending_count = Column(Integer, nullable=False, default=0)
+    confirmed_count = Column(Integer, nullable=False, default=0)
+    preparing_count = Column(Integer, nullable=False, default=0)
+    ready_count = Column(Integer, nullable=False, default=0)
+    delivered_count = Column(Integer, nullable=False, default=0)
+    cancelled_count = Column(Integer, nullable=False, default=0)
 
 
 class OrderItem(Base):
@@ -107,6 +173,13 @@ class OrderItem(Base):
     
     order = relationship("Order", back_populates="order_items")
     menu_item = relationship("MenuItem", back_populates="order_items")
+    
+    __table_args__ = (
+        # Item loading per order; also covers the co-occurrence rebuild scan
+        Index("ix_order_items_order_id_menu_item_id", "order_id", "menu_item_id"),
+        # Per-item sales aggregates
+        Index("ix_order_items_menu_item_id", "menu_item_id"),
+    )
 
 
 class Restaurant(Base):
@@ -142,6 +215,15 @@ class Reservation(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User", back_populates="reservations")
+    
+    __table_args__ = (
+        # Slot availability
+        Index("ix_reservations_date_time_status", "date", "time", "status"),
+        # Admin list keyset pagination, latest slot first
+        Index("ix_reservations_date_time_id", "date", "time", "id"),
+        # Latest reservation lookup by phone
+        Index("ix_reservations_phone_created_at", "phone", "created_at"),
+    )
 
 
 class Table(Base):
@@ -0,0 +1,173 @@
+# app/pool_metrics.py
+"""
+Connection pool instrumentation.
+
+Checkouts, checkins and new connections are counted from SQLAlchemy pool
+events. Checkout wait time has no event of its own, so QueuePool-based
+pools are swapped for a subclass that times ``_do_get`` (the part of a
+checkout that blocks when the pool is exhausted).
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (ms) of the checkout wait histogram buckets; the last bucket is +Inf
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# QueuePool._do_get retries by calling itself; only the outermost call is timed
+_in_checkout: ContextVar[bool] = ContextVar("pool_in_checkout", default=False)
+
+
+class PoolMetrics:
+    """Counters and a checkout wait histogram for one engine's pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.overflow_events = 0
+            self.timeouts = 0
+            self.invalidations = 0
+            self.wait_count = 0
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+            self._wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def observe_wait(self, seconds: float):
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total_ms += elapsed_ms
+            self.wait_max_ms = max(self.wait_max_ms, elapsed_ms)
+            self._wait_buckets[bisect_left(WAIT_BUCKETS_MS, elapsed_ms)] += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def attach(self, engine):
+        """Listen to pool events on engine (a sync Engine or AsyncEngine.sync_engine)."""
+        self.engine = engine
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            pool = engine.pool
+            with self._lock:
+                self.connects += 1
+                # A connection opened while the pool is at size is an overflow connection
+                if isinstance(pool, QueuePool) and pool.overflow() > 0:
+                    self.overflow_events += 1
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                self.checkouts += 1
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self.checkins += 1
+
+        @event.listens_for(engine, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+        return self
+
+    def histogram(self) -> List[Dict]:
+        """Cumulative wait-time buckets, Prometheus style."""
+        with self._lock:
+            counts = list(self._wait_buckets)
+        buckets = []
+        running = 0
+        for bound, count in zip(list(WAIT_BUCKETS_MS) + ["+Inf"], counts):
+            running += count
+            buckets.append({"le_ms": bound, "count": running})
+        return buckets
+
+    def snapshot(self) -> Dict:
+        # engine.dispose() swaps in a new pool, so always read the current one
+        pool = self.engine.pool if self.engine is not None else None
+        state = {"name": self.name, "pool_class": type(pool).__name__ if pool else None}
+        if isinstance(pool, QueuePool):
+            state.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout_seconds": pool.timeout(),
+            })
+        elif pool is not None:
+            state["status"] = pool.status()
+        with self._lock:
+            state.update({
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+                "invalidations": self.invalidations,
+                "wait": {
+                    "count": self.wait_count,
+                    "mean_ms": self.wait_total_ms / self.wait_count if self.wait_count else 0.0,
+                    "max_ms": self.wait_max_ms,
+                },
+            })
+        state["wait"]["histogram_ms"] = self.histogram()
+        return state
+
+
+def instrumented_pool_class(base: type, metrics: PoolMetrics) -> type:
+    """Subclass a QueuePool class so every checkout feeds metrics' wait histogram."""
+
+    class InstrumentedPool(base):
+        def _do_get(self):
+            if _in_checkout.get():
+                return super()._do_get()
+            token = _in_checkout.set(True)
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                metrics.record_timeout()
+                raise
+            finally:
+                metrics.observe_wait(time.perf_counter() - start)
+                _in_checkout.reset(token)
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    InstrumentedPool.__qualname__ = InstrumentedPool.__name__
+    return InstrumentedPool
+
+
+# One entry per engine created in app/database.py
+pool_registry: Dict[str, PoolMetrics] = {}
+
+
+def register_pool_metrics(name: str) -> PoolMetrics:
+    metrics = PoolMetrics(name)
+    pool_registry[name] = metrics
+    return metrics
+
+
+def pool_metrics_snapshot(reset: bool = False) -> Dict:
+    """Snapshot every registered pool, optionally zeroing the counters after reading them."""
+    snapshot = {name: metrics.snapshot() for name, metrics in pool_registry.items()}
+    if reset:
+        for metrics in pool_registry.values():
+            metrics.reset()
+    return snapshot
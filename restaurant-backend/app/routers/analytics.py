@@ -1,51 +1,141 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Dict, Any
-import pandas as pd
+from sqlalchemy import func, desc, select
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 
-from app.database import get_db
-from app.models import Order, OrderItem, MenuItem, User, OrderStatus
+from app.database import get_async_db, get_db, get_session_scope
+from app.models import DailySales, Order, OrderItem, MenuItem, User, UserRole, OrderStatus
+from app.utils.auth import get_admin_user
+from app.utils.cooccurrence import cooccurrence_index
+from app.utils.menu_cache import menu_cache
+from app.utils.preferences import preference_profiles, score_items
+from app.utils.sales_rollup import status_column
+from app.utils.stats_cache import stats_cache
 
 router = APIRouter(
     tags=["analytics"]
 )
 
-@router.get("/dashboard-stats")
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    total_orders = db.query(Order).count()
-    total_revenue = db.query(func.sum(Order.total_amount)).scalar() or 0.0
-    total_customers = db.query(User).filter(User.role == "customer").count()
+async def load_dashboard_stats(db: AsyncSession) -> Dict:
+    """Rollup totals and the customer count in one query."""
+    # Totals come from the daily_sales rollup: one row per day instead of every order
+    customers = select(func.count()).select_from(User).where(User.role == UserRole.CUSTOMER).scalar_subquery()
+    totals = (await db.execute(select(
+        func.sum(DailySales.order_count),
+        func.sum(DailySales.revenue),
+        customers,
+        *[func.sum(getattr(DailySales, status_column(s))) for s in OrderStatus]
+    ))).one()
     
     return {
-        "total_orders": total_orders,
-        "total_revenue": round(total_revenue, 2),
-        "total_customers": total_customers
+        "total_orders": totals[0] or 0,
+        "total_revenue": round(totals[1] or 0.0, 2),
+        "total_customers": totals[2],
+        "orders_by_status": {s.value: count or 0 for s, count in zip(OrderStatus, totals[3:])}
     }
 
-@router.get("/sales-trends")
-def get_sales_trends(days: int = 30, db: Session = Depends(get_db)):
-    # Get orders from last N days
-    since_date = datetime.now() - timedelta(days=days)
-    orders = db.query(Order).filter(Order.created_at >= since_date).all()
-    
-    if not orders:
-        return []
-        
-    # Convert to dataframe
-    data = [{"date": o.created_at.date(), "amount": o.total_amount} for o in orders]
+@router.get("/dashboard-stats")
+async def get_dashboard_stats(session_scope=Depends(get_session_scope)):
+    return await stats_cache.get("dashboard_stats", load_dashboard_stats, session_scope)
+
+# Longest window served at hourly resolution (hour buckets are computed from orders, not the rollup)
+MAX_HOURLY_TREND_DAYS = 31
+
+
+def trend_bucket(moment: datetime, granularity: str) -> datetime:
+    """Start of the hour/day/week/month bucket containing moment."""
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    start = datetime(moment.year, moment.month, moment.day)
+    if granularity == "week":
+        return start - timedelta(days=start.weekday())
+    if granularity == "month":
+        return start.replace(day=1)
+    return start
+
+
+def next_trend_bucket(start: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return start + timedelta(hours=1)
+    if granularity == "week":
+        return start + timedelta(weeks=1)
+    if granularity == "month":
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start + timedelta(days=1)
+
+
+def trend_label(start: datetime, granularity: str) -> str:
+    if granularity == "hour":
+        return start.strftime("%Y-%m-%dT%H:00")
+    if granularity == "month":
+        return start.strftime("%Y-%m")
+    return start.date().isoformat()
+
+
+def hourly_sales(db: Session, since: datetime) -> Dict[datetime, tuple]:
+    """Order count and revenue per hour since `since`, grouped in SQL."""
+    if db.get_bind().dialect.name == "postgresql":
+        bucket = func.date_trunc("hour", Order.created_at)
+    else:
+        bucket = func.strftime("%Y-%m-%d %H:00:00", Order.created_at)
+    rows = db.query(
+        bucket.label("bucket"),
+        func.count(Order.id),
+        func.sum(Order.total_amount)
+    ).filter(Order.created_at >= since).group_by(bucket).all()
     
-    if not data:
-        return []
+    sales = {}
+    for start, count, revenue in rows:
+        if isinstance(start, str):
+            start = datetime.fromisoformat(start)
+        sales[start.replace(tzinfo=None)] = (count, revenue or 0.0)
+    return sales
+
 
-    df = pd.DataFrame(data)
+@router.get("/sales-trends")
+def get_sales_trends(
+    days: int = Query(30, ge=1, le=3660),
+    granularity: str = Query("day", pattern="^(hour|day|week|month)$"),
+    db: Session = Depends(get_db)
+):
+    """
+    Orders and revenue per hour/day/week/month for the last N days, zero-filled.
+    
+    The window starts at the beginning of the bucket N days back, so the
+    first bucket is as complete as the others.
+    """
+    now = datetime.now()
+    since = trend_bucket(now - timedelta(days=days), granularity)
+    totals: Dict[datetime, list] = {}
     
-    # Group by date
-    daily_sales = df.groupby("date")["amount"].sum().reset_index()
-    daily_sales["date"] = daily_sales["date"].astype(str)
+    if granularity == "hour":
+        if days > MAX_HOURLY_TREND_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Hourly trends are limited to {MAX_HOURLY_TREND_DAYS} days"
+            )
+        for start, (count, revenue) in hourly_sales(db, since).items():
+            totals[start] = [count, revenue]
+    else:
+        # Days come pre-aggregated from daily_sales; weeks and months merge at most `days` rows
+        rows = db.query(DailySales.day, DailySales.order_count, DailySales.revenue).filter(
+            DailySales.day >= since.date()
+        ).all()
+        for day, count, revenue in rows:
+            start = trend_bucket(datetime.combine(day, datetime.min.time()), granularity)
+            bucket = totals.setdefault(start, [0, 0.0])
+            bucket[0] += count
+            bucket[1] += revenue
     
-    return daily_sales.to_dict(orient="records")
+    trend = []
+    start = since
+    while start <= now:
+        count, revenue = totals.get(start, (0, 0.0))
+        trend.append({"date": trend_label(start, granularity), "amount": round(revenue, 2), "orders": count})
+        start = next_trend_bucket(start, granularity)
+    return trend
 
 @router.get("/top-selling")
 def get_top_selling(limit: int = 5, db: Session = Depends(get_db)):
@@ -57,67 +147,57 @@ def get_top_selling(limit: int = 5, db: Session = Depends(get_db)):
     return [{"name": name, "value": total_sold} for name, total_sold in results]
 
 @router.get("/recommendations/user/{user_id}")
-def get_user_recommendations(user_id: int, db: Session = Depends(get_db)):
+async def get_user_recommendations(
+    user_id: int,
+    limit: int = Query(5, ge=1, le=20),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Get personalized recommendations for a user based on their order history.
-    1. Identify user's favorite category (most ordered).
-    2. Recommend items from that category.
-    3. Fallback to global top-sellers if no history.
+    Scores the cached catalog against the user's cached preference profile:
+    category affinity first, then global popularity; items they already
+    ordered come last. Users without history get the global top sellers.
     """
-    # 1. Find user's past orders
-    user_orders = db.query(Order.id).filter(Order.customer_id == user_id).all()
+    catalog = await menu_cache.get(db)
+    profile = preference_profiles.get_cached(user_id)
+    cooccurrence_index.ensure_fresh()
+    if profile is None:
+        profile = await db.run_sync(preference_profiles.get, user_id)
     
-    if not user_orders:
-        # Fallback: Global top sellers
-        return db.query(MenuItem).join(OrderItem).group_by(MenuItem.id).order_by(func.count(OrderItem.id).desc()).limit(5).all()
-
-    order_ids = [o.id for o in user_orders]
-
-    # 2. Find favorite category
-    favorite_category = db.query(
-        MenuItem.category_id,
-        func.count(OrderItem.id).label('count')
-    ).join(OrderItem).filter(
-        OrderItem.order_id.in_(order_ids)
-    ).group_by(MenuItem.category_id).order_by(desc('count')).first()
-
-    if favorite_category:
-        cat_id = favorite_category.category_id
-        # Recommend top rated available items from this category, excluding what they already bought? 
-        # For simplicity, suggest items from this category sorted by popularity
-        results = db.query(MenuItem).filter(
-            MenuItem.category_id == cat_id,
-            MenuItem.is_available == True
-        ).limit(5).all()
-        
-        if results:
-            return results
-
-    # Fallback
-    results = db.query(MenuItem).join(OrderItem).group_by(MenuItem.id).order_by(func.count(OrderItem.id).desc()).limit(5).all()
-    return results
+    return score_items(catalog.items, profile, cooccurrence_index.item_order_counts(), limit)
 
 @router.get("/recommendations/item/{item_id}")
-def get_item_recommendations(item_id: int, db: Session = Depends(get_db)):
+def get_item_recommendations(
+    item_id: int,
+    limit: int = Query(3, ge=1, le=20),
+    min_support: Optional[int] = Query(None, ge=1, description="Orders that must contain both items"),
+    min_lift: Optional[float] = Query(None, ge=0, description="Minimum lift of the pair"),
+    db: Session = Depends(get_db)
+):
     """
     Get items frequently bought with the given item_id.
+    Served from the in-memory co-occurrence index instead of a self-join over order_items.
     """
-    # Find orders containing this item
-    subquery = db.query(OrderItem.order_id).filter(OrderItem.menu_item_id == item_id).scalar_subquery()
-    
-    # Find other items in those orders
-    results = db.query(
-        MenuItem
-    ).join(OrderItem).filter(
-        OrderItem.order_id.in_(subquery),
-        OrderItem.menu_item_id != item_id
-    ).group_by(MenuItem.id).order_by(func.count(OrderItem.menu_item_id).desc()).limit(3).all()
+    cooccurrence_index.ensure_fresh()
+    item_ids = [r.item_id for r in cooccurrence_index.related(item_id, limit, min_support, min_lift)]
     
     # Fallback to top selling if no associations found
-    if not results:
-        results = db.query(MenuItem).join(OrderItem).group_by(MenuItem.id).order_by(func.count(OrderItem.id).desc()).limit(3).all()
+    if not item_ids:
+        item_ids = [i for i in cooccurrence_index.popular(limit + 1) if i != item_id][:limit]
+    
+    items = {item.id: item for item in db.query(MenuItem).filter(MenuItem.id.in_(item_ids)).all()}
+    return [items[i] for i in item_ids if i in items]
+
+@router.post("/recommendations/rebuild")
+def rebuild_recommendations(db: Session = Depends(get_db), current_user: User = Depends(get_admin_user)):
+    """Recount this worker's co-occurrence index from order_items (Admin only)."""
+    cooccurrence_index.rebuild(db)
+    return cooccurrence_index.stats()
 
-    return results
+@router.get("/recommendations/stats")
+def get_recommendation_stats(current_user: User = Depends(get_admin_user)):
+    """Size and age of this worker's co-occurrence index (Admin only)."""
+    return cooccurrence_index.stats()
 
 @router.get("/least-selling")
 def get_least_selling(limit: int = 5, db: Session = Depends(get_db)):
@@ -183,8 +263,11 @@ def get_ai_insights(db: Session = Depends(get_db)):
     today = datetime.now().date()
     yesterday = today - timedelta(days=1)
     
-    rev_today = db.query(func.sum(Order.total_amount)).filter(func.date(Order.created_at) == today).scalar() or 0
-    rev_yesterday = db.query(func.sum(Order.total_amount)).filter(func.date(Order.created_at) == yesterday).scalar() or 0
+    revenue_by_day = dict(
+        db.query(DailySales.day, DailySales.revenue).filter(DailySales.day.in_([today, yesterday])).all()
+    )
+    rev_today = revenue_by_day.get(today) or 0
+    rev_yesterday = revenue_by_day.get(yesterday) or 0
     
     if rev_today > rev_yesterday and rev_yesterday > 0:
         growth = ((rev_today - rev_yesterday) / rev_yesterday) * 100
@@ -1,29 +1,32 @@
 # app/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User
 from app.schemas import UserCreate, UserLogin, UserResponse, Token, UserUpdate
 from app.utils.auth import (
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_and_update_password,
     create_access_token,
-    get_current_active_user
+    get_current_active_user,
+    get_admin_user
 )
+from app.utils.principal_cache import principal_cache
 from app.config import settings
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user."""
     # Check if user already exists
-    existing_user = db.query(User).filter(
+    existing_user = await db.scalar(select(User).where(
         (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    ).limit(1))
     
     if existing_user:
         raise HTTPException(
@@ -32,7 +35,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     new_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -42,25 +45,34 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     return new_user
 
 
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Authenticate user and return JWT token."""
     # Find user by email
-    user = db.query(User).filter(User.email == credentials.email).first()
+    user = await db.scalar(select(User).where(User.email == credentials.email))
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_and_update_password(credentials.password, user.hashed_password)
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Transparently upgrade hashes made with a different bcrypt cost
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -83,6 +95,12 @@ async def get_current_user_info(current_user: User = Depends(get_current_active_
     return current_user
 
 
+@router.get("/principal-cache/stats")
+async def get_principal_cache_stats(current_user: User = Depends(get_admin_user)):
+    """Principal cache hit/miss counters for monitoring (Admin only)."""
+    return principal_cache.stats()
+
+
 @router.post("/logout")
 async def logout():
     """Logout endpoint (token invalidation handled client-side)."""
@@ -92,32 +110,35 @@ async def logout():
 async def update_profile(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update user profile (full_name and phone)
     """
     try:
+        # current_user may be a detached copy from the principal cache
+        user = await db.get(User, current_user.id)
+        
         # Update user fields if provided
         if user_update.full_name is not None:
-            current_user.full_name = user_update.full_name
+            user.full_name = user_update.full_name
         if user_update.phone is not None:
-            current_user.phone = user_update.phone
+            user.phone = user_update.phone
         
-        db.commit()
-        db.refresh(current_user)
+        await db.commit()
+        await db.refresh(user)
         
         # Return updated user data
         return {
-            "id": current_user.id,
-            "email": current_user.email,
-            "username": current_user.username,
-            "full_name": current_user.full_name,
-            "phone": current_user.phone,
-            "role": current_user.role,
-            "is_active": current_user.is_active,
-            "created_at": current_user.created_at.isoformat() if current_user.created_at else None
+            "id": user.id,
+            "email": user.email,
+            "username": user.username,
+            "full_name": user.full_name,
+            "phone": user.phone,
+            "role": user.role,
+            "is_active": user.is_active,
+            "created_at": user.created_at.isoformat() if user.created_at else None
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to update profile: {str(e)}")
@@ -1,9 +1,11 @@
 # app/routers/menu.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from typing import List, Optional
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import MenuItem, Category, User
 from app.schemas import (
     MenuItemCreate,
@@ -13,55 +15,125 @@ from app.schemas import (
     CategoryResponse
 )
 from app.utils.auth import get_current_active_user, get_admin_user
+from app.utils.menu_cache import EncodedBody, menu_cache
+from app.utils.pagination import decode_cursor, encode_cursor
 
 router = APIRouter()
 
 
+# ============ MENU ITEMS ============
+async def load_menu_item(db: AsyncSession, item_id: int) -> MenuItem:
+    """Load a menu item with its category, or raise 404."""
+    item = await db.scalar(
+        select(MenuItem)
+        .options(joinedload(MenuItem.category))
+        .where(MenuItem.id == item_id)
+        .execution_options(populate_existing=True)
+    )
+    if not item:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Menu item not found"
+        )
+    return item
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches etag (RFC 9110 section 13.1.2).
+    
+    The header may list several tags or be "*"; comparison is weak, so a
+    W/ prefix on either side is ignored.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def catalog_response(request: Request, etag: str, body: EncodedBody) -> Response:
+    """Serve pre-rendered catalog bytes, honouring If-None-Match and Accept-Encoding."""
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", **body.headers}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    content, encoding = body.select(request.headers.get("accept-encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def filter_menu_items(
+    items: List[dict],
+    category_id: Optional[int],
+    is_available: Optional[bool],
+    is_vegetarian: Optional[bool],
+    after_id: Optional[int],
+    skip: int,
+    limit: int
+) -> EncodedBody:
+    """Apply the menu listing filters and paging to serialized catalog items (ordered by id)."""
+    if category_id:
+        items = [i for i in items if i["category_id"] == category_id]
+    if is_available is not None:
+        items = [i for i in items if i["is_available"] == is_available]
+    if is_vegetarian is not None:
+        items = [i for i in items if i["is_vegetarian"] == is_vegetarian]
+    if after_id is not None:
+        items = [i for i in items if i["id"] > after_id]
+    page = items[skip:skip + limit]
+    headers = {}
+    if len(items) > skip + limit:
+        headers["X-Next-Cursor"] = encode_cursor(page[-1]["id"])
+    return EncodedBody(page, headers)
+
+
 # ============ MENU ITEMS ============
 @router.get("", response_model=List[MenuItemResponse])
 async def get_menu_items(
+    request: Request,
     category_id: Optional[int] = None,
     is_available: Optional[bool] = None,
     is_vegetarian: Optional[bool] = None,
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True, description="Use cursor instead"),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all menu items with optional filters."""
-    query = db.query(MenuItem)
+    """
+    Get all menu items with optional filters (served pre-rendered from the catalog cache).
     
-    if category_id:
-        query = query.filter(MenuItem.category_id == category_id)
-    if is_available is not None:
-        query = query.filter(MenuItem.is_available == is_available)
-    if is_vegetarian is not None:
-        query = query.filter(MenuItem.is_vegetarian == is_vegetarian)
-    
-    menu_items = query.offset(skip).limit(limit).all()
-    return menu_items
+    When more items follow, the cursor for the next page is returned in the
+    X-Next-Cursor header and is sent back as `cursor`.
+    """
+    after_id = decode_cursor(cursor, int)[0] if cursor else None
+    if after_id is not None:
+        skip = 0
+    catalog = await menu_cache.get(db)
+    body = catalog.rendered(
+        ("items", category_id, is_available, is_vegetarian, after_id, skip, limit),
+        lambda: filter_menu_items(catalog.items, category_id, is_available, is_vegetarian, after_id, skip, limit)
+    )
+    return catalog_response(request, catalog.etag, body)
 
 
 @router.get("/{item_id}", response_model=MenuItemResponse)
-async def get_menu_item(item_id: int, db: Session = Depends(get_db)):
+async def get_menu_item(item_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific menu item by ID."""
-    item = db.query(MenuItem).filter(MenuItem.id == item_id).first()
-    if not item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Menu item not found"
-        )
-    return item
+    return await load_menu_item(db, item_id)
 
 
 @router.post("", response_model=MenuItemResponse, status_code=status.HTTP_201_CREATED)
 async def create_menu_item(
     item_data: MenuItemCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_admin_user)
 ):
     """Create a new menu item (Admin only)."""
     # Verify category exists
-    category = db.query(Category).filter(Category.id == item_data.category_id).first()
+    category = await db.get(Category, item_data.category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -70,72 +142,66 @@ async def create_menu_item(
     
     new_item = MenuItem(**item_data.model_dump())
     db.add(new_item)
-    db.commit()
-    db.refresh(new_item)
-    return new_item
+    await db.flush()
+    item_id = new_item.id
+    await db.commit()
+    menu_cache.invalidate()
+    return await load_menu_item(db, item_id)
 
 
 @router.put("/{item_id}", response_model=MenuItemResponse)
 async def update_menu_item(
     item_id: int,
     item_data: MenuItemUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_admin_user)
 ):
     """Update a menu item (Admin only)."""
-    item = db.query(MenuItem).filter(MenuItem.id == item_id).first()
-    if not item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Menu item not found"
-        )
+    item = await load_menu_item(db, item_id)
     
     # Update only provided fields
     update_data = item_data.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(item, key, value)
     
-    db.commit()
-    db.refresh(item)
-    return item
+    await db.commit()
+    menu_cache.invalidate()
+    return await load_menu_item(db, item_id)
 
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_menu_item(
     item_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_admin_user)
 ):
     """Delete a menu item (Admin only)."""
-    item = db.query(MenuItem).filter(MenuItem.id == item_id).first()
-    if not item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Menu item not found"
-        )
+    item = await load_menu_item(db, item_id)
     
-    db.delete(item)
-    db.commit()
+    await db.delete(item)
+    await db.commit()
+    menu_cache.invalidate()
     return None
 
 
 # ============ CATEGORIES ============
 @router.get("/categories/all", response_model=List[CategoryResponse])
-async def get_categories(db: Session = Depends(get_db)):
-    """Get all menu categories."""
-    categories = db.query(Category).filter(Category.is_active == True).all()
-    return categories
+async def get_categories(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Get all menu categories (served pre-rendered from the catalog cache)."""
+    catalog = await menu_cache.get(db)
+    body = catalog.rendered("categories", lambda: EncodedBody(catalog.categories))
+    return catalog_response(request, catalog.etag, body)
 
 
 @router.post("/categories", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
 async def create_category(
     category_data: CategoryCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_admin_user)
 ):
     """Create a new category (Admin only)."""
     # Check if category already exists
-    existing = db.query(Category).filter(Category.name == category_data.name).first()
+    existing = await db.scalar(select(Category).where(Category.name == category_data.name))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -144,6 +210,7 @@ async def create_category(
     
     new_category = Category(**category_data.model_dump())
     db.add(new_category)
-    db.commit()
-    db.refresh(new_category)
+    await db.commit()
+    await db.refresh(new_category)
+    menu_cache.invalidate()
     return new_category
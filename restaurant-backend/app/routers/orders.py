@@ -4,50 +4,108 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 # app/routers/orders.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy.orm import joinedload
-from typing import List, Optional
-from datetime import datetime
-import random
-import string
-
-from app.database import get_db
-from app.utils.auth import get_current_active_user
-from app.models import Order, OrderItem, MenuItem, User, OrderStatus
-from app.schemas import OrderCreate, OrderResponse, OrderStatusUpdate
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from typing import List, Optional, Tuple
+from datetime import date, datetime, timedelta
+
+from app.config import settings
+from app.database import get_async_db, get_session_scope, sequence_engine
+from app.utils.auth import get_current_active_user, get_event_stream_admin_user, get_streaming_admin_user
+from app.models import Order, OrderItem, MenuItem, User, OrderStatus, db_now
+from app.schemas import OrderCreate, OrderItemCreate, OrderResponse, OrderStatusUpdate
 from app.utils.auth import get_current_active_user, get_admin_user, get_current_user
+from app.utils.cooccurrence import cooccurrence_index
+from app.utils.exports import EXPORT_MEDIA_TYPES, export_filename, stream_export
+from app.utils.order_events import order_events
+from app.utils.order_numbers import format_order_number, order_number_allocator
+from app.utils.pagination import encode_cursor, decode_cursor, keyset_after
+from app.utils.preferences import preference_profiles
+from app.utils.sales_rollup import record_order_created, record_status_change
 from app.websocket import manager
 
 router = APIRouter()
 
 
-def generate_order_number() -> str:
-    """Generate a unique order number."""
-    timestamp = datetime.now().strftime("%Y%m%d")
-    random_part = ''.join(random.choices(string.digits, k=4))
-    return f"ORD-{timestamp}-{random_part}"
+# Orders that get no further status updates; their WebSocket subscriptions are released
+FINAL_STATUSES = (OrderStatus.DELIVERED, OrderStatus.CANCELLED)
 
+# Everything OrderResponse serializes, loaded up front (async sessions cannot lazy-load)
+ORDER_DETAIL_OPTIONS = (
+    selectinload(Order.order_items).joinedload(OrderItem.menu_item).joinedload(MenuItem.category),
+)
 
-@router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
-async def create_order(
-    order_data: OrderCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Create a new order."""
-    if not order_data.items:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Order must contain at least one item"
-        )
+
+async def broadcast_new_order(order: Order):
+    """Tell all admins (kitchen displays) about a new order."""
+    await manager.broadcast_new_order({
+        "type": "new_order",
+        "order": {
+            "id": order.id,
+            "order_number": order.order_number,
+            "customer_id": order.customer_id,
+            "table_number": order.table_number,
+            "total_amount": order.total_amount,
+            "status": order.status.value,
+            "created_at": order.created_at.isoformat()
+        }
+    })
+
+
+async def broadcast_status(order: Order):
+    """Tell the order's subscribers and all admins about its new status."""
+    await manager.broadcast_order_update(order.id, {
+        "type": "order_status_updated",
+        "order": {
+            "id": order.id,
+            "order_number": order.order_number,
+            "status": order.status.value,
+            "updated_at": datetime.utcnow().isoformat()
+        }
+    }, final=order.status in FINAL_STATUSES)
+
+
+async def generate_order_number(db: AsyncSession) -> str:
+    """Generate a unique order number from the per-day sequence."""
+    today = datetime.now().date()
+    value = await db.run_sync(
+        lambda session: order_number_allocator.next_value(sequence_engine or session.get_bind(), today)
+    )
+    return format_order_number(today, value)
+
+
+async def load_order(db: AsyncSession, order_id: int) -> Optional[Order]:
+    """Load an order with everything OrderResponse needs."""
+    return await db.scalar(
+        select(Order)
+        .options(*ORDER_DETAIL_OPTIONS)
+        .where(Order.id == order_id)
+        .execution_options(populate_existing=True)
+    )
+
+
+async def validate_order_items(db: AsyncSession, items: List[OrderItemCreate]) -> Tuple[float, List[dict]]:
+    """
+    Validate requested items against the menu and price them.
+    
+    All referenced menu items are loaded with one IN (...) query; availability
+    checks and totals are then computed in memory. Returns the order total and
+    the OrderItem rows (without order_id) ready for a bulk insert.
+    """
+    requested_ids = {item.menu_item_id for item in items}
+    menu_items = {
+        menu_item.id: menu_item
+        for menu_item in (await db.scalars(select(MenuItem).where(MenuItem.id.in_(requested_ids)))).all()
+    }
     
-    # Calculate total and validate items
     total_amount = 0.0
     order_items_data = []
     
-    for item_data in order_data.items:
-        menu_item = db.query(MenuItem).filter(MenuItem.id == item_data.menu_item_id).first()
+    for item_data in items:
+        menu_item = menu_items.get(item_data.menu_item_id)
         if not menu_item:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -59,9 +117,7 @@ async def create_order(
                 detail=f"Menu item '{menu_item.name}' is not available"
             )
         
-        item_total = menu_item.price * item_data.quantity
-        total_amount += item_total
-        
+        total_amount += menu_item.price * item_data.quantity
         order_items_data.append({
             "menu_item_id": menu_item.id,
             "quantity": item_data.quantity,
@@ -69,9 +125,41 @@ async def create_order(
             "special_instructions": item_data.special_instructions
         })
     
+    return total_amount, order_items_data
+
+
+def serialize_order_items(order: Order) -> List[dict]:
+    """Summarize an order's items; expects order_items and menu_item to be eager-loaded."""
+    return [
+        {
+            "menu_item_id": item.menu_item_id,
+            "name": item.menu_item.name if item.menu_item else "Unknown Item",
+            "quantity": item.quantity,
+            "price": float(item.price)
+        }
+        for item in order.order_items
+    ]
+
+
+@router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
+async def create_order(
+    order_data: OrderCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Create a new order."""
+    if not order_data.items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Order must contain at least one item"
+        )
+    
+    # Calculate total and validate items
+    total_amount, order_items_data = await validate_order_items(db, order_data.items)
+    
     # Create order
     new_order = Order(
-        order_number=generate_order_number(),
+        order_number=await generate_order_number(db),
         customer_id=current_user.id,
         table_number=order_data.table_number,
         total_amount=total_amount,
@@ -80,53 +168,67 @@ async def create_order(
     )
     
     db.add(new_order)
-    db.flush()  # Get the order ID
+    await db.flush()  # Get the order ID
+    order_id = new_order.id
     
-    # Create order items
+    # Create order items in a single bulk insert
     for item_data in order_items_data:
-        order_item = OrderItem(order_id=new_order.id, **item_data)
-        db.add(order_item)
+        item_data["order_id"] = order_id
+    await db.execute(insert(OrderItem), order_items_data)
+    await record_order_created(db, order_id)
     
-    db.commit()
-    db.refresh(new_order)
+    await db.commit()
+    cooccurrence_index.add_order(order_id, [item["menu_item_id"] for item in order_items_data])
+    preference_profiles.record_order(
+        current_user.id, order_id, [(item["menu_item_id"], item["quantity"]) for item in order_items_data]
+    )
+    new_order = await load_order(db, order_id)
     
     # Broadcast new order to admins via WebSocket
-    await manager.broadcast_new_order({
-        "type": "new_order",
-        "order": {
-            "id": new_order.id,
-            "order_number": new_order.order_number,
-            "customer_id": new_order.customer_id,
-            "table_number": new_order.table_number,
-            "total_amount": new_order.total_amount,
-            "status": new_order.status.value,
-            "created_at": new_order.created_at.isoformat()
-        }
-    })
+    await broadcast_new_order(new_order)
     
     return new_order
 
 
 @router.get("", response_model=List[OrderResponse])
 async def get_orders(
+    response: Response,
     status: Optional[OrderStatus] = None,
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True, description="Use cursor instead; deep offsets get slower page by page"),
     limit: int = Query(50, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get orders. Customers see their own orders, admins see all."""
-    query = db.query(Order)
+    """
+    Get orders, newest first. Customers see their own orders, admins see all.
+    
+    When more orders follow, the cursor for the next page is returned in the
+    X-Next-Cursor header and is sent back as `cursor`.
+    """
+    query = select(Order)
     
     # Regular users only see their own orders
     if current_user.role != "admin":
-        query = query.filter(Order.customer_id == current_user.id)
+        query = query.where(Order.customer_id == current_user.id)
     
     # Filter by status if provided
     if status:
-        query = query.filter(Order.status == status)
+        query = query.where(Order.status == status)
     
-    orders = query.options(joinedload(Order.order_items).joinedload(OrderItem.menu_item)).order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
+    if cursor:
+        query = query.where(keyset_after(
+            (Order.created_at, Order.id), decode_cursor(cursor, datetime.fromisoformat, int)
+        ))
+    elif skip:
+        query = query.offset(skip)
+    
+    orders = (await db.scalars(
+        query.options(*ORDER_DETAIL_OPTIONS).order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1)
+    )).all()
+    if len(orders) > limit:
+        orders = orders[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(orders[-1].created_at, orders[-1].id)
     return orders
 
 
@@ -134,41 +236,50 @@ async def get_orders(
 
 @router.get("/my-orders")
 async def get_my_orders(
-    db: Session = Depends(get_db),
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get all orders for the current logged-in user."""
+    """
+    Get orders for the current logged-in user, newest first, one page at a time.
+    
+    When more orders follow, the cursor for the next page is returned in the
+    X-Next-Cursor header and is sent back as `cursor`.
+    """
     logger.info(f"📋 Fetching orders for user: {current_user.email}")
     
+    query = select(Order).options(
+        selectinload(Order.order_items).joinedload(OrderItem.menu_item)
+    ).where(Order.customer_id == current_user.id)
+    
+    if cursor:
+        query = query.where(keyset_after(
+            (Order.created_at, Order.id), decode_cursor(cursor, datetime.fromisoformat, int)
+        ))
+    
+    query = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1)
+    
     try:
-        orders = db.query(Order).filter(
-            Order.customer_id == current_user.id
-        ).order_by(Order.created_at.desc()).all()
+        orders = (await db.scalars(query)).all()
         
-        result = []
-        for order in orders:
-            # Get order items
-            order_items = db.query(OrderItem).filter(OrderItem.order_id == order.id).all()
-            
-            items_data = []
-            for item in order_items:
-                menu_item = db.query(MenuItem).filter(MenuItem.id == item.menu_item_id).first()
-                items_data.append({
-                    "menu_item_id": item.menu_item_id,
-                    "name": menu_item.name if menu_item else "Unknown Item",
-                    "quantity": item.quantity,
-                    "price": float(item.price)
-                })
-            
-            result.append({
+        if len(orders) > limit:
+            orders = orders[:limit]
+            response.headers["X-Next-Cursor"] = encode_cursor(orders[-1].created_at, orders[-1].id)
+        
+        result = [
+            {
                 "id": order.id,
                 "order_number": order.order_number,
                 "table_number": order.table_number,
                 "status": order.status,
                 "total_amount": float(order.total_amount),
-                "items": items_data,
+                "items": serialize_order_items(order),
                 "created_at": order.created_at.isoformat()
-            })
+            }
+            for order in orders
+        ]
         
         logger.info(f"✅ Found {len(result)} orders for user")
         return result
@@ -179,14 +290,129 @@ async def get_my_orders(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch orders: {str(e)}"
         )
+
+
+@router.get("/changes")
+async def get_order_changes(
+    since: Optional[str] = Query(None, description="Cursor from the previous response; omit to start from the beginning"),
+    limit: int = Query(500, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Orders created or updated after a cursor, oldest change first (Admin only).
+    
+    Poll with the returned cursor; has_more means another page is ready now.
+    Changes younger than ORDER_CHANGES_SETTLE_SECONDS are held back until
+    transactions that started before them have committed, so none are skipped.
+    """
+    # Same clock that stamps updated_at
+    settled = await db.scalar(select(db_now())) - timedelta(seconds=settings.ORDER_CHANGES_SETTLE_SECONDS)
+    query = select(Order).where(Order.updated_at <= settled)
+    if since:
+        query = query.where(keyset_after(
+            (Order.updated_at, Order.id), decode_cursor(since, datetime.fromisoformat, int), descending=False
+        ))
+    orders = (await db.scalars(query.order_by(Order.updated_at, Order.id).limit(limit + 1))).all()
+    has_more = len(orders) > limit
+    orders = orders[:limit]
+    
+    items = {}
+    if orders:
+        rows = await db.execute(
+            select(OrderItem.order_id, OrderItem.menu_item_id, OrderItem.quantity)
+            .where(OrderItem.order_id.in_([order.id for order in orders]))
+            .order_by(OrderItem.order_id, OrderItem.id)
+        )
+        for order_id, menu_item_id, quantity in rows:
+            items.setdefault(order_id, []).append([menu_item_id, quantity])
+    
+    return {
+        "changes": [
+            {
+                "id": order.id,
+                "order_number": order.order_number,
+                "status": order.status.value,
+                "table_number": order.table_number,
+                "guest_name": order.guest_name,
+                "order_type": order.order_type,
+                "total_amount": order.total_amount,
+                "items": items.get(order.id, []),  # [menu_item_id, quantity] pairs
+                "created_at": order.created_at.isoformat(),
+                "updated_at": order.updated_at.isoformat()
+            }
+            for order in orders
+        ],
+        "cursor": encode_cursor(orders[-1].updated_at, orders[-1].id) if orders else since,
+        "has_more": has_more
+    }
+
+
+ORDER_EXPORT_COLUMNS = (
+    Order.id, Order.order_number, Order.created_at, Order.status, Order.order_type, Order.table_number,
+    Order.customer_id, Order.guest_name, Order.total_amount, Order.notes
+)
+
+
+@router.get("/export")
+async def export_orders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    date_from: Optional[date] = Query(None, description="First day included (by created_at)"),
+    date_to: Optional[date] = Query(None, description="Last day included (by created_at)"),
+    status: Optional[OrderStatus] = None,
+    session_scope=Depends(get_session_scope),
+    current_user: User = Depends(get_streaming_admin_user)
+):
+    """
+    Stream orders as NDJSON or CSV, oldest first, one row per order (Admin only).
+    
+    Rows are read with a server-side cursor and written as they arrive, so the
+    export runs in constant memory whatever the date range.
+    """
+    query = select(*ORDER_EXPORT_COLUMNS)
+    if date_from:
+        query = query.where(Order.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        query = query.where(Order.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    if status:
+        query = query.where(Order.status == status)
+    
+    columns = [column.key for column in ORDER_EXPORT_COLUMNS]
+    return StreamingResponse(
+        stream_export(session_scope, query.order_by(Order.created_at, Order.id), columns, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename("orders", date_from, date_to, format)}"'},
+    )
+
+
+@router.get("/events")
+async def order_event_stream(
+    request: Request,
+    follow: bool = Query(True, description="Stay open for live events; false returns only what was missed"),
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_event_stream_admin_user)
+):
+    """
+    Server-Sent Events stream of new_order / order_status_updated events (Admin only).
+    
+    Reconnecting with Last-Event-ID replays everything missed since that id, or
+    sends a "reset" event when the client has to refetch the order list.
+    """
+    return StreamingResponse(
+        order_events.stream(last_event_id, follow=follow, is_disconnected=request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a specific order by ID."""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await load_order(db, order_id)
     
     if not order:
         raise HTTPException(
@@ -208,11 +434,11 @@ async def get_order(
 async def update_order_status(
     order_id: int,
     status_update: OrderStatusUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_admin_user)
 ):
     """Update order status (Admin only)."""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.get(Order, order_id)
     
     if not order:
         raise HTTPException(
@@ -220,20 +446,13 @@ async def update_order_status(
             detail="Order not found"
         )
     
+    await record_status_change(db, order_id, order.status, status_update.status)
     order.status = status_update.status
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    order = await load_order(db, order_id)
     
     # Broadcast status update via WebSocket
-    await manager.broadcast_order_update(order.id, {
-        "type": "order_status_updated",
-        "order": {
-            "id": order.id,
-            "order_number": order.order_number,
-            "status": order.status.value,
-            "updated_at": datetime.utcnow().isoformat()
-        }
-    })
+    await broadcast_status(order)
     
     return order
 
@@ -241,11 +460,11 @@ async def update_order_status(
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def cancel_order(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Cancel an order (only if pending)."""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.get(Order, order_id)
     
     if not order:
         raise HTTPException(
@@ -267,18 +486,22 @@ async def cancel_order(
             detail="Only pending orders can be cancelled"
         )
     
+    await record_status_change(db, order_id, order.status, OrderStatus.CANCELLED)
     order.status = OrderStatus.CANCELLED
-    db.commit()
+    await db.commit()
+    await broadcast_status(order)
     return None
 
 
 @router.get("/track/{order_number}")
-async def track_order(order_number: str, db: Session = Depends(get_db)):
+async def track_order(order_number: str, db: AsyncSession = Depends(get_async_db)):
     """Track order status by order number (no auth required for guests)."""
     logger.info(f"📍 Tracking order: {order_number}")
     
     try:
-        order = db.query(Order).filter(Order.order_number == order_number).first()
+        order = await db.scalar(select(Order).options(
+            selectinload(Order.order_items).joinedload(OrderItem.menu_item)
+        ).where(Order.order_number == order_number))
         
         if not order:
             raise HTTPException(
@@ -286,19 +509,6 @@ async def track_order(order_number: str, db: Session = Depends(get_db)):
                 detail="Order not found"
             )
         
-        # Get order items
-        order_items = db.query(OrderItem).filter(OrderItem.order_id == order.id).all()
-        
-        items_data = []
-        for item in order_items:
-            menu_item = db.query(MenuItem).filter(MenuItem.id == item.menu_item_id).first()
-            items_data.append({
-                "menu_item_id": item.menu_item_id,
-                "name": menu_item.name if menu_item else "Unknown Item",
-                "quantity": item.quantity,
-                "price": float(item.price)
-            })
-        
         return {
             "id": order.id,
             "order_number": order.order_number,
@@ -306,7 +516,7 @@ async def track_order(order_number: str, db: Session = Depends(get_db)):
             "guest_name": order.guest_name,
             "status": order.status,
             "total_amount": float(order.total_amount),
-            "items": items_data,
+            "items": serialize_order_items(order),
             "created_at": order.created_at.isoformat()
         }
         
@@ -325,7 +535,7 @@ async def track_order(order_number: str, db: Session = Depends(get_db)):
 @router.post("/guest")
 async def create_guest_order(
     order_data: dict,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create order for guest (no authentication required)."""
     logger.info("=" * 50)
@@ -337,7 +547,7 @@ async def create_guest_order(
     
     try:
         # Generate order number
-        order_number = generate_order_number()
+        order_number = await generate_order_number(db)
         
         # Create order
         db_order = Order(
@@ -351,7 +561,7 @@ async def create_guest_order(
         )
         
         db.add(db_order)
-        db.flush()  # Get the order ID
+        await db.flush()  # Get the order ID
         
         # Add order items
         for item in order_data.get('items', []):
@@ -363,8 +573,12 @@ async def create_guest_order(
             )
             db.add(order_item)
         
-        db.commit()
-        db.refresh(db_order)
+        await db.flush()
+        await record_order_created(db, db_order.id)
+        await db.commit()
+        cooccurrence_index.add_order(db_order.id, [item['menu_item_id'] for item in order_data.get('items', [])])
+        await db.refresh(db_order)
+        await broadcast_new_order(db_order)
         
         logger.info(f"✅ Guest order created! Order #: {order_number}")
         
@@ -380,7 +594,7 @@ async def create_guest_order(
         
     except Exception as e:
         logger.error(f"❌ Failed to create guest order: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create order: {str(e)}"
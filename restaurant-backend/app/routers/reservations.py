@@ -1,13 +1,20 @@
 # app/routers/reservations.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Optional
 from datetime import datetime, date
 import logging
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_async_db, get_session_scope
 from app.models import Reservation, User
 from app.schemas import ReservationCreate
+from app.utils.auth import get_admin_user, get_streaming_admin_user
+from app.utils.availability import availability_index
+from app.utils.exports import EXPORT_MEDIA_TYPES, export_filename, stream_export
+from app.utils.pagination import decode_cursor, encode_cursor, keyset_after
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -19,7 +26,7 @@ router = APIRouter()
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_reservation(
     reservation_data: ReservationCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new reservation (no auth required)."""
     logger.info("=" * 50)
@@ -58,8 +65,9 @@ async def create_reservation(
         )
         
         db.add(db_reservation)
-        db.commit()
-        db.refresh(db_reservation)
+        await db.commit()
+        await db.refresh(db_reservation)
+        availability_index.record(db_reservation)
         
         logger.info(f"✅ Reservation created successfully! ID: {db_reservation.id}")
         
@@ -86,7 +94,7 @@ async def create_reservation(
         )
     except Exception as e:
         logger.error(f"❌ Failed to create reservation: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create reservation: {str(e)}"
@@ -97,30 +105,22 @@ async def create_reservation(
 async def check_availability(
     date: str,
     time: str,
-    guests: int,
-    db: Session = Depends(get_db)
+    guests: int = Query(..., ge=1, le=settings.RESERVATION_MAX_GUESTS),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Check if reservation is available for given date/time."""
+    """Check if a party of `guests` can be seated at date/time."""
     logger.info(f"🔍 Checking availability for {date} at {time} for {guests} guests")
     
     try:
         reservation_date = datetime.strptime(date, "%Y-%m-%d").date()
+        slot = await db.run_sync(lambda session: availability_index.check(session, reservation_date, time, guests))
+        available = slot["available"]
         
-        # Count reservations for this date and time
-        existing_reservations = db.query(Reservation).filter(
-            Reservation.date == reservation_date,
-            Reservation.time == time,
-            Reservation.status != "cancelled"
-        ).count()
-        
-        # Simple availability check (max 10 tables)
-        max_tables = 10
-        available = existing_reservations < max_tables
-        
-        logger.info(f"{'✅ Available' if available else '❌ Not available'} - {existing_reservations}/{max_tables} tables booked")
+        logger.info(f"{'✅ Available' if available else '❌ Not available'} - {slot['remaining_tables']} tables left")
         
         return {
             "available": available,
+            "remaining_tables": slot["remaining_tables"],
             "message": "Table available" if available else "No tables available for this time"
         }
     except Exception as e:
@@ -129,18 +129,31 @@ async def check_availability(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+
+
+@router.get("/availability/{date}")
+async def get_day_availability(
+    date: date,
+    guests: int = Query(..., ge=1, le=settings.RESERVATION_MAX_GUESTS),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Every bookable time on `date`, with whether a party of `guests` fits (for the booking grid)."""
+    slots = await db.run_sync(lambda session: availability_index.day_slots(session, date, guests))
+    return {"date": date.isoformat(), "guests": guests, "slots": slots}
+
+
 @router.get("/search")
 async def search_reservation(
     phone: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Search for the most recent reservation by phone number."""
     logger.info(f"🔍 Searching reservation for phone: {phone}")
     
     # Simple search: get the latest reservation for this phone
-    reservation = db.query(Reservation).filter(
+    reservation = await db.scalar(select(Reservation).where(
         Reservation.phone == phone
-    ).order_by(Reservation.created_at.desc()).first()
+    ).order_by(Reservation.created_at.desc()).limit(1))
     
     if not reservation:
         raise HTTPException(
@@ -160,12 +173,36 @@ async def search_reservation(
     }
 
 @router.get("/")
-async def get_all_reservations(db: Session = Depends(get_db)):
-    """Get all reservations (for admin)."""
-    logger.info("📋 Fetching all reservations")
+async def get_all_reservations(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get reservations, latest slot first (for admin).
+    
+    When more reservations follow, the cursor for the next page is returned in
+    the X-Next-Cursor header and is sent back as `cursor`.
+    """
+    logger.info("📋 Fetching reservations")
+    
+    query = select(Reservation)
+    if cursor:
+        query = query.where(keyset_after(
+            (Reservation.date, Reservation.time, Reservation.id),
+            decode_cursor(cursor, date.fromisoformat, str, int)
+        ))
     
     try:
-        reservations = db.query(Reservation).order_by(Reservation.date.desc(), Reservation.time.desc()).all()
+        reservations = (await db.scalars(
+            query.order_by(Reservation.date.desc(), Reservation.time.desc(), Reservation.id.desc()).limit(limit + 1)
+        )).all()
+        
+        if len(reservations) > limit:
+            reservations = reservations[:limit]
+            last = reservations[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(last.date, last.time, last.id)
         
         logger.info(f"✅ Found {len(reservations)} reservations")
         
@@ -196,17 +233,51 @@ async def get_all_reservations(db: Session = Depends(get_db)):
         )
 
 
+RESERVATION_EXPORT_COLUMNS = (
+    Reservation.id, Reservation.date, Reservation.time, Reservation.name, Reservation.email, Reservation.phone,
+    Reservation.guests, Reservation.status, Reservation.table_number, Reservation.special_requests,
+    Reservation.created_at
+)
+
+
+@router.get("/export")
+async def export_reservations(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    date_from: Optional[date] = Query(None, description="First reservation day included"),
+    date_to: Optional[date] = Query(None, description="Last reservation day included"),
+    status: Optional[str] = None,
+    session_scope=Depends(get_session_scope),
+    current_user: User = Depends(get_streaming_admin_user)
+):
+    """Stream reservations as NDJSON or CSV in slot order, in constant memory (Admin only)."""
+    query = select(*RESERVATION_EXPORT_COLUMNS)
+    if date_from:
+        query = query.where(Reservation.date >= date_from)
+    if date_to:
+        query = query.where(Reservation.date <= date_to)
+    if status:
+        query = query.where(Reservation.status == status)
+    
+    columns = [column.key for column in RESERVATION_EXPORT_COLUMNS]
+    order = (Reservation.date, Reservation.time, Reservation.id)
+    return StreamingResponse(
+        stream_export(session_scope, query.order_by(*order), columns, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename("reservations", date_from, date_to, format)}"'},
+    )
+
+
 @router.patch("/{reservation_id}/status")
 async def update_reservation_status(
     reservation_id: int,
     status_data: dict,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update reservation status."""
     logger.info(f"🔄 Updating reservation {reservation_id} status to {status_data.get('status')}")
     
     try:
-        reservation = db.query(Reservation).filter(Reservation.id == reservation_id).first()
+        reservation = await db.get(Reservation, reservation_id)
         
         if not reservation:
             raise HTTPException(
@@ -229,8 +300,9 @@ async def update_reservation_status(
         if new_table_number:
             reservation.table_number = new_table_number
             
-        db.commit()
-        db.refresh(reservation)
+        await db.commit()
+        await db.refresh(reservation)
+        availability_index.record(reservation)
         
         logger.info(f"✅ Reservation {reservation_id} status updated to {new_status}")
         
@@ -244,7 +316,7 @@ async def update_reservation_status(
         raise
     except Exception as e:
         logger.error(f"❌ Failed to update reservation: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update reservation: {str(e)}"
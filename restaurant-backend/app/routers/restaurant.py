@@ -1,12 +1,17 @@
 # app/routers/restaurant.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Dict
 
-from app.database import get_db
+from app.database import get_db, get_session_scope
 from app.models import Restaurant, User, Order, MenuItem, OrderStatus
 from app.schemas import RestaurantUpdate, RestaurantResponse
 from app.utils.auth import get_admin_user
+from app.utils.stats_cache import stats_cache
+from app.pool_metrics import pool_metrics_snapshot
+from app.websocket import manager
 
 router = APIRouter()
 
@@ -55,30 +60,57 @@ async def update_restaurant_info(
     return restaurant
 
 
+async def load_restaurant_stats(db: AsyncSession) -> Dict:
+    """All dashboard counters in one round trip, using COUNT(*) FILTER (WHERE ...)."""
+    orders = select(
+        func.count().label("total_orders"),
+        func.count().filter(Order.status == OrderStatus.PENDING).label("pending_orders"),
+        func.count().filter(Order.status == OrderStatus.DELIVERED).label("completed_orders"),
+        func.coalesce(
+            func.sum(Order.total_amount).filter(Order.status == OrderStatus.DELIVERED), 0.0
+        ).label("total_revenue"),
+    ).select_from(Order).subquery()
+    menu_items = select(
+        func.count().label("total_menu_items"),
+        func.count().filter(MenuItem.is_available == True).label("available_items"),
+    ).select_from(MenuItem).subquery()
+    
+    row = (await db.execute(select(orders, menu_items))).one()
+    return {
+        "total_orders": row.total_orders,
+        "pending_orders": row.pending_orders,
+        "completed_orders": row.completed_orders,
+        "total_menu_items": row.total_menu_items,
+        "available_items": row.available_items,
+        "total_revenue": float(row.total_revenue)
+    }
+
+
 @router.get("/stats", response_model=Dict)
 async def get_restaurant_stats(
-    db: Session = Depends(get_db),
+    session_scope=Depends(get_session_scope),
     current_user: User = Depends(get_admin_user)
 ):
     """Get restaurant statistics (Admin only)."""
-    total_orders = db.query(Order).count()
-    pending_orders = db.query(Order).filter(Order.status == OrderStatus.PENDING).count()
-    completed_orders = db.query(Order).filter(Order.status == OrderStatus.DELIVERED).count()
-    total_menu_items = db.query(MenuItem).count()
-    available_items = db.query(MenuItem).filter(MenuItem.is_available == True).count()
-    
-    # Calculate total revenue from completed orders
-    total_revenue = db.query(Order).filter(
-        Order.status == OrderStatus.DELIVERED
-    ).with_entities(
-        db.func.sum(Order.total_amount)
-    ).scalar() or 0.0
-    
-    return {
-        "total_orders": total_orders,
-        "pending_orders": pending_orders,
-        "completed_orders": completed_orders,
-        "total_menu_items": total_menu_items,
-        "available_items": available_items,
-        "total_revenue": float(total_revenue)
-    }
+    return await stats_cache.get("restaurant_stats", load_restaurant_stats, session_scope)
+
+
+@router.get("/metrics/db-pool", response_model=Dict)
+async def get_db_pool_metrics(
+    reset: bool = Query(False, description="Zero the counters after reading them"),
+    current_user: User = Depends(get_admin_user)
+):
+    """Connection pool usage for this worker process (Admin only)."""
+    return pool_metrics_snapshot(reset)
+
+
+@router.get("/metrics/websocket", response_model=Dict)
+async def get_websocket_metrics(
+    reset: bool = Query(False, description="Zero the counters after reading them"),
+    current_user: User = Depends(get_admin_user)
+):
+    """WebSocket connections, send queue depths and drop counters for this worker (Admin only)."""
+    snapshot = manager.stats()
+    if reset:
+        manager.reset_stats()
+    return snapshot
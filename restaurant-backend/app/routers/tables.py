@@ -1,20 +1,22 @@
 # app/routers/tables.py
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import Table, User
 from app.schemas import TableCreate, TableUpdate, TableResponse
 from app.utils.auth import get_admin_user
+from app.utils.availability import availability_index
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[TableResponse])
-async def get_tables(db: Session = Depends(get_db)):
+async def get_tables(db: AsyncSession = Depends(get_async_db)):
     """Get all tables."""
-    tables = db.query(Table).all()
+    tables = (await db.scalars(select(Table))).all()
     
     # Convert datetime to string
     return [
@@ -34,12 +36,12 @@ async def get_tables(db: Session = Depends(get_db)):
 @router.post("/", response_model=None, status_code=status.HTTP_201_CREATED)
 async def create_table(
     table_data: TableCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_admin_user)
 ):
     """Create a new table (Admin only)."""
     # Check if table number already exists
-    existing = db.query(Table).filter(Table.number == table_data.number).first()
+    existing = await db.scalar(select(Table).where(Table.number == table_data.number))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -60,8 +62,9 @@ async def create_table(
     )
     
     db.add(db_table)
-    db.commit()
-    db.refresh(db_table)
+    await db.commit()
+    availability_index.invalidate_tables()
+    await db.refresh(db_table)
     
     return {
         "id": db_table.id,
@@ -75,9 +78,9 @@ async def create_table(
 
 
 @router.get("/{table_id}", response_model=None)
-async def get_table(table_id: int, db: Session = Depends(get_db)):
+async def get_table(table_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific table."""
-    table = db.query(Table).filter(Table.id == table_id).first()
+    table = await db.get(Table, table_id)
     if not table:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -99,11 +102,11 @@ async def get_table(table_id: int, db: Session = Depends(get_db)):
 async def update_table(
     table_id: int,
     table_data: TableUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_admin_user)
 ):
     """Update a table (Admin only)."""
-    table = db.query(Table).filter(Table.id == table_id).first()
+    table = await db.get(Table, table_id)
     if not table:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -113,10 +116,10 @@ async def update_table(
     # Update fields
     if table_data.number:
         # Check if new number already exists
-        existing = db.query(Table).filter(
+        existing = await db.scalar(select(Table).where(
             Table.number == table_data.number,
             Table.id != table_id
-        ).first()
+        ))
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -135,8 +138,9 @@ async def update_table(
     if table_data.status:
         table.status = table_data.status
     
-    db.commit()
-    db.refresh(table)
+    await db.commit()
+    availability_index.invalidate_tables()
+    await db.refresh(table)
     
     return {
         "id": table.id,
@@ -152,18 +156,19 @@ async def update_table(
 @router.delete("/{table_id}", response_model=None)
 async def delete_table(
     table_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_admin_user)
 ):
     """Delete a table (Admin only)."""
-    table = db.query(Table).filter(Table.id == table_id).first()
+    table = await db.get(Table, table_id)
     if not table:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Table not found"
         )
     
-    db.delete(table)
-    db.commit()
+    await db.delete(table)
+    await db.commit()
+    availability_index.invalidate_tables()
     
     return {"message": "Table deleted successfully"}
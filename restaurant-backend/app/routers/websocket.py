@@ -1,47 +1,33 @@
 # app/routers/websocket.py
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, Depends
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
 import logging
 
 from app.websocket import manager
-from app.config import settings
-from app.database import get_db
-from app.models import User
+from app.database import get_session_scope
+from app.utils.auth import authenticate_token
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-async def get_user_from_token(token: str, db: Session) -> User:
-    """Verify WebSocket token and get user."""
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        
-        user = db.query(User).filter(User.email == email).first()
-        return user
-    except JWTError:
-        return None
-
-
 @router.websocket("/ws")
 async def websocket_endpoint(
     websocket: WebSocket,
     token: str = Query(...),
-    db: Session = Depends(get_db)
+    session_scope=Depends(get_session_scope)
 ):
     """
     WebSocket endpoint for real-time updates.
     
     Connect with: ws://localhost:8000/api/ws?token=YOUR_JWT_TOKEN
+    
+    The token is checked against the principal cache, or with a session that is
+    closed before the socket is accepted, so open sockets hold no DB connection.
     """
     # Verify token and get user
-    user = await get_user_from_token(token, db)
+    user = await authenticate_token(token, session_scope)
     
-    if not user:
+    if not user or not user.is_active:
         await websocket.close(code=1008, reason="Invalid authentication token")
         return
     
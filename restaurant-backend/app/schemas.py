@@ -2,6 +2,7 @@ from datetime import datetime, date
 # app/schemas.py
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
+from app.config import settings
 from app.models import UserRole, OrderStatus
 
 # ============ AUTH SCHEMAS ============
@@ -168,7 +169,7 @@ class ReservationCreate(BaseModel):
     phone: str
     date: str  # Format: YYYY-MM-DD
     time: str
-    guests: int
+    guests: int = Field(..., ge=1, le=settings.RESERVATION_MAX_GUESTS)
     special_requests: Optional[str] = None
 
 class ReservationResponse(BaseModel):
@@ -2,7 +2,7 @@
 """
 Utility functions package.
 """
-from . import auth
+from . import auth, pagination
 
-__all__ = ["auth"]
+__all__ = ["auth", "pagination"]
 
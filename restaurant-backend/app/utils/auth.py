@@ -1,19 +1,24 @@
 # app/utils/auth.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.database import get_db
+from app.database import async_session_scope, get_async_db, get_session_scope
 from app.models import User
 from app.schemas import TokenData
+from app.utils.principal_cache import detached_copy, principal_cache
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -29,6 +34,56 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordWorkerPool:
+    """
+    Runs bcrypt work on a bounded thread pool instead of the event loop.
+    
+    At most `max_pending` hashes may be queued or running; beyond that callers
+    get a 429 so a login burst sheds load instead of building an unbounded queue.
+    """
+    
+    def __init__(self, workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+    
+    async def run(self, func: Callable, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many authentication requests, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+
+password_pool = PasswordWorkerPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password off the event loop.
+    
+    Returns (valid, new_hash); new_hash is set when the stored hash used a
+    different bcrypt cost than BCRYPT_ROUNDS and should be saved.
+    """
+    return await password_pool.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password off the event loop."""
+    return await password_pool.run(pwd_context.hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -60,29 +115,74 @@ def decode_access_token(token: str) -> TokenData:
         )
 
 
+def decode_token_subject(token: str) -> Optional[Tuple[str, Optional[float]]]:
+    """Return (email, expiry) from a valid JWT, or None."""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    email = payload.get("sub")
+    if email is None:
+        return None
+    return email, payload.get("exp")
+
+
+async def authenticate_token(token: str, session_scope: Callable = async_session_scope) -> Optional[User]:
+    """
+    Resolve a JWT to a detached User for long-lived connections (WebSockets).
+    
+    A principal cache hit needs no session; a miss opens one just for the
+    lookup, so nothing stays checked out of the pool while the socket is open.
+    """
+    token_key = principal_cache.key(token)
+    cached_user = principal_cache.get(token_key)
+    if cached_user is not None:
+        return cached_user
+    
+    subject = decode_token_subject(token)
+    if subject is None:
+        return None
+    email, expires_at = subject
+    
+    async with session_scope() as db:
+        user = await db.scalar(select(User).where(User.email == email))
+        if user is None:
+            return None
+        principal_cache.put(token_key, user, token_expires_at=expires_at)
+        return detached_copy(user)
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
-    """Get the current authenticated user from JWT token."""
+    """
+    Get the current authenticated user from JWT token.
+    
+    Verified tokens are served from the principal cache, which returns a
+    detached User; load the row into the request session before modifying it.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
+    token_key = principal_cache.key(token)
+    cached_user = principal_cache.get(token_key)
+    if cached_user is not None:
+        return cached_user
+    
+    subject = decode_token_subject(token)
+    if subject is None:
         raise credentials_exception
+    email, expires_at = subject
     
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
     if user is None:
         raise credentials_exception
     
+    principal_cache.put(token_key, user, token_expires_at=expires_at)
     return user
 
 
@@ -105,3 +205,50 @@ async def get_admin_user(
             detail="Not enough permissions"
         )
     return current_user
+
+
+def bearer_token(request: Request) -> Optional[str]:
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    return credentials if scheme.lower() == "bearer" else None
+
+
+async def get_streaming_admin_user(
+    request: Request,
+    session_scope: Callable = Depends(get_session_scope)
+) -> User:
+    """
+    Verify an admin for a streamed response (exports) from the Authorization header.
+    
+    Unlike get_admin_user this holds no request session, which would stay
+    checked out of the pool until the response finished streaming.
+    """
+    return await verify_streaming_admin(bearer_token(request), session_scope)
+
+
+async def get_event_stream_admin_user(
+    request: Request,
+    token: Optional[str] = Query(None, description="JWT for EventSource clients, which cannot set headers"),
+    session_scope: Callable = Depends(get_session_scope)
+) -> User:
+    """
+    get_streaming_admin_user that also takes the token from ?token=.
+    
+    Only for EventSource routes: query strings end up in access and proxy logs.
+    """
+    return await verify_streaming_admin(token or bearer_token(request), session_scope)
+
+
+async def verify_streaming_admin(token: Optional[str], session_scope: Callable) -> User:
+    user = await authenticate_token(token, session_scope) if token else None
+    if user is None or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return user
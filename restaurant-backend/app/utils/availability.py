@@ -0,0 +1,272 @@
+# app/utils/availability.py
+"""
+Reservation availability from an in-memory, per-day slot occupancy index.
+
+A booking holds one table for RESERVATION_DURATION_MINUTES from its start
+time. The day is cut into RESERVATION_SLOT_MINUTES slots, and for each
+slot the index keeps how many parties of each size are seated during it.
+A set of parties fits the tables when, for every party size k, the parties
+of k or more guests number no more than the tables seating k or more (the
+matching condition for "a party needs a table at least its size"). A
+booking that already has a table assigned counts as a party the size of
+that table.
+
+Days are loaded with one query the first time they are asked for, then
+updated in place as this worker creates, changes and cancels reservations.
+Each day is reloaded after RESERVATION_INDEX_REFRESH_SECONDS, which picks
+up bookings made through other workers. Table capacities are cached the
+same way and dropped whenever a table is changed.
+"""
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Reservation, Table
+
+# Reservations in these states no longer hold a table
+RELEASED_STATUSES = ("cancelled",)
+
+TIME_FORMAT = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*([AaPp][Mm])?\s*$")
+
+
+def parse_time(value: str) -> Optional[int]:
+    """Minutes after midnight for "19:30" or "7:30 PM", or None if unreadable."""
+    match = TIME_FORMAT.match(value or "")
+    if not match:
+        return None
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    if meridiem:
+        if not 1 <= hours <= 12:
+            return None
+        hours = hours % 12 + (12 if meridiem.lower() == "pm" else 0)
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+
+def format_time(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class TableCapacities:
+    """Answers "how many tables seat at least k guests"."""
+
+    def __init__(self, capacities: List[int], fallback_tables: int):
+        # Without configured tables, keep the old flat limit and ignore party size
+        self.fallback_tables = fallback_tables if not capacities else None
+        largest = max(capacities, default=0)
+        # Biggest party any table seats
+        self.largest = largest
+        counts = Counter(capacities)
+        # _at_least[k] = tables with capacity >= k, for k up to the largest table
+        self._at_least = [0] * (largest + 2)
+        for k in range(largest, 0, -1):
+            self._at_least[k] = self._at_least[k + 1] + counts[k]
+        self._at_least[0] = len(capacities)
+
+    def at_least(self, guests: int) -> int:
+        if self.fallback_tables is not None:
+            return self.fallback_tables
+        return self._at_least[guests] if guests < len(self._at_least) else 0
+
+
+class DayOccupancy:
+    """Parties seated per slot for one day, keyed for in-place updates."""
+
+    __slots__ = ("bookings", "slots", "loaded_at")
+
+    def __init__(self, loaded_at: float):
+        # reservation id -> (first slot, last slot + 1, party size)
+        self.bookings: Dict[int, Tuple[int, int, int]] = {}
+        # slot -> party size -> parties seated
+        self.slots: Dict[int, Counter] = {}
+        self.loaded_at = loaded_at
+
+    def add(self, reservation_id: int, span: Tuple[int, int], size: int):
+        self.remove(reservation_id)
+        self.bookings[reservation_id] = (span[0], span[1], size)
+        for slot in range(*span):
+            self.slots.setdefault(slot, Counter())[size] += 1
+
+    def remove(self, reservation_id: int):
+        booking = self.bookings.pop(reservation_id, None)
+        if booking is None:
+            return
+        first, end, size = booking
+        for slot in range(first, end):
+            parties = self.slots[slot]
+            parties[size] -= 1
+            if not parties[size]:
+                del parties[size]
+
+
+class AvailabilityIndex:
+    def __init__(
+        self,
+        slot_minutes: Optional[int] = None,
+        duration_minutes: Optional[int] = None,
+        max_days: Optional[int] = None,
+        refresh_seconds: Optional[float] = None,
+    ):
+        self.slot_minutes = settings.RESERVATION_SLOT_MINUTES if slot_minutes is None else slot_minutes
+        self.duration_minutes = settings.RESERVATION_DURATION_MINUTES if duration_minutes is None else duration_minutes
+        self.max_days = settings.RESERVATION_INDEX_MAX_DAYS if max_days is None else max_days
+        self.refresh_seconds = (
+            settings.RESERVATION_INDEX_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        )
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._days: "OrderedDict[date, DayOccupancy]" = OrderedDict()
+            self._tables: Optional[TableCapacities] = None
+            # table number -> capacity, for bookings with a table assigned
+            self._table_numbers: Dict[str, int] = {}
+            self.loads = 0
+            # Bumped by every recorded change; a day loaded across a change is not kept
+            self._generation = 0
+
+    def span(self, start_minutes: int) -> Tuple[int, int]:
+        """Slots a booking starting at start_minutes keeps its table for."""
+        end = start_minutes + self.duration_minutes
+        return start_minutes // self.slot_minutes, -(-end // self.slot_minutes)
+
+    def grid(self) -> List[int]:
+        """Bookable start times of a day, in minutes after midnight."""
+        first = parse_time(settings.RESERVATION_FIRST_SEATING)
+        last = parse_time(settings.RESERVATION_LAST_SEATING)
+        return list(range(first, last + 1, self.slot_minutes))
+
+    def _load_tables(self, session: Session) -> TableCapacities:
+        rows = session.execute(select(Table.number, Table.capacity)).all()
+        tables = TableCapacities([capacity for _, capacity in rows], settings.RESERVATION_FALLBACK_TABLES)
+        with self._lock:
+            self._tables = tables
+            self._table_numbers = {number: capacity for number, capacity in rows}
+        return tables
+
+    def _load_day(self, session: Session, day: date) -> DayOccupancy:
+        generation = self._generation
+        rows = session.execute(
+            select(Reservation.id, Reservation.time, Reservation.guests, Reservation.table_number)
+            .where(Reservation.date == day, Reservation.status.not_in(RELEASED_STATUSES))
+        ).all()
+        occupancy = DayOccupancy(time.monotonic())
+        with self._lock:
+            for reservation_id, start, guests, table_number in rows:
+                self._apply(occupancy, reservation_id, start, guests, table_number)
+            self.loads += 1
+            # Skip storing if a booking was recorded while the query ran (it may be missing)
+            if generation == self._generation:
+                self._days[day] = occupancy
+                self._days.move_to_end(day)
+                while len(self._days) > self.max_days:
+                    self._days.popitem(last=False)
+        return occupancy
+
+    def _ensure(self, session: Session, day: date) -> Tuple[TableCapacities, DayOccupancy]:
+        tables = self._tables or self._load_tables(session)
+        with self._lock:
+            occupancy = self._days.get(day)
+            if occupancy is not None:
+                self._days.move_to_end(day)
+        if occupancy is None or (
+            self.refresh_seconds and time.monotonic() - occupancy.loaded_at >= self.refresh_seconds
+        ):
+            occupancy = self._load_day(session, day)
+        return tables, occupancy
+
+    def _apply(self, occupancy: DayOccupancy, reservation_id: int, start: str, guests: int, table_number: Optional[str]):
+        minutes = parse_time(start)
+        if minutes is None:
+            occupancy.remove(reservation_id)
+            return
+        size = self._table_numbers.get(table_number) if table_number else None
+        occupancy.add(reservation_id, self.span(minutes), size or guests)
+
+    def record(self, reservation: Reservation):
+        """Apply a committed create / update / cancel to the days already loaded."""
+        with self._lock:
+            self._generation += 1
+            occupancy = self._days.get(reservation.date)
+            # Days not loaded yet pick the booking up when they are
+            if occupancy is None:
+                return
+            if reservation.status in RELEASED_STATUSES:
+                occupancy.remove(reservation.id)
+            else:
+                self._apply(occupancy, reservation.id, reservation.time, reservation.guests, reservation.table_number)
+
+    def invalidate_tables(self):
+        """Drop cached capacities, and the loaded days that sized assigned bookings by them."""
+        with self._lock:
+            self._generation += 1
+            self._tables = None
+            self._days.clear()
+
+    def _snapshot(self, occupancy: DayOccupancy, first: int, end: int) -> Dict[int, Dict[int, int]]:
+        """Copy of the parties seated in slots [first, end), so matching runs outside the lock."""
+        with self._lock:
+            return {slot: dict(occupancy.slots[slot]) for slot in range(first, end) if occupancy.slots.get(slot)}
+
+    def _remaining(self, tables: TableCapacities, slots: Dict[int, Dict[int, int]], start: int, guests: int) -> int:
+        """More parties of `guests` that fit at start without moving anyone."""
+        if tables.fallback_tables is not None:
+            # Every size has the same tables here, and parties of 1 or more counts everyone
+            sizes = range(1, 2)
+        elif guests > tables.largest:
+            return 0  # no table seats the party
+        else:
+            # Only thresholds up to the party size involve the new party
+            sizes = range(1, guests + 1)
+        remaining = None
+        for slot in range(*self.span(start)):
+            parties = slots.get(slot)
+            for k in sizes:
+                seated = sum(count for size, count in parties.items() if size >= k) if parties else 0
+                free = tables.at_least(k) - seated
+                remaining = free if remaining is None else min(remaining, free)
+        return max(0, remaining or 0)
+
+    def day_slots(self, session: Session, day: date, guests: int) -> List[dict]:
+        """Every bookable start time of day, with whether a party of `guests` fits."""
+        tables, occupancy = self._ensure(session, day)
+        grid = self.grid()
+        if not grid:
+            return []
+        slots = self._snapshot(occupancy, self.span(grid[0])[0], self.span(grid[-1])[1])
+        return [self._slot(tables, slots, start, guests) for start in grid]
+
+    def check(self, session: Session, day: date, start: str, guests: int) -> dict:
+        """Availability of a single start time."""
+        minutes = parse_time(start)
+        if minutes is None:
+            raise ValueError(f"Invalid time {start!r}. Use HH:MM")
+        tables, occupancy = self._ensure(session, day)
+        slots = self._snapshot(occupancy, *self.span(minutes))
+        return self._slot(tables, slots, minutes, guests)
+
+    def _slot(self, tables: TableCapacities, slots: Dict[int, Dict[int, int]], start: int, guests: int) -> dict:
+        remaining = self._remaining(tables, slots, start, guests)
+        return {"time": format_time(start), "available": remaining > 0, "remaining_tables": remaining}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "days": len(self._days),
+                "max_days": self.max_days,
+                "loads": self.loads,
+                "tables": len(self._table_numbers),
+            }
+
+
+# Global availability index instance
+availability_index = AvailabilityIndex()
@@ -0,0 +1,251 @@
+# app/utils/cooccurrence.py
+"""
+In-memory item co-occurrence index for "frequently bought together".
+
+For every pair of menu items the index counts how many orders contained
+both, next to how many orders contained each item. Those counts give, for a
+pair (a, b) over N orders:
+
+    support    = orders with a and b
+    confidence = support / orders with a
+    lift       = support * N / (orders with a * orders with b)
+
+Orders are added as they are committed by this worker. A full rebuild
+streams order_items once and swaps the new counts in, replaying orders
+committed while it ran, so lookups never wait on it. Every worker keeps its
+own index, first built in the background at startup; the periodic refresh
+picks up orders committed by other workers.
+"""
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import groupby
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import OrderItem
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip when streaming order_items during a rebuild
+REBUILD_BATCH_SIZE = 10000
+
+
+class Related(NamedTuple):
+    item_id: int
+    support: int
+    confidence: float
+    lift: float
+
+
+class CooccurrenceIndex:
+    def __init__(
+        self,
+        min_support: Optional[int] = None,
+        min_lift: Optional[float] = None,
+        refresh_seconds: Optional[int] = None,
+    ):
+        self.min_support = settings.COOCCURRENCE_MIN_SUPPORT if min_support is None else min_support
+        self.min_lift = settings.COOCCURRENCE_MIN_LIFT if min_lift is None else min_lift
+        self.refresh_seconds = settings.COOCCURRENCE_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.RLock()
+        self._refreshing = False
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.order_count = 0
+            self.built_at: Optional[float] = None
+            # item -> orders containing it
+            self._item_orders: Counter = Counter()
+            # item -> {partner -> orders containing both}; symmetric
+            self._pairs: Dict[int, Counter] = {}
+            # item -> partners ranked by support, rebuilt lazily after the item changes
+            self._ranked: Dict[int, List[Tuple[int, int]]] = {}
+            # Orders committed while a rebuild is streaming, replayed after the swap
+            self._pending: Optional[List[Tuple[int, Tuple[int, ...]]]] = None
+
+    @property
+    def built(self) -> bool:
+        return self.built_at is not None
+
+    def add_order(self, order_id: int, item_ids: Iterable[int]):
+        """Count one committed order."""
+        items = tuple(sorted(set(item_ids)))
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((order_id, items))
+            self._count(self._item_orders, self._pairs, items)
+            for item in items:
+                self._ranked.pop(item, None)
+            self.order_count += 1
+
+    @staticmethod
+    def _count(item_orders: Counter, pairs: Dict[int, Counter], items: Tuple[int, ...]):
+        for item in items:
+            item_orders[item] += 1
+            if item not in pairs:
+                pairs[item] = Counter()
+        for position, item in enumerate(items):
+            partners = pairs[item]
+            for other in items[position + 1:]:
+                partners[other] += 1
+                pairs[other][item] += 1
+
+    def related(
+        self,
+        item_id: int,
+        limit: int = 3,
+        min_support: Optional[int] = None,
+        min_lift: Optional[float] = None,
+    ) -> List[Related]:
+        """Top partners of item_id by support, keeping pairs at or above both thresholds."""
+        min_support = self.min_support if min_support is None else min_support
+        min_lift = self.min_lift if min_lift is None else min_lift
+        with self._lock:
+            ranked = self._ranked.get(item_id)
+            if ranked is None:
+                partners = self._pairs.get(item_id, {})
+                ranked = sorted(partners.items(), key=lambda pair: (-pair[1], pair[0]))
+                self._ranked[item_id] = ranked
+            item_orders = self._item_orders.get(item_id, 0)
+            total = self.order_count
+            results = []
+            for partner, support in ranked:
+                if support < min_support:
+                    break  # ranked by support, nothing further qualifies
+                lift = support * total / (item_orders * self._item_orders[partner])
+                if lift < min_lift:
+                    continue
+                results.append(Related(partner, support, support / item_orders, lift))
+                if len(results) == limit:
+                    break
+            return results
+
+    def popular(self, limit: int = 3) -> List[int]:
+        """Items in the most orders (the fallback when an item has no partners yet)."""
+        with self._lock:
+            return [item for item, _ in self._item_orders.most_common(limit)]
+
+    def item_order_counts(self) -> Dict[int, int]:
+        """Orders containing each item, as a plain dict."""
+        with self._lock:
+            return dict(self._item_orders)
+
+    def rebuild(self, session: Session, requested_at: Optional[float] = None) -> int:
+        """Recount every order from order_items and swap the result in. Returns the order count."""
+        def snapshot():
+            # Runs on the first next() inside rebuild_from, after it starts buffering new orders,
+            # so an order committed around the query lands in the snapshot, the buffer or both
+            rows = session.execute(
+                select(OrderItem.order_id, OrderItem.menu_item_id)
+                .order_by(OrderItem.order_id)
+                .execution_options(yield_per=REBUILD_BATCH_SIZE)
+            )
+            for order_id, group in groupby(rows, key=lambda row: row[0]):
+                yield order_id, [row[1] for row in group]
+
+        return self.rebuild_from(snapshot(), requested_at)
+
+    def rebuild_from(self, orders: Iterable[Tuple[int, Iterable[int]]], requested_at: Optional[float] = None) -> int:
+        """
+        Replace the counts with (order_id, item_ids) pairs in ascending order_id order.
+        A background refresh passes requested_at, and is dropped if another rebuild
+        finished after it was requested.
+        """
+        with self._rebuild_lock:
+            started = time.perf_counter()
+            with self._lock:
+                self._pending = []
+            item_orders: Counter = Counter()
+            pairs: Dict[int, Counter] = {}
+            order_count = 0
+            # Ids in the snapshot, ascending (8 bytes an order, dropped after the swap)
+            snapshot_ids = array("q")
+            try:
+                for order_id, item_ids in orders:
+                    self._count(item_orders, pairs, tuple(sorted(set(item_ids))))
+                    order_count += 1
+                    snapshot_ids.append(order_id)
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+
+            with self._lock:
+                if requested_at is not None and self.built_at is not None and self.built_at > requested_at:
+                    self._pending = None
+                    return self.order_count
+                # Orders committed after the snapshot was read are not in the new counts. Ids are
+                # assigned before commit, so a late commit can have a lower id than the snapshot's last
+                for order_id, items in self._pending:
+                    position = bisect_left(snapshot_ids, order_id)
+                    if position == len(snapshot_ids) or snapshot_ids[position] != order_id:
+                        self._count(item_orders, pairs, items)
+                        order_count += 1
+                self._pending = None
+                self._item_orders = item_orders
+                self._pairs = pairs
+                self._ranked = {}
+                self.order_count = order_count
+                self.built_at = time.monotonic()
+
+            logger.info(
+                f"🔗 Co-occurrence index rebuilt: {order_count} orders, "
+                f"{len(item_orders)} items in {time.perf_counter() - started:.2f}s"
+            )
+            return order_count
+
+    def ensure_fresh(self):
+        """
+        Start a background rebuild if the index was never built or is older
+        than refresh_seconds. Lookups never wait for it; they serve the
+        current counts meanwhile.
+        """
+        if self.built and (not self.refresh_seconds or time.monotonic() - self.built_at < self.refresh_seconds):
+            return
+        self.refresh_in_background()
+
+    def refresh_in_background(self) -> bool:
+        """Rebuild in a daemon thread on its own session, unless one is already running."""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+        threading.Thread(target=self._refresh, args=(time.monotonic(),), daemon=True).start()
+        return True
+
+    def _refresh(self, requested_at: float):
+        session = SessionLocal()
+        try:
+            self.rebuild(session, requested_at)
+        except Exception as e:
+            logger.error(f"❌ Co-occurrence index refresh failed: {str(e)}")
+        finally:
+            session.close()
+            with self._lock:
+                self._refreshing = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "orders": self.order_count,
+                "items": len(self._item_orders),
+                "pairs": sum(len(partners) for partners in self._pairs.values()) // 2,
+                "built": self.built_at is not None,
+                "age_seconds": round(time.monotonic() - self.built_at, 1) if self.built_at else None,
+                "min_support": self.min_support,
+                "min_lift": self.min_lift,
+            }
+
+
+# Global index instance
+cooccurrence_index = CooccurrenceIndex()
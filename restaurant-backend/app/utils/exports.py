@@ -0,0 +1,69 @@
+# app/utils/exports.py
+"""
+Streaming NDJSON / CSV exports for the admin accounting endpoints.
+
+Rows are read with a server-side cursor (yield_per) and encoded one batch at
+a time, so memory stays flat however many rows the date range covers. The
+session is opened when the response body starts streaming and closed when
+it ends, independent of the request's own session.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import date
+from typing import Any, AsyncIterator, Callable, Optional, Sequence
+
+from sqlalchemy.sql import Select
+
+from app.config import settings
+
+# format query value -> response media type
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def export_value(value: Any) -> Any:
+    """JSON/CSV-friendly form of a column value."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def encode_ndjson(columns: Sequence[str], rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, map(export_value, row))), ensure_ascii=False, separators=(",", ":")) + "\n"
+        for row in rows
+    )
+
+
+def encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([[export_value(value) for value in row] for row in rows])
+    return buffer.getvalue()
+
+
+async def stream_export(
+    session_scope: Callable,
+    statement: Select,
+    columns: Sequence[str],
+    format: str,
+    batch_size: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """Yield the rows of statement as NDJSON lines or CSV (with a header row), one batch per chunk."""
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    if format == "csv":
+        yield encode_csv([columns])
+    async with session_scope() as db:
+        result = await db.stream(statement.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield encode_csv(rows) if format == "csv" else encode_ndjson(columns, rows)
+
+
+def export_filename(name: str, date_from: Optional[date], date_to: Optional[date], format: str) -> str:
+    span = "-".join(d.isoformat() for d in (date_from, date_to) if d) or "all"
+    return f"{name}-{span}.{format}"
@@ -0,0 +1,171 @@
+# app/utils/menu_cache.py
+import gzip
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+
+from app.models import MenuItem, Category
+from app.schemas import MenuItemResponse, CategoryResponse
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip/identity bodies are served without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Distinct filter/page combinations kept rendered per catalog version (least recently used go first)
+MAX_RENDERED_BODIES = 256
+# Moderate levels: bodies are compressed on the request path, the first time an encoding is asked for
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+class EncodedBody:
+    """
+    A JSON payload rendered once, compressed per encoding on first request.
+    
+    Only the encodings clients actually negotiate are ever computed; each
+    is kept for later requests of the same body.
+    """
+    
+    def __init__(self, payload: Any, headers: Optional[Dict[str, str]] = None):
+        # Response headers that belong to this payload (e.g. X-Next-Cursor)
+        self.headers = headers or {}
+        # Same encoding FastAPI's JSONResponse uses
+        self.identity = json.dumps(
+            payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+    
+    @cached_property
+    def gzip(self) -> bytes:
+        return gzip.compress(self.identity, compresslevel=GZIP_LEVEL, mtime=0)
+    
+    @cached_property
+    def br(self) -> Optional[bytes]:
+        return brotli.compress(self.identity, quality=BROTLI_QUALITY) if brotli is not None else None
+    
+    def select(self, accept_encoding: str):
+        """Return (body, content_encoding) for an Accept-Encoding header value."""
+        accepted = set()
+        for part in accept_encoding.lower().split(","):
+            coding, _, params = part.strip().partition(";")
+            if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                accepted.add(coding.strip())
+        if brotli is not None and "br" in accepted:
+            return self.br, "br"
+        if "gzip" in accepted:
+            return self.gzip, "gzip"
+        return self.identity, None
+
+
+class LocalInvalidationChannel:
+    """
+    In-process stand-in for a cross-worker invalidation channel.
+    
+    A shared channel (e.g. Redis pub/sub or Postgres NOTIFY) only needs the same
+    two methods: publish() announces that the catalog changed, subscribe()
+    registers a callback that runs when any worker publishes.
+    """
+    
+    def __init__(self):
+        self._subscribers: List[Callable[[], None]] = []
+    
+    def publish(self):
+        for callback in list(self._subscribers):
+            callback()
+    
+    def subscribe(self, callback: Callable[[], None]):
+        self._subscribers.append(callback)
+
+
+class CatalogSnapshot:
+    """Serialized menu items and active categories for one catalog version."""
+    
+    def __init__(self, items: List[dict], categories: List[dict]):
+        self.items = items
+        self.categories = categories
+        digest = hashlib.sha1(json.dumps([items, categories], sort_keys=True).encode()).hexdigest()
+        # Derived from content so every worker agrees on the version of the same catalog
+        self.version = digest[:16]
+        self.etag = f'"menu-{self.version}"'
+        self._rendered: "OrderedDict[Hashable, EncodedBody]" = OrderedDict()
+    
+    def rendered(self, key: Hashable, build: Callable[[], EncodedBody]) -> EncodedBody:
+        """Return the encoded body for key, calling build() on first use."""
+        body = self._rendered.get(key)
+        if body is not None:
+            self._rendered.move_to_end(key)
+            return body
+        body = build()
+        self._rendered[key] = body
+        while len(self._rendered) > MAX_RENDERED_BODIES:
+            self._rendered.popitem(last=False)
+        return body
+
+
+class MenuCatalogCache:
+    """
+    Versioned in-memory copy of the menu catalog.
+    
+    The first read after an invalidation loads the catalog with one query per
+    table (concurrent first reads may each load it); later reads are served
+    from memory. Write endpoints call
+    invalidate() after committing, which also notifies other workers through
+    the invalidation channel.
+    """
+    
+    def __init__(self, channel: Optional[LocalInvalidationChannel] = None):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._generation = 0
+        self.channel = channel
+        if channel is not None:
+            channel.subscribe(self._drop)
+    
+    async def get(self, db: AsyncSession) -> CatalogSnapshot:
+        """Return the current catalog, loading it from the database if needed."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        
+        generation = self._generation
+        snapshot = await db.run_sync(self._load)
+        with self._lock:
+            # Skip storing if an invalidation raced with the load
+            if generation == self._generation:
+                self._snapshot = snapshot
+        return snapshot
+    
+    def invalidate(self):
+        """Drop the cached catalog here and in every worker sharing the channel."""
+        if self.channel is not None:
+            self.channel.publish()
+        else:
+            self._drop()
+    
+    def _drop(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+        logger.info("Menu catalog cache invalidated")
+    
+    @staticmethod
+    def _load(db: Session) -> CatalogSnapshot:
+        items = db.query(MenuItem).options(joinedload(MenuItem.category)).order_by(MenuItem.id).all()
+        categories = db.query(Category).filter(Category.is_active == True).order_by(Category.id).all()
+        return CatalogSnapshot(
+            items=[MenuItemResponse.model_validate(item).model_dump(mode="json") for item in items],
+            categories=[CategoryResponse.model_validate(c).model_dump(mode="json") for c in categories],
+        )
+
+
+# Global catalog cache instance
+menu_cache = MenuCatalogCache(channel=LocalInvalidationChannel())
@@ -0,0 +1,167 @@
+# app/utils/order_events.py
+"""
+Replayable log of order events for kitchen displays (Server-Sent Events).
+
+Every new_order / order_status_updated broadcast is appended to a bounded
+ring buffer with a monotonically increasing sequence number. Event ids are
+"<epoch>-<seq>", where the epoch is random per process. A display that
+reconnects with Last-Event-ID gets everything it missed in one response.
+When that is no longer possible, because the events aged out of the buffer
+or the id comes from another worker or an earlier run, it gets a "reset"
+event and refetches the order list instead.
+
+The log is fed from the WebSocket backplane, so each worker records the
+events of every worker (under its own ids).
+"""
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, List, Optional, Set, Tuple
+
+from app.config import settings
+
+# Reconnect delay suggested to EventSource clients, in milliseconds
+RETRY_MS = 3000
+
+
+def running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class OrderEventLog:
+    def __init__(self, size: Optional[int] = None):
+        self.size = settings.ORDER_EVENT_BUFFER_SIZE if size is None else size
+        self.epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        # (seq, payload) pairs, oldest first
+        self._events: Deque[Tuple[int, str]] = deque(maxlen=self.size)
+        self._last_seq = 0
+        # Streams waiting for the next event: (their loop, their wakeup event)
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    @property
+    def last_event_id(self) -> str:
+        return self.event_id(self._last_seq)
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def record(self, event: dict):
+        """Backplane handler: keep order events, ignore everything else."""
+        if event.get("order_event"):
+            self.append(event["payload"])
+
+    def append(self, payload: str) -> str:
+        """Append a serialized event and wake waiting streams; returns its id."""
+        with self._lock:
+            self._last_seq += 1
+            seq = self._last_seq
+            self._events.append((seq, payload))
+            waiters = list(self._waiters)
+        current = running_loop()
+        for loop, wakeup in waiters:
+            if loop is current:
+                wakeup.set()
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(wakeup.set)
+        return self.event_id(seq)
+
+    def after(self, seq: int) -> List[Tuple[int, str]]:
+        """Retained events with a sequence number above seq."""
+        with self._lock:
+            if not self._events or self._events[-1][0] <= seq:
+                return []
+            first = self._events[0][0]
+            return list(self._events)[max(0, seq + 1 - first):]
+
+    def resume_point(self, last_event_id: Optional[str]) -> Optional[int]:
+        """
+        Sequence number to replay after for a Last-Event-ID, or None when the
+        client missed events that cannot be replayed. No id means "from now".
+        """
+        if not last_event_id:
+            return self._last_seq
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        with self._lock:
+            oldest = self._events[0][0] if self._events else self._last_seq + 1
+            if seq > self._last_seq or seq < oldest - 1:
+                return None
+        return seq
+
+    async def stream(
+        self,
+        last_event_id: Optional[str],
+        follow: bool = True,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        heartbeat_seconds: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """Yield text/event-stream chunks: the missed events, then live ones if follow."""
+        heartbeat_seconds = settings.ORDER_EVENT_HEARTBEAT_SECONDS if heartbeat_seconds is None else heartbeat_seconds
+        wakeup = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), wakeup)
+        # Register before reading the backlog so nothing appended in between is missed
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            seq = self.resume_point(last_event_id)
+            if seq is None:
+                seq = self._last_seq
+                reset = json.dumps({"type": "reset", "reason": "missed events are no longer available"})
+                yield f"id: {self.event_id(seq)}\nevent: reset\ndata: {reset}\n\n"
+            elif not last_event_id:
+                # Data-less event: sets the client's Last-Event-ID for its next reconnect
+                yield f"id: {self.event_id(seq)}\n\n"
+
+            while True:
+                wakeup.clear()
+                events = self.after(seq)
+                if events and events[0][0] > seq + 1:
+                    # Fell behind by more than the buffer while a slow client was being written to
+                    seq = self._last_seq
+                    reset = json.dumps({"type": "reset", "reason": "stream fell behind"})
+                    yield f"id: {self.event_id(seq)}\nevent: reset\ndata: {reset}\n\n"
+                    continue
+                if events:
+                    seq = events[-1][0]
+                    yield "".join(f"id: {self.event_id(s)}\ndata: {payload}\n\n" for s, payload in events)
+                    continue
+                if not follow:
+                    return
+                if is_disconnected is not None and await is_disconnected():
+                    return
+                try:
+                    await asyncio.wait_for(wakeup.wait(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "epoch": self.epoch,
+                "last_event_id": self.event_id(self._last_seq),
+                "buffered": len(self._events),
+                "capacity": self.size,
+                "streams": len(self._waiters),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self._last_seq = 0
+            self.epoch = uuid.uuid4().hex[:8]  # ids handed out before the clear must not resume
+
+
+# Global event log instance
+order_events = OrderEventLog()
@@ -0,0 +1,96 @@
+# app/utils/order_numbers.py
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.models import OrderNumberSequence
+
+
+class OrderNumberAllocator:
+    """
+    Hands out per-day order sequence numbers.
+    
+    Values come from the order_number_sequences counter table. Each DB round
+    trip atomically reserves a block of `block_size` values (UPDATE ... RETURNING
+    on the day's row), which this process then hands out from memory. Blocks
+    never overlap, so numbers stay unique across workers without retries; values
+    left in a block when a worker exits are simply skipped.
+    """
+    
+    def __init__(self, block_size: Optional[int] = None):
+        self.block_size = block_size or settings.ORDER_NUMBER_BLOCK_SIZE
+        self._lock = threading.Lock()
+        # day -> reserved (next value, last value) ranges, oldest first
+        self._blocks: Dict[date, List[List[int]]] = {}
+    
+    def next_value(self, bind: Engine, day: date) -> int:
+        """
+        Return the next sequence value for day.
+        
+        The lock only guards the in-memory blocks; reserving a new block happens
+        outside it, so callers that run this inside an async session's run_sync
+        never hold the lock across I/O. If two callers refill at once, both
+        blocks are kept and used.
+        
+        bind should not be the engine whose pool the caller already holds a
+        connection from (see database.sequence_engine): with the pool exhausted,
+        concurrent refills would each wait for a second connection.
+        """
+        value = self._take(day)
+        while value is None:
+            self._add_block(day, self._reserve_block(bind, day))
+            value = self._take(day)
+        return value
+    
+    def reset(self):
+        """Forget reserved blocks (e.g. after the counter table was recreated)."""
+        with self._lock:
+            self._blocks = {}
+    
+    def _take(self, day: date) -> Optional[int]:
+        with self._lock:
+            blocks = self._blocks.get(day, [])
+            while blocks and blocks[0][0] > blocks[0][1]:
+                blocks.pop(0)
+            if not blocks:
+                return None
+            value = blocks[0][0]
+            blocks[0][0] += 1
+            return value
+    
+    def _add_block(self, day: date, block_end: int):
+        with self._lock:
+            # Blocks from previous days are never used again
+            self._blocks = {d: b for d, b in self._blocks.items() if d == day}
+            self._blocks.setdefault(day, []).append([block_end - self.block_size + 1, block_end])
+    
+    def _reserve_block(self, bind: Engine, day: date) -> int:
+        """Reserve the next block for day in its own transaction and return its last value."""
+        table = OrderNumberSequence.__table__
+        with bind.begin() as conn:
+            dialect_insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+            conn.execute(
+                dialect_insert(table)
+                .values(day=day, last_value=0)
+                .on_conflict_do_nothing(index_elements=[table.c.day])
+            )
+            return conn.execute(
+                update(table)
+                .where(table.c.day == day)
+                .values(last_value=table.c.last_value + self.block_size)
+                .returning(table.c.last_value)
+            ).scalar_one()
+
+
+# Global allocator instance
+order_number_allocator = OrderNumberAllocator()
+
+
+def format_order_number(day: date, value: int) -> str:
+    """Format a sequence value as ORD-YYYYMMDD-NNNN."""
+    return f"ORD-{day.strftime('%Y%m%d')}-{value:04d}"
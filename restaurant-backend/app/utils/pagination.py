@@ -0,0 +1,51 @@
+# app/utils/pagination.py
+import base64
+import json
+from datetime import date
+from typing import Any, Callable, List, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode keyset values (e.g. created_at, id) into an opaque cursor string."""
+    raw = [v.isoformat() if isinstance(v, date) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *parsers: Callable[[Any], Any]) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Each value is passed through the matching parser (e.g. datetime.fromisoformat,
+    int). Raises 400 if the cursor is malformed or has the wrong shape.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError("unexpected cursor shape")
+        return [parse(value) for parse, value in zip(parsers, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def keyset_after(columns: Sequence[Any], values: Sequence[Any], descending: bool = True):
+    """
+    WHERE clause for the rows that follow `values` in (columns) order.
+    
+    For (created_at, id) descending this is created_at < x OR (created_at = x
+    AND id < y). The extra bound on the leading column lets the database start
+    its index range at the cursor instead of filtering every newer row.
+    """
+    clauses = []
+    for position, column in enumerate(columns):
+        equal = [c == v for c, v in zip(columns[:position], values[:position])]
+        beyond = column < values[position] if descending else column > values[position]
+        clauses.append(and_(*equal, beyond))
+    leading = columns[0] <= values[0] if descending else columns[0] >= values[0]
+    return and_(leading, or_(*clauses))
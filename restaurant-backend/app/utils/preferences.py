@@ -0,0 +1,176 @@
+# app/utils/preferences.py
+"""
+Per-user preference profiles for personalized recommendations.
+
+A profile is the quantity of each menu item a customer has ordered. It is
+loaded with one grouped query the first time a user is scored, kept in a
+bounded LRU, and updated in place when that user's orders are committed.
+Profiles are reloaded after PREFERENCE_CACHE_TTL_SECONDS, which picks up
+orders committed through other workers.
+Category affinity is derived from the profile at scoring time using the
+cached catalog, so moving an item to another category needs no profile
+rebuild.
+"""
+import heapq
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Order, OrderItem
+
+# Weight of global popularity relative to category affinity (both normalized to 0..1)
+POPULARITY_WEIGHT = 0.25
+# Among items the user already ordered, favour the ones they order most
+ITEM_AFFINITY_WEIGHT = 0.1
+
+
+class UserProfile:
+    __slots__ = ("item_quantities", "last_order_id", "loaded_at")
+
+    def __init__(self, item_quantities: Counter, last_order_id: int, loaded_at: Optional[float] = None):
+        self.item_quantities = item_quantities
+        # Orders up to this id are already counted (loaded or applied)
+        self.last_order_id = last_order_id
+        self.loaded_at = time.monotonic() if loaded_at is None else loaded_at
+
+
+class PreferenceProfiles:
+    """Bounded LRU of user profiles, kept current as orders are committed."""
+
+    def __init__(self, max_size: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_size = settings.PREFERENCE_CACHE_MAX_SIZE if max_size is None else max_size
+        self.ttl_seconds = settings.PREFERENCE_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[int, UserProfile]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_cached(self, user_id: int) -> Optional[UserProfile]:
+        """Return the cached profile without touching the database, or None.
+        
+        Only hits are counted here; get() counts the miss when it loads.
+        """
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is not None and self.ttl_seconds and time.monotonic() - profile.loaded_at >= self.ttl_seconds:
+                # Expired: reload so orders placed through other workers are counted
+                del self._profiles[user_id]
+                profile = None
+            if profile is None:
+                return None
+            self._profiles.move_to_end(user_id)
+            self.hits += 1
+            return profile
+
+    def get(self, session: Session, user_id: int) -> UserProfile:
+        """Return the user's profile, loading it with one grouped query on a miss."""
+        profile = self.get_cached(user_id)
+        if profile is not None:
+            return profile
+        with self._lock:
+            self.misses += 1
+
+        rows = session.execute(
+            select(OrderItem.menu_item_id, func.sum(OrderItem.quantity), func.max(Order.id))
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(Order.customer_id == user_id)
+            .group_by(OrderItem.menu_item_id)
+        ).all()
+        profile = UserProfile(
+            Counter({item_id: quantity for item_id, quantity, _ in rows}),
+            max((last for _, _, last in rows), default=0),
+        )
+        with self._lock:
+            # A concurrent load may have stored a profile that already counts newer orders
+            current = self._profiles.get(user_id)
+            if current is not None and current.last_order_id >= profile.last_order_id:
+                return current
+            self._store(user_id, profile)
+        return profile
+
+    def record_order(self, user_id: int, order_id: int, items: Iterable[Tuple[int, int]]):
+        """Add a committed order's (menu_item_id, quantity) pairs to a cached profile."""
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            # Uncached users pick the order up when their profile is next loaded
+            if profile is None or order_id <= profile.last_order_id:
+                return
+            for item_id, quantity in items:
+                profile.item_quantities[item_id] += quantity
+            profile.last_order_id = order_id
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._profiles.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _store(self, user_id: int, profile: UserProfile):
+        if self.max_size <= 0:
+            return
+        self._profiles[user_id] = profile
+        self._profiles.move_to_end(user_id)
+        while len(self._profiles) > self.max_size:
+            self._profiles.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._profiles),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def score_items(
+    catalog_items: List[dict],
+    profile: UserProfile,
+    popularity: Dict[int, int],
+    limit: int = 5,
+) -> List[dict]:
+    """
+    Rank available catalog items for one user in a single pass.
+
+    score = share of the user's quantity in the item's category
+          + ITEM_AFFINITY_WEIGHT * share of the user's quantity on the item itself
+          + POPULARITY_WEIGHT * orders containing the item / orders of the top seller
+
+    Items the user already ordered are ranked after everything new to them.
+    """
+    quantities = profile.item_quantities
+    category_of = {item["id"]: item["category_id"] for item in catalog_items}
+    category_quantities: Counter = Counter()
+    for item_id, quantity in quantities.items():
+        category_id = category_of.get(item_id)
+        if category_id is not None:
+            category_quantities[category_id] += quantity
+    total_quantity = sum(quantities.values()) or 1
+    top_popularity = max(popularity.values(), default=0) or 1
+
+    scored = []
+    for item in catalog_items:
+        if not item["is_available"]:
+            continue
+        item_id = item["id"]
+        score = (
+            category_quantities[item["category_id"]] / total_quantity
+            + ITEM_AFFINITY_WEIGHT * quantities.get(item_id, 0) / total_quantity
+            + POPULARITY_WEIGHT * popularity.get(item_id, 0) / top_popularity
+        )
+        scored.append((item_id in quantities, -score, item_id, item))
+    return [entry[3] for entry in heapq.nsmallest(limit, scored, key=lambda entry: entry[:3])]
+
+
+# Global profile cache instance
+preference_profiles = PreferenceProfiles()
@@ -0,0 +1,164 @@
+# app/utils/principal_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.config import settings
+from app.models import User
+
+
+class PrincipalCache:
+    """
+    Bounded TTL/LRU cache of users resolved from verified JWTs.
+    
+    Entries are keyed by a hash of the token and hold a detached copy of the
+    User row, so authenticated requests can skip the per-request User lookup.
+    An entry lives until the earlier of the TTL and the token's own expiry.
+    
+    Invalidation is per process: a change to a user committed through this
+    worker's sessions (including bulk update/delete statements on users) drops
+    its entries at once, but other workers, and writes made outside the app,
+    are only seen when their entries expire. A deactivated or demoted user can
+    therefore keep their previous access on other workers for up to
+    PRINCIPAL_CACHE_TTL_SECONDS.
+    """
+    
+    def __init__(self, ttl_seconds: Optional[int] = None, max_size: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.PRINCIPAL_CACHE_TTL_SECONDS
+        self.max_size = max_size if max_size is not None else settings.PRINCIPAL_CACHE_MAX_SIZE
+        self._lock = threading.Lock()
+        # token hash -> (user, expires_at)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def get(self, key: str) -> Optional[User]:
+        """Return the cached user for a token hash, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return user
+    
+    def put(self, key: str, user: User, token_expires_at: Optional[float] = None):
+        """Cache a detached copy of user for a token hash."""
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        principal = detached_copy(user)
+        
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (principal, expires_at)
+            self._tokens_by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def invalidate_user(self, user_id: int):
+        """Drop every cached token for a user."""
+        with self._lock:
+            for key in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(key)
+            self.invalidations += 1
+    
+    def invalidate_all(self):
+        """Drop every cached token (e.g. after a bulk change to users)."""
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+            self.invalidations += 1
+    
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+    
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._tokens_by_user.get(entry[0].id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tokens_by_user[entry[0].id]
+
+
+def detached_copy(user: User) -> User:
+    """Copy a User's column values into a new detached instance, independent of any session."""
+    values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+    copy = User(**values)
+    make_transient_to_detached(copy)
+    return copy
+
+
+# Global principal cache instance
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    """Remember users changed in this transaction (role, is_active, email, ...)."""
+    changed = {obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault("principal_cache_stale", set()).update(changed)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_user_changes(orm_execute_state):
+    """Bulk update(User) / delete(User) statements skip the flush; which users they touch is unknown."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is User:
+        orm_execute_state.session.info["principal_cache_stale_all"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    if session.info.pop("principal_cache_stale_all", False):
+        principal_cache.invalidate_all()
+    for user_id in session.info.pop("principal_cache_stale", ()):
+        principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changed_users(session, previous_transaction):
+    session.info.pop("principal_cache_stale", None)
+    session.info.pop("principal_cache_stale_all", None)
@@ -0,0 +1,114 @@
+# app/utils/sales_rollup.py
+"""
+Incrementally maintained daily_sales rollup.
+
+Order writes update the day's row inside their own transaction, so analytics
+reads O(days) rows instead of scanning orders. The day is always computed in
+SQL as date(orders.created_at), the same expression the backfill groups by,
+so incremental updates and rebuilds agree.
+"""
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import case, delete, func, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import DailySales, Order, OrderItem, OrderStatus
+
+COUNTER_COLUMNS = ("order_count", "revenue", "item_count")
+
+
+def status_column(order_status: OrderStatus) -> str:
+    return f"{OrderStatus(order_status).value}_count"
+
+
+STATUS_COLUMNS = tuple(status_column(s) for s in OrderStatus)
+
+
+def _dialect_insert(dialect_name: str):
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+
+def _order_day(order_id: int):
+    return select(func.date(Order.created_at)).where(Order.id == order_id).scalar_subquery()
+
+
+async def record_order_created(db, order_id: int):
+    """
+    Add a freshly inserted order (and its already flushed items) to its day.
+
+    Run this last before commit: the upsert locks the day's row until the
+    transaction ends.
+    """
+    item_count = (
+        select(func.coalesce(func.sum(OrderItem.quantity), 0))
+        .where(OrderItem.order_id == order_id)
+        .scalar_subquery()
+    )
+    columns = ["day", *COUNTER_COLUMNS, *STATUS_COLUMNS]
+    source = select(
+        func.date(Order.created_at),
+        literal(1),
+        Order.total_amount,
+        item_count,
+        *[case((Order.status == s, 1), else_=0) for s in OrderStatus],
+    ).where(Order.id == order_id)
+
+    table = DailySales.__table__
+    stmt = _dialect_insert(db.get_bind().dialect.name)(table).from_select(columns, source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.day],
+        set_={name: table.c[name] + stmt.excluded[name] for name in columns[1:]},
+    )
+    await db.execute(stmt)
+
+
+async def record_status_change(db, order_id: int, old_status: OrderStatus, new_status: OrderStatus):
+    """Move one order between per-status counters of its day."""
+    if OrderStatus(old_status) == OrderStatus(new_status):
+        return
+    old_column = getattr(DailySales, status_column(old_status))
+    new_column = getattr(DailySales, status_column(new_status))
+    await db.execute(
+        update(DailySales)
+        .where(DailySales.day == _order_day(order_id))
+        .values({old_column: old_column - 1, new_column: new_column + 1})
+    )
+
+
+def rebuild_daily_sales(session: Session, since: Optional[date] = None) -> int:
+    """
+    Recompute daily_sales from orders (all days, or days >= since) and commit.
+
+    Returns the number of day rows written.
+    """
+    day = func.date(Order.created_at)
+    items = (
+        select(OrderItem.order_id, func.sum(OrderItem.quantity).label("quantity"))
+        .group_by(OrderItem.order_id)
+        .subquery()
+    )
+    source = (
+        select(
+            day,
+            func.count(Order.id),
+            func.coalesce(func.sum(Order.total_amount), 0.0),
+            func.coalesce(func.sum(items.c.quantity), 0),
+            *[func.sum(case((Order.status == s, 1), else_=0)) for s in OrderStatus],
+        )
+        .outerjoin(items, items.c.order_id == Order.id)
+        .group_by(day)
+    )
+    clear = delete(DailySales)
+    if since is not None:
+        source = source.where(day >= since)
+        clear = clear.where(DailySales.day >= since)
+
+    table = DailySales.__table__
+    session.execute(clear)
+    result = session.execute(
+        table.insert().from_select(["day", *COUNTER_COLUMNS, *STATUS_COLUMNS], source)
+    )
+    session.commit()
+    return result.rowcount
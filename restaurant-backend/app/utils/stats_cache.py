@@ -0,0 +1,99 @@
+# app/utils/stats_cache.py
+"""
+Stale-while-revalidate cache for dashboard counters.
+
+A value younger than the TTL is served as is. Once it is older, the stale
+value is still served while one background task reloads it, so polling
+dashboards never wait on the database. Only a missing value, or one older
+than TTL + stale window, makes the caller wait, and concurrent callers
+share that single load. Every load opens its own session: a shared load
+can outlive the request that started it.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.config import settings
+from app.database import async_session_scope
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[Any], Awaitable[Any]]
+
+
+class StaleWhileRevalidateCache:
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        stale_seconds: Optional[float] = None,
+        session_scope=async_session_scope,
+    ):
+        self.ttl_seconds = settings.STATS_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.stale_seconds = settings.STATS_CACHE_STALE_SECONDS if stale_seconds is None else stale_seconds
+        # Loads can outlive the request that started them, so they open their own session
+        self.session_scope = session_scope
+        # key -> (value, loaded_at)
+        self._values: Dict[Hashable, tuple] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get(self, key: Hashable, load: Loader, session_scope=None):
+        """
+        Return the value for key, calling load(session) when it is missing or stale.
+        session_scope overrides the one given at construction (get_session_scope in routers).
+        """
+        session_scope = session_scope or self.session_scope
+        entry = self._values.get(key)
+        if entry is not None:
+            value, loaded_at = entry
+            age = time.monotonic() - loaded_at
+            if age < self.ttl_seconds:
+                self.hits += 1
+                return value
+            if age < self.ttl_seconds + self.stale_seconds:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._inflight[key] = asyncio.ensure_future(self._refresh(key, load, value, session_scope))
+                return value
+
+        self.misses += 1
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        future = asyncio.ensure_future(self._load(key, load, session_scope))
+        self._inflight[key] = future
+        return await asyncio.shield(future)
+
+    async def _load(self, key: Hashable, load: Loader, session_scope):
+        try:
+            async with session_scope() as session:
+                value = await load(session)
+            self._values[key] = (value, time.monotonic())
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _refresh(self, key: Hashable, load: Loader, stale_value, session_scope):
+        try:
+            return await self._load(key, load, session_scope)
+        except Exception as e:
+            # Keep serving the stale value; the next request past the TTL retries
+            logger.error(f"❌ Stats refresh for {key!r} failed: {str(e)}")
+            return stale_value
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
+
+    def clear(self):
+        self._values.clear()
+        self.hits = self.stale_hits = self.misses = 0
+
+
+# Global cache for admin dashboard counters
+stats_cache = StaleWhileRevalidateCache()
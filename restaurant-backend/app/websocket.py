@@ -1,112 +1,369 @@
 # app/websocket.py
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List, Set
+from collections import deque
+from typing import Deque, Dict, Hashable, Iterable, List, Optional, Set
+import asyncio
 import json
 import logging
 
+from app.backplane import InMemoryBackplane, create_backplane
+from app.config import settings
+from app.models import UserRole
+from app.utils.order_events import order_events
+
 logger = logging.getLogger(__name__)
 
+# Close code for evicted slow consumers ("try again later"); clients reconnect
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# What a full send queue does with one more message
+DROP_OLDEST = "drop_oldest"  # Discard the oldest queued message
+COALESCE = "coalesce"  # Replace a queued update for the same order, else drop the oldest
+DISCONNECT = "disconnect"  # Evict the client; it reconnects and refetches
+QUEUE_POLICIES = (DROP_OLDEST, COALESCE, DISCONNECT)
+
+# Roles a connection can register under (one per user role)
+ROLES = tuple(role.value for role in UserRole)
+
+
+def running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def serialize(message: dict) -> str:
+    """Encode a message once for every recipient (same format as WebSocket.send_json)."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class Connection:
+    """
+    One client socket with a bounded outbound queue drained by its own writer task.
+
+    Queue entries are [coalesce key, payload] lists; under the coalesce policy
+    a newer update for the same key overwrites the payload of the queued entry,
+    keeping its place in line.
+    """
+
+    def __init__(self, websocket: WebSocket, role: str, max_queue: int, policy: str):
+        self.websocket = websocket
+        self.role = role
+        self.max_queue = max_queue
+        self.policy = policy
+        self.queue: Deque[list] = deque()
+        self._keyed: Dict[Hashable, list] = {}
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.writer: Optional[asyncio.Task] = None
+        # Orders this socket is subscribed to (reverse of order_subscriptions)
+        self.orders: Set[int] = set()
+        self.timeouts = 0  # Consecutive send timeouts
+        self.dropped = 0
+        self.coalesced = 0
+
+    def enqueue(self, payload: str, key: Optional[Hashable] = None) -> bool:
+        """Queue a payload; returns False when the policy says to disconnect instead."""
+        if key is not None and self.policy == COALESCE:
+            entry = self._keyed.get(key)
+            if entry is not None:
+                entry[1] = payload
+                self.coalesced += 1
+                return True
+        if len(self.queue) >= self.max_queue:
+            if self.policy == DISCONNECT:
+                return False
+            oldest = self.queue.popleft()
+            if oldest[0] is not None and self._keyed.get(oldest[0]) is oldest:
+                del self._keyed[oldest[0]]
+            self.dropped += 1
+        entry = [key, payload]
+        self.queue.append(entry)
+        if key is not None and self.policy == COALESCE:
+            self._keyed[key] = entry
+        self.idle.clear()
+        if self.loop is running_loop():
+            self.wakeup.set()
+        else:
+            # Published from another event loop (thread); wake the writer on its own loop
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+        return True
+
+    def pop(self) -> str:
+        key, payload = entry = self.queue.popleft()
+        if key is not None and self._keyed.get(key) is entry:
+            del self._keyed[key]
+        return payload
+
 
 class ConnectionManager:
-    """Manages WebSocket connections for real-time updates."""
-    
-    def __init__(self):
+    """
+    Manages WebSocket connections for real-time updates.
+
+    A broadcast is serialized once and appended to each target's bounded send
+    queue, so publishing never waits on a socket. Every connection has a
+    writer task that sends its queue in order, each send bounded by the send
+    timeout; a client that times out max_timeouts sends in a row is evicted.
+    A full queue applies the queue policy, so memory per client stays bounded
+    however long a client stalls.
+
+    broadcast_* go through the backplane, which hands every event to deliver()
+    on each worker, so a kitchen display connected to another uvicorn worker
+    sees orders created here.
+    """
+
+    def __init__(
+        self,
+        send_timeout: Optional[float] = None,
+        max_timeouts: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        policy: Optional[str] = None,
+        backplane=None,
+    ):
+        self.send_timeout = settings.WS_SEND_TIMEOUT_SECONDS if send_timeout is None else send_timeout
+        self.max_timeouts = settings.WS_SLOW_CONSUMER_MAX_TIMEOUTS if max_timeouts is None else max_timeouts
+        self.max_queue = settings.WS_SEND_QUEUE_SIZE if max_queue is None else max_queue
+        self.policy = settings.WS_SEND_QUEUE_POLICY if policy is None else policy
+        if self.policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown WebSocket queue policy {self.policy!r}; expected one of {QUEUE_POLICIES}")
         # Store active connections by role
-        self.active_connections: Dict[str, Set[WebSocket]] = {
-            "admin": set(),
-            "customer": set(),
-            "all": set()
-        }
+        self.active_connections: Dict[str, Set[WebSocket]] = {role: set() for role in ROLES + ("all",)}
+        # Queue and writer of each connected socket
+        self.connections: Dict[WebSocket, Connection] = {}
         # Map order IDs to customer connections
         self.order_subscriptions: Dict[int, Set[WebSocket]] = {}
-    
+        # Close handshakes of evicted sockets, kept referenced until they finish
+        self._closing: Set[asyncio.Task] = set()
+        self.backplane = InMemoryBackplane() if backplane is None else backplane
+        self.backplane.subscribe(self.deliver)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.messages = 0
+        self.sends = 0
+        self.send_timeouts = 0
+        self.send_errors = 0
+        self.evictions = 0
+        # Counts of connections that already disconnected; live ones are added in stats()
+        self._dropped = 0
+        self._coalesced = 0
+        for connection in self.connections.values():
+            connection.dropped = connection.coalesced = 0
+
     async def connect(self, websocket: WebSocket, role: str = "customer"):
         """Accept and store a new WebSocket connection."""
+        # Checked before anything is registered or started for the socket
+        if role not in ROLES:
+            raise ValueError(f"Unknown WebSocket role {role!r}; expected one of {ROLES}")
         await websocket.accept()
+        connection = Connection(websocket, role, self.max_queue, self.policy)
+        connection.writer = asyncio.create_task(self._write(connection))
+        self.connections[websocket] = connection
         self.active_connections[role].add(websocket)
         self.active_connections["all"].add(websocket)
         logger.info(f"New {role} connection. Total: {len(self.active_connections['all'])}")
-    
-    def disconnect(self, websocket: WebSocket, role: str = "customer"):
-        """Remove a WebSocket connection."""
+
+    def disconnect(self, websocket: WebSocket, role: Optional[str] = None):
+        """Remove a WebSocket connection (safe to call more than once)."""
+        connection = self.connections.pop(websocket, None)
+        if connection is None:
+            return
+        role = connection.role
         self.active_connections[role].discard(websocket)
         self.active_connections["all"].discard(websocket)
-        
-        # Clean up order subscriptions
-        for order_id, subscribers in list(self.order_subscriptions.items()):
-            subscribers.discard(websocket)
-            if not subscribers:
-                del self.order_subscriptions[order_id]
-        
+        self._dropped += connection.dropped
+        self._coalesced += connection.coalesced
+        connection.queue.clear()
+        loop = running_loop()
+        if connection.writer is not None and connection.writer is not (loop and asyncio.current_task()):
+            if connection.loop is loop:
+                connection.writer.cancel()
+            else:
+                connection.loop.call_soon_threadsafe(connection.writer.cancel)
+
+        # Clean up this socket's own order subscriptions
+        for order_id in connection.orders:
+            subscribers = self.order_subscriptions.get(order_id)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self.order_subscriptions[order_id]
+
         logger.info(f"{role} disconnected. Remaining: {len(self.active_connections['all'])}")
-    
+
     def subscribe_to_order(self, websocket: WebSocket, order_id: int):
         """Subscribe a connection to specific order updates."""
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return
         if order_id not in self.order_subscriptions:
             self.order_subscriptions[order_id] = set()
         self.order_subscriptions[order_id].add(websocket)
-    
+        connection.orders.add(order_id)
+
+    def release_order(self, order_id: int):
+        """Drop every subscription to an order that will get no more updates."""
+        for websocket in self.order_subscriptions.pop(order_id, ()):
+            connection = self.connections.get(websocket)
+            if connection is not None:
+                connection.orders.discard(order_id)
+
     async def send_personal_message(self, message: dict, websocket: WebSocket):
-        """Send a message to a specific connection."""
+        """Send a message to a specific connection (behind anything already queued for it)."""
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            self._enqueue(connection, serialize(message))
+            return
         try:
             await websocket.send_json(message)
         except Exception as e:
             logger.error(f"Error sending personal message: {e}")
-    
+
     async def broadcast_to_role(self, message: dict, role: str):
         """Broadcast message to all connections of a specific role."""
-        disconnected = set()
-        
-        for connection in self.active_connections[role]:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to {role}: {e}")
-                disconnected.add(connection)
-        
-        # Clean up disconnected clients
-        for conn in disconnected:
-            self.disconnect(conn, role)
-    
-    async def broadcast_order_update(self, order_id: int, message: dict):
-        """Broadcast order updates to subscribed connections and all admins."""
-        disconnected = set()
-        
-        # Send to order subscribers
-        if order_id in self.order_subscriptions:
-            for connection in self.order_subscriptions[order_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error sending order update: {e}")
-                    disconnected.add(connection)
-        
-        # Always send to admins
-        await self.broadcast_to_role(message, "admin")
-        
-        # Clean up disconnected clients
-        for conn in disconnected:
-            self.disconnect(conn)
-    
+        await self.backplane.publish({"kind": "role", "role": role, "payload": serialize(message)})
+
+    async def broadcast_order_update(self, order_id: int, message: dict, final: bool = False):
+        """
+        Broadcast order updates to subscribed connections and all admins.
+        final=True (delivered/cancelled) releases the order's subscriptions once queued.
+        """
+        await self.backplane.publish({
+            "kind": "order", "order_id": order_id, "final": final, "order_event": True, "payload": serialize(message)
+        })
+
     async def broadcast_new_order(self, message: dict):
         """Broadcast new order notification to all admins."""
-        await self.broadcast_to_role(message, "admin")
-    
+        await self.backplane.publish({"kind": "role", "role": "admin", "order_event": True, "payload": serialize(message)})
+
     async def broadcast_to_all(self, message: dict):
         """Broadcast message to all connected clients."""
-        disconnected = set()
-        
-        for connection in self.active_connections["all"]:
+        await self.backplane.publish({"kind": "all", "payload": serialize(message)})
+
+    def deliver(self, event: dict):
+        """Queue a backplane event for this worker's matching sockets."""
+        kind = event["kind"]
+        if kind == "order":
+            order_id = event["order_id"]
+            targets = self.active_connections["admin"].union(self.order_subscriptions.get(order_id, ()))
+            self.send_payload(event["payload"], targets, key=("order", order_id))
+            if event.get("final"):
+                self.release_order(order_id)
+        elif kind == "role":
+            self.send_payload(event["payload"], self.active_connections[event["role"]])
+        elif kind == "all":
+            self.send_payload(event["payload"], self.active_connections["all"])
+        else:
+            logger.error(f"❌ Unknown WebSocket event kind {kind!r}")
+
+    def send_payload(self, payload: str, targets: Iterable[WebSocket], key: Optional[Hashable] = None):
+        """Queue an already serialized message for every target; never waits on a socket."""
+        targets = [self.connections[websocket] for websocket in targets if websocket in self.connections]
+        if not targets:
+            return
+        self.messages += 1
+        for connection in targets:
+            self._enqueue(connection, payload, key)
+
+    def _enqueue(self, connection: Connection, payload: str, key: Optional[Hashable] = None):
+        if not connection.enqueue(payload, key):
+            self._evict(connection, f"send queue full ({connection.max_queue})")
+
+    async def _write(self, connection: Connection):
+        websocket = connection.websocket
+        while True:
+            if not connection.queue:
+                connection.idle.set()
+                connection.wakeup.clear()
+                await connection.wakeup.wait()
+                continue
+            payload = connection.pop()
             try:
-                await connection.send_json(message)
+                await asyncio.wait_for(websocket.send_text(payload), self.send_timeout)
+            except asyncio.TimeoutError:
+                self.send_timeouts += 1
+                connection.timeouts += 1
+                if connection.timeouts >= self.max_timeouts:
+                    self._evict(connection, f"{connection.timeouts} send timeouts in a row")
+                    return
+                continue
             except Exception as e:
-                logger.error(f"Error broadcasting to all: {e}")
-                disconnected.add(connection)
-        
-        # Clean up disconnected clients
-        for conn in disconnected:
-            self.disconnect(conn)
+                self.send_errors += 1
+                logger.error(f"Error sending to {connection.role}: {e}")
+                self.disconnect(websocket)
+                return
+            connection.timeouts = 0
+            self.sends += 1
+
+    def _evict(self, connection: Connection, reason: str):
+        """Drop a slow consumer and close it in the background."""
+        self.disconnect(connection.websocket)
+        self.evictions += 1
+        logger.warning(f"⚠️ Evicted slow {connection.role} WebSocket: {reason}")
+        if connection.loop is running_loop():
+            task = connection.loop.create_task(self._close(connection.websocket))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        else:
+            asyncio.run_coroutine_threadsafe(self._close(connection.websocket), connection.loop)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(
+                websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="Too slow to keep up"),
+                self.send_timeout,
+            )
+        except Exception:
+            pass  # Already gone; the socket's own receive loop sees the disconnect
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Wait until every send queue on this event loop is empty (or timeout)."""
+        loop = asyncio.get_running_loop()
+        waits = [c.idle.wait() for c in self.connections.values() if c.loop is loop]
+        if waits:
+            try:
+                await asyncio.wait_for(asyncio.gather(*waits), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        """Connect the backplane (called from the app lifespan)."""
+        await self.backplane.start()
+
+    async def stop(self):
+        """Give queued messages one send timeout to go out, then stop the writers and backplane."""
+        await self.backplane.stop()
+        await self.drain(self.send_timeout)
+        loop = asyncio.get_running_loop()
+        writers = [c.writer for c in self.connections.values() if c.loop is loop and c.writer is not None]
+        for writer in writers:
+            writer.cancel()
+        await asyncio.gather(*writers, return_exceptions=True)
+
+    def stats(self) -> dict:
+        depths = [len(connection.queue) for connection in self.connections.values()]
+        return {
+            "connections": {role: len(sockets) for role, sockets in self.active_connections.items()},
+            "subscribed_orders": len(self.order_subscriptions),
+            "queue_policy": self.policy,
+            "queue_capacity": self.max_queue,
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "messages": self.messages,
+            "sends": self.sends,
+            "send_timeouts": self.send_timeouts,
+            "send_errors": self.send_errors,
+            "dropped": self._dropped + sum(c.dropped for c in self.connections.values()),
+            "coalesced": self._coalesced + sum(c.coalesced for c in self.connections.values()),
+            "evictions": self.evictions,
+            "backplane": self.backplane.stats(),
+        }
 
 
 # Global connection manager instance
-manager = ConnectionManager()
+manager = ConnectionManager(backplane=create_backplane())
+# Order events from every worker also feed the kitchen display replay log
+manager.backplane.subscribe(order_events.record)
@@ -0,0 +1,36 @@
+"""
+Rebuild the daily_sales rollup from the orders table.
+
+Run once after deploying the rollup, or whenever orders were written outside
+the API (seed scripts, manual SQL):
+
+    python backfill_daily_sales.py              # every day
+    python backfill_daily_sales.py --since 2025-01-01
+"""
+import argparse
+from datetime import date
+
+from app.database import SessionLocal, engine, Base
+from app.utils.sales_rollup import rebuild_daily_sales
+
+
+def backfill(since=None):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        scope = f"since {since}" if since else "for all days"
+        print(f"Rebuilding daily_sales {scope}...")
+        days = rebuild_daily_sales(db, since=since)
+        print(f"Done: {days} day rows written.")
+    except Exception as e:
+        print(f"Error rebuilding daily_sales: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the daily_sales rollup from orders.")
+    parser.add_argument("--since", type=date.fromisoformat, default=None, help="First day to rebuild (YYYY-MM-DD)")
+    backfill(parser.parse_args().since)
@@ -0,0 +1,4 @@
+"""
+Performance benchmarks.
+Run from restaurant-backend with: python -m benchmarks.<name>
+"""
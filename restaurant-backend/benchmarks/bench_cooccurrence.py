@@ -0,0 +1,123 @@
+# benchmarks/bench_cooccurrence.py
+"""
+"Frequently bought together": in-memory co-occurrence index vs the previous self-join.
+Run with: python -m benchmarks.bench_cooccurrence [--orders N] [--items N] [--sql-orders N]
+
+Generates synthetic baskets (1-6 distinct items, Zipf-like item popularity), then
+measures a full index build, incremental adds and top-3 lookups. The self-join
+runs on a SQLite copy of the first --sql-orders baskets, since loading a million
+orders into SQLite would dominate the run.
+"""
+import argparse
+import random
+import resource
+import time
+
+from sqlalchemy import func
+
+from app.models import MenuItem, Order, OrderItem
+from app.utils.cooccurrence import CooccurrenceIndex
+from benchmarks.common import bench_client, create_menu, create_user, summarize
+
+
+def synthetic_orders(count, items, seed=7):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(items)]
+    population = list(range(1, items + 1))
+    for order_id in range(1, count + 1):
+        size = rng.choice((1, 2, 2, 3, 3, 4, 5, 6))
+        yield order_id, set(rng.choices(population, weights, k=size))
+
+
+def legacy_related(db, item_id):
+    """The previous query: every order containing item_id, joined back to order_items."""
+    subquery = db.query(OrderItem.order_id).filter(OrderItem.menu_item_id == item_id).scalar_subquery()
+    return db.query(MenuItem).join(OrderItem).filter(
+        OrderItem.order_id.in_(subquery),
+        OrderItem.menu_item_id != item_id
+    ).group_by(MenuItem.id).order_by(func.count(OrderItem.menu_item_id).desc()).limit(3).all()
+
+
+def bench_index(orders, items, lookups):
+    index = CooccurrenceIndex(min_support=2, min_lift=1.0, refresh_seconds=0)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    start = time.perf_counter()
+    index.rebuild_from(synthetic_orders(orders, items))
+    build = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    stats = index.stats()
+    print(
+        f"build: {orders} orders in {build:.2f}s ({orders / build:,.0f} orders/s), "
+        f"{stats['pairs']:,} pairs, max RSS +{rss_after - rss_before:.0f}MB"
+    )
+
+    rng = random.Random(1)
+    samples = []
+    for _ in range(lookups):
+        item_id = rng.randint(1, items)
+        start = time.perf_counter()
+        index.related(item_id, 3)
+        samples.append(time.perf_counter() - start)
+    print_us("top-3 lookup", samples)
+
+    samples = []
+    for order_id, basket in synthetic_orders(lookups, items, seed=99):
+        start = time.perf_counter()
+        index.add_order(orders + order_id, basket)
+        samples.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        index.related(next(iter(basket)), 3)  # re-rank after the item changed
+        samples[-1] += time.perf_counter() - start
+    print_us("add order + re-ranked lookup", samples)
+
+
+def bench_sql(sql_orders, items, lookups):
+    with bench_client() as (_, session):
+        customer, _ = create_user(session)
+        menu_ids = create_menu(session, items)
+        for order_id, basket in synthetic_orders(sql_orders, items):
+            session.add(Order(
+                id=order_id, order_number=f"ORD-BENCH-{order_id}", customer_id=customer.id, total_amount=1.0
+            ))
+            session.add_all(
+                OrderItem(order_id=order_id, menu_item_id=menu_ids[i - 1], quantity=1, price=1.0) for i in basket
+            )
+            if order_id % 10000 == 0:
+                session.flush()
+        session.commit()
+
+        rng = random.Random(1)
+        samples = []
+        for _ in range(lookups):
+            item_id = menu_ids[rng.randint(0, items - 1)]
+            start = time.perf_counter()
+            legacy_related(session, item_id)
+            samples.append(time.perf_counter() - start)
+        print_us(f"self-join ({sql_orders} orders, SQLite)", samples)
+
+        index = CooccurrenceIndex(min_support=2, min_lift=1.0, refresh_seconds=0)
+        start = time.perf_counter()
+        index.rebuild(session)
+        print(f"index rebuild from order_items ({sql_orders} orders): {time.perf_counter() - start:.2f}s")
+
+
+def print_us(label, samples):
+    summary = summarize(samples)
+    print(f"{label}: p50={summary['p50_ms'] * 1000:.1f}us p99={summary['p99_ms'] * 1000:.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--items", type=int, default=300)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--sql-orders", type=int, default=50_000)
+    args = parser.parse_args()
+
+    bench_index(args.orders, args.items, args.lookups)
+    if args.sql_orders:
+        bench_sql(args.sql_orders, args.items, min(args.lookups, 50))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# benchmarks/bench_create_order.py
+"""
+Order-creation latency for different order sizes.
+Run with: python -m benchmarks.bench_create_order [--iterations N]
+"""
+import argparse
+
+from app.models import Order, OrderItem
+from benchmarks.common import bench_client, create_menu, create_user, summarize, timed
+
+ORDER_SIZES = (1, 10, 50)
+
+
+def run(iterations):
+    with bench_client() as (client, session):
+        _, headers = create_user(session)
+        item_ids = create_menu(session, size=max(ORDER_SIZES))
+
+        for size in ORDER_SIZES:
+            payload = {"items": [{"menu_item_id": item_id, "quantity": 1} for item_id in item_ids[:size]]}
+            samples = []
+            for _ in range(iterations):
+                with timed(samples):
+                    response = client.post("/api/orders", json=payload, headers=headers)
+                assert response.status_code == 201, response.text
+                # Keep the table small so every size is measured against the same state
+                session.query(OrderItem).delete()
+                session.query(Order).delete()
+                session.commit()
+
+            stats = summarize(samples)
+            print(f"{size:>3} lines: p50={stats['p50_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms "
+                  f"mean={stats['mean_ms']:.2f}ms ({iterations} orders)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    run(parser.parse_args().iterations)
@@ -0,0 +1,133 @@
+# benchmarks/bench_db_modes.py
+"""
+Concurrent throughput of the ported routers: sync vs async database sessions.
+Run with: python -m benchmarks.bench_db_modes [--clients 200] [--requests 5] [--database-url URL]
+
+Modes:
+  inline     sync Session called directly on the event loop (the previous behaviour)
+  threadpool sync Session behind SyncSessionAdapter (DB_ASYNC=false)
+  async      AsyncSession on the async driver (DB_ASYNC=true)
+
+Defaults to a temporary SQLite file (async mode needs aiosqlite); pass a
+PostgreSQL URL to measure against a real server.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from main import app
+from app.database import Base, SyncSessionAdapter, async_database_url, get_async_db
+from app.models import Table
+from app.utils.auth import create_access_token
+from benchmarks.common import create_menu, create_user, summarize
+
+
+class InlineSessionAdapter(SyncSessionAdapter):
+    """Runs every call on the event loop thread, like the old sync handlers did."""
+
+    async def execute(self, statement, *args, **kwargs):
+        return self.sync_session.execute(statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return self.sync_session.scalar(statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return self.sync_session.scalars(statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return self.sync_session.get(entity, ident, **kwargs)
+
+    async def close(self):
+        self.sync_session.close()
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.sync_session, *args, **kwargs)
+
+
+def seed(url):
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        create_user(session)
+        create_menu(session, size=30)
+        session.add_all(Table(number=f"T{i}", capacity=4) for i in range(20))
+        session.commit()
+    return engine
+
+
+def dependency_for(mode, url, pool_size):
+    """Return (get_async_db override, engine) for a mode."""
+    # Same pool for every mode; an inline session blocks the loop while waiting for a connection
+    if mode == "async":
+        engine = create_async_engine(async_database_url(url), pool_size=pool_size, max_overflow=0)
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def get_db_async():
+            async with factory() as db:
+                yield db
+        return get_db_async, engine
+
+    engine = create_engine(url, pool_size=pool_size, max_overflow=0)
+    factory = sessionmaker(bind=engine)
+    adapter = InlineSessionAdapter if mode == "inline" else SyncSessionAdapter
+
+    async def get_db_sync():
+        db = adapter(factory())
+        try:
+            yield db
+        finally:
+            await db.close()
+    return get_db_sync, engine
+
+
+async def load(clients, requests, headers, engine):
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def one_client():
+            for i in range(requests):
+                url = "/api/tables/" if i % 2 else "/api/orders/my-orders"
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                assert response.status_code == 200, response.text
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_client() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    result = engine.dispose()
+    if asyncio.iscoroutine(result):
+        await result
+    return latencies, elapsed
+
+
+def run(clients, requests, url, modes):
+    seed(url).dispose()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench@test.com'})}"}
+    for mode in modes:
+        app.dependency_overrides[get_async_db], engine = dependency_for(mode, url, pool_size=clients)
+        latencies, elapsed = asyncio.run(load(clients, requests, headers, engine))
+        stats = summarize(latencies)
+        print(f"{mode:<10} {len(latencies) / elapsed:>7.0f} req/s  p50={stats['p50_ms']:.1f}ms "
+              f"p99={stats['p99_ms']:.1f}ms ({clients} clients x {requests} requests)", flush=True)
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--database-url")
+    parser.add_argument("--modes", nargs="+", default=["inline", "threadpool", "async"])
+    args = parser.parse_args()
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    run(args.clients, args.requests, database_url, args.modes)
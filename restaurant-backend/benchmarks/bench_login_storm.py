@@ -0,0 +1,86 @@
+# benchmarks/bench_login_storm.py
+"""
+Latency of unrelated endpoints while a burst of logins runs bcrypt.
+Run with: python -m benchmarks.bench_login_storm [--logins N] [--blocking]
+
+--blocking runs bcrypt inline on the event loop (the previous behaviour) for comparison.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from main import app
+from app.utils.auth import password_pool
+from benchmarks.common import bench_client, create_menu, create_user, summarize
+
+
+async def probe(client, url, stop, samples):
+    """Hit url back to back until stop is set, recording latencies."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get(url)
+        assert response.status_code == 200
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.005)
+
+
+async def login(client):
+    response = await client.post("/api/auth/login", json={"email": "bench@test.com", "password": "bench123"})
+    return response.status_code
+
+
+async def measure(logins, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/api/menu")  # Warm the catalog cache
+
+        for phase in ("idle", "login storm"):
+            stop = asyncio.Event()
+            samples = []
+            probe_task = asyncio.create_task(probe(client, "/api/menu", stop, samples))
+            statuses = []
+            if phase == "idle":
+                await asyncio.sleep(1.0)
+            else:
+                semaphore = asyncio.Semaphore(concurrency)
+
+                async def limited_login():
+                    async with semaphore:
+                        statuses.append(await login(client))
+
+                started = time.perf_counter()
+                await asyncio.gather(*(limited_login() for _ in range(logins)))
+                elapsed = time.perf_counter() - started
+            stop.set()
+            await probe_task
+
+            stats = summarize(samples)
+            print(f"{phase:<12} GET /api/menu p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms "
+                  f"({len(samples)} probes)")
+            if statuses:
+                ok = statuses.count(200)
+                throttled = statuses.count(429)
+                print(f"{'':<12} {logins} logins in {elapsed:.1f}s: {ok} ok, {throttled} throttled (429)")
+
+
+def run(logins, concurrency, blocking):
+    if blocking:
+        async def run_inline(func, *args):
+            return func(*args)
+        password_pool.run = run_inline
+
+    with bench_client() as (_, session):
+        create_user(session)
+        create_menu(session, size=20)
+        asyncio.run(measure(logins, concurrency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--blocking", action="store_true")
+    args = parser.parse_args()
+    run(args.logins, args.concurrency, args.blocking)
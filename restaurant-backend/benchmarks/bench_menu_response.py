@@ -0,0 +1,70 @@
+# benchmarks/bench_menu_response.py
+"""
+Requests/sec for GET /api/menu: pre-rendered bytes vs. the previous code paths.
+Run with: python -m benchmarks.bench_menu_response [--requests N] [--items N]
+"""
+import argparse
+import time
+from typing import List
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from main import app
+from app.database import get_db
+from app.models import MenuItem
+from app.schemas import MenuItemResponse
+from app.utils.menu_cache import menu_cache
+from benchmarks.common import bench_client, create_menu
+
+legacy = FastAPI()
+
+
+@legacy.get("/db", response_model=List[MenuItemResponse])
+def menu_from_db(db: Session = Depends(get_db)):
+    """Original handler: query + response_model validation on every request."""
+    return db.query(MenuItem).offset(0).limit(100).all()
+
+
+@legacy.get("/cached-dicts", response_model=List[MenuItemResponse])
+def menu_from_cached_dicts(db: Session = Depends(get_db)):
+    """Catalog cache without pre-rendering: dicts validated and encoded per request."""
+    return menu_cache.get(db).items[:100]
+
+
+def requests_per_second(client, url, headers, requests):
+    client.get(url, headers=headers)  # Warm caches
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+    return requests / (time.perf_counter() - start)
+
+
+def run(requests, items):
+    with bench_client() as (client, session):
+        create_menu(session, size=items)
+        menu_cache.invalidate()
+        legacy.dependency_overrides[get_db] = app.dependency_overrides[get_db]
+        legacy_client = TestClient(legacy)
+
+        paths = [
+            ("query + pydantic (original)", legacy_client, "/db"),
+            ("cached dicts + pydantic", legacy_client, "/cached-dicts"),
+            ("pre-rendered bytes", client, "/api/menu"),
+        ]
+        for encoding in ("identity", "gzip", "br"):
+            print(f"Accept-Encoding: {encoding}")
+            for label, target, url in paths:
+                rps = requests_per_second(target, url, {"Accept-Encoding": encoding}, requests)
+                print(f"  {label:<30} {rps:>8.0f} req/s")
+        legacy.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--items", type=int, default=100)
+    args = parser.parse_args()
+    run(args.requests, args.items)
@@ -0,0 +1,111 @@
+# benchmarks/bench_pagination.py
+"""
+Deep-page latency of the admin listings: offset vs keyset cursor.
+Run with: python -m benchmarks.bench_pagination [--rows N] [--pages N ...] [--limit N] [--repeat N]
+
+Seeds --rows orders and --rows reservations, then fetches each of --pages of
+GET /api/orders both ways: ?skip= (the previous paging, which makes the
+database walk and discard every earlier row) and ?cursor= (the keyset
+cursor the previous page would have returned). Reservations only page by
+cursor (the previous endpoint returned every row at once).
+"""
+import argparse
+import logging
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+from app.models import Order, OrderStatus, Reservation
+from app.utils.pagination import encode_cursor
+from benchmarks.common import bench_client, create_user, summarize, timed
+
+CHUNK = 50000
+
+
+def seed(session, rows):
+    start = datetime(2024, 1, 1)
+    today = date.today()
+    statuses = list(OrderStatus)
+    for first in range(1, rows + 1, CHUNK):
+        ids = range(first, min(first + CHUNK, rows + 1))
+        session.execute(insert(Order), [
+            {
+                "id": i,
+                "order_number": f"ORD-BENCH-{i:07d}",
+                "status": statuses[i % len(statuses)],
+                "total_amount": 10.0,
+                # Two orders per second, so the cursor has to break ties on id
+                "created_at": start + timedelta(seconds=i // 2),
+                "updated_at": start + timedelta(seconds=i // 2),
+            }
+            for i in ids
+        ])
+        session.execute(insert(Reservation), [
+            {
+                "id": i,
+                "name": f"Guest {i}",
+                "email": "guest@test.com",
+                "phone": f"555{i:07d}",
+                "date": today + timedelta(days=i % 365),
+                "time": f"{12 + i % 10}:00",
+                "guests": 2,
+                "status": "pending",
+            }
+            for i in ids
+        ])
+    session.commit()
+    session.connection().exec_driver_sql("ANALYZE")
+
+
+def measure(client, path, params, headers, repeat):
+    samples = []
+    for _ in range(repeat):
+        with timed(samples):
+            response = client.get(path, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+    return response, summarize(samples)
+
+
+def report(name, stats):
+    print(f"{name:>34}: p50 {stats['p50_ms']:8.2f}ms  p99 {stats['p99_ms']:8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger("app.routers.reservations").setLevel(logging.WARNING)  # one line per request otherwise
+
+    with bench_client() as (client, session):
+        _, headers = create_user(session, email="admin@bench.com", role="admin")
+        seed_start = datetime.now()
+        seed(session, args.rows)
+        print(f"Seeded {args.rows:,} orders and reservations in {(datetime.now() - seed_start).total_seconds():.1f}s")
+        for page in args.pages:
+            skip = (page - 1) * args.limit
+            print(f"Page {page} of {args.limit} (rows {skip + 1:,}-{skip + args.limit:,}):")
+
+            # The cursor the previous page hands out: its last row
+            last = session.query(Order).order_by(Order.created_at.desc(), Order.id.desc()).offset(skip - 1).first()
+            cursor = encode_cursor(last.created_at, last.id)
+            by_offset, stats = measure(client, "/api/orders", {"skip": skip, "limit": args.limit}, headers, args.repeat)
+            report("orders ?skip= (offset)", stats)
+            by_cursor, stats = measure(client, "/api/orders", {"cursor": cursor, "limit": args.limit}, headers, args.repeat)
+            report("orders ?cursor= (keyset)", stats)
+            assert [o["id"] for o in by_cursor.json()] == [o["id"] for o in by_offset.json()]
+
+            last = (
+                session.query(Reservation)
+                .order_by(Reservation.date.desc(), Reservation.time.desc(), Reservation.id.desc())
+                .offset(skip - 1).first()
+            )
+            cursor = encode_cursor(last.date, last.time, last.id)
+            _, stats = measure(client, "/api/reservations/", {"cursor": cursor, "limit": args.limit}, headers, args.repeat)
+            report("reservations ?cursor= (keyset)", stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_startup.py
+"""
+Worker startup cost: wall time and peak RSS of `import main` in a fresh interpreter.
+Run with: python -m benchmarks.bench_startup [--runs N] [--preload pandas]
+
+--preload imports extra modules first (e.g. pandas, which analytics used to import
+at module level) to reproduce the previous startup for comparison.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "import_ms": elapsed * 1000,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "pandas_loaded": "pandas" in sys.modules,
+}))
+"""
+
+
+def measure(runs, preload):
+    env = dict(os.environ, DATABASE_URL=os.environ.get("DATABASE_URL", "sqlite://"))
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE, *preload],
+            capture_output=True, text=True, check=True, env=env,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--preload", nargs="*", default=[])
+    args = parser.parse_args()
+
+    samples = measure(args.runs, args.preload)
+    import_ms = [s["import_ms"] for s in samples]
+    rss = [s["max_rss_mb"] for s in samples]
+    label = f"preload={','.join(args.preload)}" if args.preload else "current"
+    print(
+        f"{label}: import median={statistics.median(import_ms):.0f}ms "
+        f"min={min(import_ms):.0f}ms, max RSS median={statistics.median(rss):.1f}MB, "
+        f"pandas loaded={samples[0]['pandas_loaded']} ({args.runs} runs)"
+    )
+
+
+if __name__ == "__main__":
+    main()
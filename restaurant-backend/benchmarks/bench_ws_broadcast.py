@@ -0,0 +1,113 @@
+# benchmarks/bench_ws_broadcast.py
+"""
+WebSocket broadcast delivery latency with some slow clients.
+Run with: python -m benchmarks.bench_ws_broadcast [--clients N] [--slow-fraction F] [--slow-delay S]
+
+Connects in-process fake sockets to a ConnectionManager; a slow socket takes
+--slow-delay seconds per send. For each broadcast it records how long the
+caller (the create_order request) waits, and how long each fast client
+waits for the message. "sequential" replays the previous loop, which
+serialized per socket and awaited each send in turn.
+
+The rush phase then pushes --rush status updates for 50 orders at one
+stalled client under each queue policy and reports what stays buffered.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from app.websocket import QUEUE_POLICIES, ConnectionManager
+from benchmarks.common import summarize
+
+
+class BenchSocket:
+    def __init__(self, delay):
+        self.delay = delay
+        self.received = {}
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received[payload] = time.perf_counter()
+
+    async def close(self, code=1000, reason=None):
+        pass
+
+
+async def sequential_broadcast(manager, message):
+    """The previous broadcast_to_role: json per socket, one awaited send at a time."""
+    for connection in manager.active_connections["admin"]:
+        await connection.send_text(json.dumps(message))
+
+
+async def run(mode, clients, slow_fraction, slow_delay, messages, send_timeout):
+    manager = ConnectionManager(send_timeout=send_timeout, max_timeouts=3)
+    slow_count = int(clients * slow_fraction)
+    sockets = [BenchSocket(slow_delay if i < slow_count else 0) for i in range(clients)]
+    for socket in sockets:
+        await manager.connect(socket, "admin")
+    fast = sockets[slow_count:]
+
+    caller, delivery = [], []
+    for n in range(messages):
+        message = {"type": "new_order", "order": {"id": n, "order_number": f"ORD-{n:06d}"}}
+        sent_at = time.perf_counter()
+        if mode == "sequential":
+            await sequential_broadcast(manager, message)
+        else:
+            await manager.broadcast_new_order(message)
+        caller.append(time.perf_counter() - sent_at)
+        while not all(len(socket.received) > n for socket in fast):
+            await asyncio.sleep(0.001)
+        delivery.extend(list(socket.received.values())[n] - sent_at for socket in fast)
+    await manager.stop()
+
+    caller_summary, delivery_summary = summarize(caller), summarize(delivery)
+    print(
+        f"{mode:>10}: caller waits p50={caller_summary['p50_ms']:.1f}ms p99={caller_summary['p99_ms']:.1f}ms | "
+        f"fast-client delivery p50={delivery_summary['p50_ms']:.1f}ms p99={delivery_summary['p99_ms']:.1f}ms | "
+        f"evicted {manager.evictions}/{slow_count} slow clients"
+    )
+
+
+async def rush(policy, updates, max_queue):
+    manager = ConnectionManager(send_timeout=3600, max_queue=max_queue, policy=policy)
+    stalled = BenchSocket(3600)
+    await manager.connect(stalled, "customer")
+    for n in range(updates):
+        order_id = n % 50
+        manager.subscribe_to_order(stalled, order_id)
+        await manager.broadcast_order_update(order_id, {"type": "order_status_updated", "order": {"id": order_id, "n": n}})
+    stats = manager.stats()
+    print(
+        f"{policy:>11}: {updates} updates -> buffered {stats['queued_messages']}/{max_queue}, "
+        f"dropped {stats['dropped']}, coalesced {stats['coalesced']}, evicted {stats['evictions']}"
+    )
+    manager.disconnect(stalled)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--slow-fraction", type=float, default=0.05)
+    parser.add_argument("--slow-delay", type=float, default=0.5)
+    parser.add_argument("--send-timeout", type=float, default=0.2)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--rush", type=int, default=10000)
+    parser.add_argument("--queue-size", type=int, default=100)
+    args = parser.parse_args()
+    logging.getLogger("app.websocket").setLevel(logging.ERROR)  # one eviction warning per slow client
+
+    for mode in ("sequential", "queued"):
+        asyncio.run(run(mode, args.clients, args.slow_fraction, args.slow_delay, args.messages, args.send_timeout))
+    for policy in QUEUE_POLICIES:
+        asyncio.run(rush(policy, args.rush, args.queue_size))
+
+
+if __name__ == "__main__":
+    main()
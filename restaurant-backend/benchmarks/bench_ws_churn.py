@@ -0,0 +1,93 @@
+# benchmarks/bench_ws_churn.py
+"""
+Cost of a mass WebSocket disconnect (a Wi-Fi blip dropping guest phones).
+Run with: python -m benchmarks.bench_ws_churn [--guests N] [--orders N] [--drop N]
+
+Connects --guests fake sockets that each track one to three orders, plus one
+kitchen display subscribed to --orders orders, then disconnects --drop guests
+at once. "legacy" replays the previous disconnect, which walked every entry
+of order_subscriptions per socket. Finally every order is delivered to show
+that final updates leave no subscriptions behind.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+from app.websocket import ConnectionManager
+
+
+class IdleSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload):
+        pass
+
+    async def close(self, code=1000, reason=None):
+        pass
+
+
+def legacy_disconnect(manager, websocket):
+    """The previous ConnectionManager.disconnect subscription cleanup."""
+    for order_id, subscribers in list(manager.order_subscriptions.items()):
+        subscribers.discard(websocket)
+        if not subscribers:
+            del manager.order_subscriptions[order_id]
+
+
+async def churn(mode, guests, orders, drop):
+    rng = random.Random(3)
+    manager = ConnectionManager()
+    kitchen = IdleSocket()
+    await manager.connect(kitchen, "admin")
+    for order_id in range(orders):
+        manager.subscribe_to_order(kitchen, order_id)
+    sockets = []
+    for _ in range(guests):
+        websocket = IdleSocket()
+        await manager.connect(websocket, "customer")
+        for _ in range(rng.randint(1, 3)):
+            manager.subscribe_to_order(websocket, rng.randrange(orders))
+        sockets.append(websocket)
+
+    dropped = rng.sample(sockets, drop)
+    start = time.perf_counter()
+    for websocket in dropped:
+        if mode == "legacy":
+            legacy_disconnect(manager, websocket)
+        manager.disconnect(websocket)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{mode:>8}: {drop} disconnects over {len(manager.order_subscriptions):,} subscribed orders "
+        f"in {elapsed * 1000:.1f}ms ({elapsed / drop * 1e6:.1f}us each)"
+    )
+
+    if mode == "indexed":
+        start = time.perf_counter()
+        for order_id in range(orders):
+            await manager.broadcast_order_update(order_id, {"type": "order_status_updated", "status": "delivered"}, final=True)
+        elapsed = time.perf_counter() - start
+        remaining = sum(len(c.orders) for c in manager.connections.values())
+        print(
+            f"          delivered {orders:,} orders in {elapsed * 1000:.0f}ms -> "
+            f"{len(manager.order_subscriptions)} subscribed orders, {remaining} reverse entries left"
+        )
+    await manager.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--guests", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--drop", type=int, default=500)
+    args = parser.parse_args()
+    logging.getLogger("app.websocket").setLevel(logging.ERROR)  # one line per disconnect otherwise
+
+    for mode in ("legacy", "indexed"):
+        asyncio.run(churn(mode, args.guests, args.orders, args.drop))
+
+
+if __name__ == "__main__":
+    main()
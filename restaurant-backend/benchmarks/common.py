@@ -0,0 +1,95 @@
+# benchmarks/common.py
+"""Shared helpers for the benchmark scripts (SQLite test engine from tests/conftest.py)."""
+import statistics
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from fastapi.testclient import TestClient
+
+from main import app
+from app.database import Base, SyncSessionAdapter, get_async_db, get_db, get_session_scope
+from app.models import User, Category, MenuItem
+from app.utils.auth import create_access_token, get_password_hash
+from tests.conftest import engine, TestingSessionLocal
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of samples (nearest-rank)."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Return p50/p99/mean in milliseconds for a list of durations in seconds."""
+    return {
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": statistics.mean(samples) * 1000,
+    }
+
+
+@contextmanager
+def timed(samples):
+    """Append the wall-clock duration of the block to samples."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        samples.append(time.perf_counter() - start)
+
+
+@contextmanager
+def bench_client():
+    """Yield (client, session) against a fresh SQLite schema, without running the app lifespan."""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+
+    def override_get_db():
+        yield session
+
+    async def override_get_async_db():
+        yield SyncSessionAdapter(session)
+
+    @asynccontextmanager
+    async def session_scope():
+        yield SyncSessionAdapter(session)
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_session_scope] = lambda: session_scope
+    try:
+        yield TestClient(app), session
+    finally:
+        app.dependency_overrides.clear()
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+def create_user(session, email="bench@test.com", role="customer"):
+    """Create a user and return (user, auth headers)."""
+    user = User(
+        email=email,
+        username=email.split("@")[0],
+        hashed_password=get_password_hash("bench123"),
+        role=role,
+        is_active=True
+    )
+    session.add(user)
+    session.commit()
+    token = create_access_token({"sub": user.email})
+    return user, {"Authorization": f"Bearer {token}"}
+
+
+def create_menu(session, size=50):
+    """Create a category with `size` available menu items and return their ids."""
+    category = Category(name="Bench", is_active=True)
+    session.add(category)
+    session.flush()
+    items = [
+        MenuItem(name=f"Dish {i}", price=5.0 + i, category_id=category.id, is_available=True)
+        for i in range(size)
+    ]
+    session.add_all(items)
+    session.commit()
+    return [item.id for item in items]
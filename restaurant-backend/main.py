@@ -7,17 +7,25 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
 
-from app.database import engine, Base
+from app.database import engine, async_engine, Base
 from app.routers import auth, menu, orders, restaurant, websocket, reservations, tables, upload, analytics
 from app.config import settings
+from app.utils.cooccurrence import cooccurrence_index
+from app.websocket import manager
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 Starting up...")
     Base.metadata.create_all(bind=engine)
+    await manager.start()
+    # Recommendations serve from this index; build it off the request path
+    cooccurrence_index.refresh_in_background()
     yield
     print("🔄 Shutting down...")
+    await manager.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
@@ -35,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Paginated listings return the next page's cursor here
 )
 
 # Include routers
@@ -1,5 +1,6 @@
 from app.database import SessionLocal, engine
 from app.models import Order, OrderItem, MenuItem, User, OrderStatus
+from app.utils.sales_rollup import rebuild_daily_sales
 from datetime import datetime, timedelta
 import random
 
@@ -74,6 +75,9 @@ def seed_orders():
         db.commit()
         print("Successfully seeded 50 past orders!")
         
+        # Seeded orders bypass the API, so refresh the analytics rollup
+        rebuild_daily_sales(db, since=start_date.date())
+        
     except Exception as e:
         print(f"Error seeding orders: {e}")
         db.rollback()
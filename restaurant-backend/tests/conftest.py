@@ -3,16 +3,26 @@
 Pytest configuration and fixtures for testing.
 Run with: pytest -v
 """
+from contextlib import asynccontextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from main import app
-from app.database import Base, get_db
+from app.database import Base, SyncSessionAdapter, get_async_db, get_db, get_session_scope
 from app.models import User, Category, MenuItem, Restaurant
 from app.utils.auth import get_password_hash
+from app.utils.availability import availability_index
+from app.utils.cooccurrence import cooccurrence_index
+from app.utils.menu_cache import menu_cache
+from app.utils.order_events import order_events
+from app.utils.order_numbers import order_number_allocator
+from app.utils.preferences import preference_profiles
+from app.utils.principal_cache import principal_cache
+from app.utils.stats_cache import stats_cache
 
 # Use in-memory SQLite for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -29,6 +39,14 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 def db_session():
     """Create a fresh database session for each test."""
     Base.metadata.create_all(bind=engine)
+    order_number_allocator.reset()
+    menu_cache.invalidate()
+    principal_cache.clear()
+    cooccurrence_index.reset()
+    preference_profiles.clear()
+    stats_cache.clear()
+    order_events.clear()
+    availability_index.clear()
     session = TestingSessionLocal()
     try:
         yield session
@@ -46,7 +64,16 @@ def client(db_session):
         finally:
             pass
     
+    async def override_get_async_db():
+        yield SyncSessionAdapter(db_session)
+    
+    @asynccontextmanager
+    async def session_scope():
+        yield SyncSessionAdapter(db_session)
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_session_scope] = lambda: session_scope
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -150,3 +177,18 @@ def restaurant_info(db_session):
     db_session.commit()
     db_session.refresh(restaurant)
     return restaurant
+
+
+@pytest.fixture
+def query_counter():
+    """Count SQL statements executed on the test engine."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,409 @@
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from app.models import Category, DailySales, MenuItem, Order, OrderItem, OrderStatus
+from app.routers.analytics import trend_bucket
+from app.utils.cooccurrence import CooccurrenceIndex, cooccurrence_index
+from app.utils.preferences import PreferenceProfiles, UserProfile, preference_profiles, score_items
+from app.utils.sales_rollup import rebuild_daily_sales
+from app.utils.stats_cache import stats_cache
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def rollup_rows(db_session):
+    db_session.expire_all()
+    return {
+        row.day: {
+            column: getattr(row, column)
+            for column in DailySales.__table__.columns.keys() if column != "day"
+        }
+        for row in db_session.query(DailySales).all()
+    }
+
+
+def place_order(client, token, menu_item_id, quantity):
+    response = client.post(
+        "/api/orders",
+        json={"items": [{"menu_item_id": menu_item_id, "quantity": quantity}]},
+        headers=auth_headers(token),
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_rollup_tracks_order_creation_and_status_changes(
+    client, db_session, admin_token, customer_token, sample_menu_item
+):
+    first = place_order(client, customer_token, sample_menu_item.id, 2)
+    second = place_order(client, customer_token, sample_menu_item.id, 3)
+    response = client.post("/api/orders/guest", json={
+        "table_number": "4",
+        "guest_name": "Walk-in",
+        "total_amount": 9.99,
+        "items": [{"menu_item_id": sample_menu_item.id, "quantity": 1, "price": 9.99}],
+    })
+    assert response.status_code == 200
+
+    response = client.patch(
+        f"/api/orders/{first['id']}/status",
+        json={"status": "confirmed"},
+        headers=auth_headers(admin_token),
+    )
+    assert response.status_code == 200
+    response = client.delete(f"/api/orders/{second['id']}", headers=auth_headers(customer_token))
+    assert response.status_code == 204
+
+    rows = rollup_rows(db_session)
+    assert len(rows) == 1
+    (today,) = rows.values()
+    assert today["order_count"] == 3
+    assert today["item_count"] == 6
+    assert today["revenue"] == round(first["total_amount"] + second["total_amount"] + 9.99, 2)
+    assert today["pending_count"] == 1
+    assert today["confirmed_count"] == 1
+    assert today["cancelled_count"] == 1
+
+    # A full rebuild from orders produces the same row
+    rebuild_daily_sales(db_session)
+    assert rollup_rows(db_session) == rows
+
+
+def test_backfill_and_analytics_read_rollup(client, db_session, customer_user, sample_menu_item):
+    now = datetime.now()
+    history = [
+        (now - timedelta(days=2), OrderStatus.DELIVERED, 10.0, 1),
+        (now - timedelta(days=2), OrderStatus.CANCELLED, 5.0, 2),
+        (now - timedelta(days=1), OrderStatus.DELIVERED, 20.0, 4),
+        (now, OrderStatus.PENDING, 40.0, 1),
+        (now - timedelta(days=90), OrderStatus.DELIVERED, 99.0, 1),
+    ]
+    for index, (created_at, order_status, amount, quantity) in enumerate(history):
+        order = Order(
+            order_number=f"ORD-HIST-{index}",
+            customer_id=customer_user.id,
+            status=order_status,
+            total_amount=amount,
+            created_at=created_at,
+        )
+        db_session.add(order)
+        db_session.flush()
+        db_session.add(OrderItem(
+            order_id=order.id, menu_item_id=sample_menu_item.id, quantity=quantity, price=amount
+        ))
+    db_session.commit()
+
+    # Orders written outside the API are invisible until backfilled
+    assert client.get("/api/analytics/dashboard-stats").json()["total_orders"] == 0
+    assert rebuild_daily_sales(db_session) == 4
+    stats_cache.clear()  # dashboard counters are cached for a few seconds
+
+    stats = client.get("/api/analytics/dashboard-stats").json()
+    assert stats["total_orders"] == 5
+    assert stats["total_revenue"] == 174.0
+    assert stats["orders_by_status"]["delivered"] == 3
+    assert stats["orders_by_status"]["cancelled"] == 1
+
+    trends = client.get("/api/analytics/sales-trends", params={"days": 3}).json()
+    assert trends == [
+        {"date": (now - timedelta(days=3)).date().isoformat(), "amount": 0.0, "orders": 0},
+        {"date": (now - timedelta(days=2)).date().isoformat(), "amount": 15.0, "orders": 2},
+        {"date": (now - timedelta(days=1)).date().isoformat(), "amount": 20.0, "orders": 1},
+        {"date": now.date().isoformat(), "amount": 40.0, "orders": 1},
+    ]
+
+    insights = client.get("/api/analytics/insights").json()
+    growth = [i["message"] for i in insights if i["type"] == "success"]
+    assert growth and "100.0%" in growth[0]  # 40 today vs 20 yesterday
+    rows = rollup_rows(db_session)
+    assert rows[(now - timedelta(days=2)).date()]["item_count"] == 3
+
+    # Rebuilding a window leaves older days untouched
+    assert rebuild_daily_sales(db_session, since=(now - timedelta(days=1)).date()) == 2
+    assert rollup_rows(db_session) == rows
+
+
+def test_sales_trends_granularity(client, db_session, customer_user):
+    now = datetime.now()
+    placed = [now, now, now - timedelta(hours=2), now - timedelta(days=40), now - timedelta(days=400)]
+    for index, created_at in enumerate(placed):
+        db_session.add(Order(
+            order_number=f"ORD-TREND-{index}",
+            customer_id=customer_user.id,
+            status=OrderStatus.DELIVERED,
+            total_amount=10.0 * (index + 1),
+            created_at=created_at,
+        ))
+    db_session.commit()
+    rebuild_daily_sales(db_session)
+
+    hourly = client.get("/api/analytics/sales-trends", params={"days": 1, "granularity": "hour"}).json()
+    assert len(hourly) == 25  # the window starts at the top of the hour a day back
+    assert hourly[-1] == {"date": now.strftime("%Y-%m-%dT%H:00"), "amount": 30.0, "orders": 2}
+    assert sum(b["orders"] for b in hourly) == 3
+    assert len({b["date"] for b in hourly}) == len(hourly)
+
+    daily = client.get("/api/analytics/sales-trends", params={"days": 60}).json()
+    assert len(daily) == 61
+    assert sum(b["amount"] for b in daily) == 100.0
+
+    weekly = client.get("/api/analytics/sales-trends", params={"days": 60, "granularity": "week"}).json()
+    assert all(datetime.fromisoformat(b["date"]).weekday() == 0 for b in weekly)
+    assert sum(b["orders"] for b in weekly) == 4
+
+    monthly = client.get("/api/analytics/sales-trends", params={"days": 365 * 2, "granularity": "month"}).json()
+    assert monthly[-1]["date"] == now.strftime("%Y-%m")
+    assert len({b["date"] for b in monthly}) == len(monthly)
+    assert sum(b["amount"] for b in monthly) == 150.0
+
+    response = client.get("/api/analytics/sales-trends", params={"days": 90, "granularity": "hour"})
+    assert response.status_code == 400
+    response = client.get("/api/analytics/sales-trends", params={"granularity": "minute"})
+    assert response.status_code == 422
+
+
+def test_sales_trends_first_bucket_is_whole(client, db_session, customer_user):
+    now = datetime.now()
+    week_start = trend_bucket(now - timedelta(days=10), "week")
+    month_start = trend_bucket(now - timedelta(days=100), "month")
+    # Both fall before now - days unless that happens to be the bucket start itself
+    for index, created_at in enumerate([week_start, month_start]):
+        db_session.add(Order(
+            order_number=f"ORD-EDGE-{index}",
+            customer_id=customer_user.id,
+            status=OrderStatus.DELIVERED,
+            total_amount=10.0,
+            created_at=created_at + timedelta(minutes=1),
+        ))
+    db_session.commit()
+    rebuild_daily_sales(db_session)
+
+    weekly = client.get("/api/analytics/sales-trends", params={"days": 10, "granularity": "week"}).json()
+    assert weekly[0] == {"date": week_start.date().isoformat(), "amount": 10.0, "orders": 1}
+    monthly = client.get("/api/analytics/sales-trends", params={"days": 100, "granularity": "month"}).json()
+    assert monthly[0] == {"date": month_start.strftime("%Y-%m"), "amount": 10.0, "orders": 1}
+
+
+def test_cooccurrence_index_scores_and_thresholds():
+    index = CooccurrenceIndex(min_support=1, min_lift=0.0, refresh_seconds=0)
+    baskets = [(1, 2), (1, 2), (1, 2, 3), (1, 3), (3, 4), (3, 4), (4,), (5,)]
+    for order_id, items in enumerate(baskets, start=1):
+        index.add_order(order_id, items)
+
+    burger = index.related(1, limit=5)
+    assert [r.item_id for r in burger] == [2, 3]
+    fries = burger[0]
+    assert fries.support == 3
+    assert fries.confidence == 3 / 4
+    assert fries.lift == 3 * 8 / (4 * 3)
+
+    # Raising the thresholds drops weak pairs; 1 and 3 co-occur exactly as often as chance
+    assert [r.item_id for r in index.related(1, min_support=3)] == [2]
+    assert [r.item_id for r in index.related(3, min_lift=1.0)] == [1, 4]
+    assert [r.item_id for r in index.related(3, min_lift=1.1)] == [4]
+    assert index.related(5) == []
+    assert index.popular(2) == [1, 3]
+
+    # Adding an order re-ranks only the touched items
+    index.add_order(9, [1, 3, 3])
+    index.add_order(10, [1, 3])
+    assert [r.item_id for r in index.related(1, limit=1)] == [3]
+    assert index.stats()["orders"] == 10
+
+
+def test_cooccurrence_rebuild_keeps_orders_committed_meanwhile():
+    index = CooccurrenceIndex(min_support=1, min_lift=0.0, refresh_seconds=0)
+
+    def snapshot():
+        yield 1, [1, 2]
+        # Committed while the rebuild is streaming: one already in the snapshot, one not
+        index.add_order(2, [1, 3])
+        index.add_order(3, [1, 3])
+        yield 2, [1, 3]
+
+    assert index.rebuild_from(snapshot()) == 3
+    assert [(r.item_id, r.support) for r in index.related(1, limit=5)] == [(3, 2), (2, 1)]
+
+
+def test_cooccurrence_rebuild_keeps_late_commits_with_lower_ids():
+    index = CooccurrenceIndex(min_support=1, min_lift=0.0, refresh_seconds=0)
+
+    def snapshot():
+        # Order 2 got its id first but commits after 3 was read, and after the snapshot
+        index.add_order(3, [1, 2])
+        yield 1, [1, 2]
+        yield 3, [1, 2]
+        index.add_order(2, [1, 4])
+
+    assert index.rebuild_from(snapshot()) == 3
+    assert [(r.item_id, r.support) for r in index.related(1, limit=5)] == [(2, 2), (4, 1)]
+
+
+def test_cooccurrence_rebuild_buffers_orders_before_querying():
+    index = CooccurrenceIndex(min_support=1, min_lift=0.0, refresh_seconds=0)
+
+    class Session:
+        def execute(self, statement):
+            # Committed just before the query's snapshot: in neither unless already buffered
+            index.add_order(5, [7, 8])
+            return iter([])
+
+    assert index.rebuild(Session()) == 1
+    assert index.related(7)[0].item_id == 8
+
+
+def test_item_recommendations_use_the_index(
+    client, db_session, admin_token, customer_token, customer_user, sample_menu_item
+):
+    category_id = sample_menu_item.category_id
+    fries, shake, salad = (
+        MenuItem(name=name, price=4.0, category_id=category_id, is_available=True)
+        for name in ("Fries", "Shake", "Salad")
+    )
+    db_session.add_all([fries, shake, salad])
+    db_session.flush()
+    burger_id, fries_id, shake_id, salad_id = sample_menu_item.id, fries.id, shake.id, salad.id
+    history = [[burger_id, fries_id], [burger_id, fries_id], [burger_id, shake_id], [salad_id], [salad_id]]
+    for index, items in enumerate(history):
+        order = Order(order_number=f"ORD-REC-{index}", customer_id=customer_user.id, total_amount=8.0)
+        db_session.add(order)
+        db_session.flush()
+        db_session.add_all([OrderItem(order_id=order.id, menu_item_id=i, quantity=1, price=4.0) for i in items])
+    db_session.commit()
+
+    # Orders seeded behind the app's back: recount them (workers build at startup, in the background)
+    response = client.post("/api/analytics/recommendations/rebuild", headers=auth_headers(admin_token))
+    assert response.json()["orders"] == 5
+    # The single burger+shake order is below min support
+    response = client.get(f"/api/analytics/recommendations/item/{burger_id}")
+    assert [item["id"] for item in response.json()] == [fries_id]
+    assert cooccurrence_index.order_count == 5
+
+    response = client.get(f"/api/analytics/recommendations/item/{burger_id}", params={"min_support": 1})
+    assert [item["id"] for item in response.json()] == [fries_id, shake_id]
+
+    # New orders are counted as they are committed, without a rebuild
+    place_order(client, customer_token, shake_id, 1)
+    response = client.post(
+        "/api/orders",
+        json={"items": [{"menu_item_id": burger_id, "quantity": 1}, {"menu_item_id": shake_id, "quantity": 2}]},
+        headers=auth_headers(customer_token),
+    )
+    assert response.status_code == 201
+    response = client.get(f"/api/analytics/recommendations/item/{shake_id}")
+    assert [item["name"] for item in response.json()] == ["Test Burger"]
+
+    # No partners: fall back to the most ordered items, excluding the item itself
+    response = client.get(f"/api/analytics/recommendations/item/{salad_id}")
+    assert salad_id not in [item["id"] for item in response.json()]
+    assert response.json()[0]["id"] == burger_id
+
+    response = client.post("/api/analytics/recommendations/rebuild", headers=auth_headers(customer_token))
+    assert response.status_code == 403
+    response = client.post("/api/analytics/recommendations/rebuild", headers=auth_headers(admin_token))
+    assert response.status_code == 200
+    assert response.json()["orders"] == 7
+    assert response.json()["items"] == 4
+
+
+def test_preference_profiles_update_incrementally_and_stay_bounded():
+    profiles = PreferenceProfiles(max_size=2)
+    profiles._store(1, UserProfile(Counter({10: 1}), last_order_id=5))
+
+    profiles.record_order(1, 6, [(10, 2), (11, 1)])
+    profiles.record_order(1, 6, [(10, 2)])  # already applied
+    profiles.record_order(1, 4, [(10, 2)])  # older than the loaded snapshot
+    profiles.record_order(2, 7, [(10, 1)])  # not cached: picked up on next load
+    assert profiles.get_cached(1).item_quantities == Counter({10: 3, 11: 1})
+    assert profiles.get_cached(2) is None
+
+    profiles._store(2, UserProfile(Counter(), 0))
+    profiles._store(3, UserProfile(Counter(), 0))
+    assert profiles.get_cached(1) is None  # least recently used was evicted
+    assert profiles.stats()["size"] == 2
+
+
+def test_preference_profiles_expire_after_ttl():
+    profiles = PreferenceProfiles(max_size=10, ttl_seconds=60)
+    profiles._store(1, UserProfile(Counter({10: 1}), 5))
+    profiles._store(2, UserProfile(Counter({10: 1}), 5, loaded_at=time.monotonic() - 61))
+
+    assert profiles.get_cached(1) is not None
+    # Expired profiles read as a miss, so the next get() reloads them from the database
+    assert profiles.get_cached(2) is None
+    assert profiles.stats()["size"] == 1
+
+
+def test_score_items_ranks_affinity_then_popularity():
+    catalog = [
+        {"id": 1, "category_id": 1, "is_available": True},
+        {"id": 2, "category_id": 1, "is_available": True},
+        {"id": 3, "category_id": 1, "is_available": False},
+        {"id": 4, "category_id": 2, "is_available": True},
+        {"id": 5, "category_id": 2, "is_available": True},
+    ]
+    popularity = {4: 10, 5: 2, 2: 1}
+    new_user = UserProfile(Counter(), 0)
+    assert [i["id"] for i in score_items(catalog, new_user, popularity, limit=3)] == [4, 5, 2]
+
+    regular = UserProfile(Counter({1: 3}), 1)
+    # Same category first, unavailable items never, already ordered items last
+    assert [i["id"] for i in score_items(catalog, regular, popularity, limit=4)] == [2, 4, 5, 1]
+
+
+def test_user_recommendations_follow_profile(
+    client, db_session, customer_token, customer_user, sample_menu_item, query_counter
+):
+    drinks = Category(name="Drinks", is_active=True)
+    db_session.add(drinks)
+    db_session.flush()
+    fries = MenuItem(name="Fries", price=3.0, category_id=sample_menu_item.category_id, is_available=True)
+    cola, juice = (MenuItem(name=n, price=2.0, category_id=drinks.id, is_available=True) for n in ("Cola", "Juice"))
+    db_session.add_all([fries, cola, juice])
+    db_session.commit()
+    burger_id, fries_id, cola_id, juice_id = sample_menu_item.id, fries.id, cola.id, juice.id
+    user_id = customer_user.id
+    url = f"/api/analytics/recommendations/user/{user_id}"
+
+    # No history: global popularity (nothing ordered yet, so catalog order)
+    assert [i["id"] for i in client.get(url, params={"limit": 2}).json()] == [burger_id, fries_id]
+    # The endpoint peeks at the cache before loading; one load is one miss
+    assert preference_profiles.stats()["misses"] == 1
+
+    place_order(client, customer_token, cola_id, 3)
+    place_order(client, customer_token, burger_id, 1)
+    # Drinks dominate the profile; Juice is the only drink not yet ordered
+    ranked = [i["id"] for i in client.get(url).json()]
+    assert ranked == [juice_id, fries_id, cola_id, burger_id]
+
+    # Orders update the cached profile; scoring needs no database round trip
+    place_order(client, customer_token, fries_id, 5)
+    query_counter.clear()
+    ranked = [i["id"] for i in client.get(url).json()]
+    assert query_counter == []
+    # Juice is still the only unordered item; Fries now lead what was ordered before
+    assert ranked == [juice_id, fries_id, burger_id, cola_id]
+    assert preference_profiles.stats()["hits"] >= 2
+
+
+def test_cooccurrence_refresh_runs_off_the_request_path(monkeypatch):
+    index = CooccurrenceIndex(min_support=1, min_lift=0.0, refresh_seconds=60)
+    started = []
+    monkeypatch.setattr(index, "refresh_in_background", lambda: started.append(True))
+
+    # Never built: a lookup starts a background build and serves the empty counts meanwhile
+    index.ensure_fresh()
+    assert started == [True] and index.related(1) == []
+
+    index.rebuild_from([(1, [1, 2])])
+    index.ensure_fresh()
+    assert started == [True]
+
+    # A refresh requested before a rebuild that has since finished keeps the newer counts
+    requested_at = index.built_at - 1
+    index.rebuild_from([(1, [1, 2]), (2, [1, 3])])
+    assert index.rebuild_from([(1, [1, 2])], requested_at) == 2
+    assert index.order_count == 2
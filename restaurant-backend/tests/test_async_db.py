@@ -0,0 +1,115 @@
+# tests/test_async_db.py
+"""Run the ported routers against a real AsyncSession (aiosqlite) to catch lazy loads."""
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from main import app
+from app.database import Base, async_database_url, async_session_scope, get_async_db
+from app.models import User
+from app.utils.auth import get_password_hash
+from app.utils.menu_cache import menu_cache
+from app.utils.order_numbers import order_number_allocator
+from app.utils.principal_cache import principal_cache
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def async_client(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    with sessionmaker(bind=sync_engine)() as session:
+        session.add(User(email="admin@test.com", username="admin", role="admin", is_active=True,
+                         hashed_password=get_password_hash("admin123")))
+        session.commit()
+
+    async_engine = create_async_engine(async_database_url(url))
+    AsyncTestingSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSession() as db:
+            yield db
+
+    order_number_allocator.reset()
+    menu_cache.invalidate()
+    principal_cache.clear()
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    sync_engine.dispose()
+
+
+def test_async_database_url():
+    assert async_database_url("postgresql://u:p@db:5432/app") == "postgresql+psycopg://u:p@db:5432/app"
+    assert async_database_url("postgresql+psycopg2://u:p@db/app") == "postgresql+psycopg://u:p@db/app"
+    assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+
+
+def test_ported_routers_on_async_session(async_client):
+    client = async_client
+    token = client.post("/api/auth/login", json={"email": "admin@test.com", "password": "admin123"}).json()
+    admin = {"Authorization": f"Bearer {token['access_token']}"}
+    assert client.get("/api/auth/me", headers=admin).json()["role"] == "admin"
+    assert client.put("/api/auth/profile", json={"phone": "555"}, headers=admin).json()["phone"] == "555"
+
+    # Menu
+    category = client.post("/api/menu/categories", json={"name": "Mains"}, headers=admin).json()
+    item = client.post("/api/menu", json={"name": "Burger", "price": 10.0, "category_id": category["id"]},
+                       headers=admin).json()
+    assert item["category"]["name"] == "Mains"
+    assert client.put(f"/api/menu/{item['id']}", json={"price": 11.0}, headers=admin).json()["price"] == 11.0
+    assert client.get(f"/api/menu/{item['id']}").json()["name"] == "Burger"
+    assert [i["name"] for i in client.get("/api/menu").json()] == ["Burger"]
+
+    # Orders
+    order = client.post("/api/orders", json={"items": [{"menu_item_id": item["id"], "quantity": 2}]},
+                        headers=admin)
+    assert order.status_code == 201
+    order = order.json()
+    assert order["order_items"][0]["menu_item"]["category"]["name"] == "Mains"
+    assert client.get("/api/orders", headers=admin).json()[0]["id"] == order["id"]
+    assert client.get(f"/api/orders/{order['id']}", headers=admin).json()["total_amount"] == 22.0
+    assert client.get("/api/orders/my-orders", headers=admin).json()[0]["items"][0]["name"] == "Burger"
+    assert client.get(f"/api/orders/track/{order['order_number']}").json()["status"] == "pending"
+    updated = client.patch(f"/api/orders/{order['id']}/status", json={"status": "confirmed"}, headers=admin)
+    assert updated.json()["status"] == "confirmed"
+    guest = client.post("/api/orders/guest", json={
+        "table_number": "4", "guest_name": "Sam", "total_amount": 11.0,
+        "items": [{"menu_item_id": item["id"], "quantity": 1, "price": 11.0}]
+    }).json()
+    assert client.delete(f"/api/orders/{guest['id']}", headers=admin).status_code == 204
+
+    # Tables
+    table = client.post("/api/tables/", json={"number": "T1", "capacity": 4}, headers=admin).json()
+    assert client.put(f"/api/tables/{table['id']}", json={"capacity": 6}, headers=admin).json()["capacity"] == 6
+    assert client.get(f"/api/tables/{table['id']}").json()["number"] == "T1"
+    assert len(client.get("/api/tables/").json()) == 1
+    assert client.delete(f"/api/tables/{table['id']}", headers=admin).status_code == 200
+
+    # Reservations
+    day = (date.today() + timedelta(days=1)).isoformat()
+    reservation = client.post("/api/reservations/", json={
+        "name": "Sam", "email": "sam@test.com", "phone": "123", "date": day, "time": "19:00", "guests": 2
+    }).json()
+    assert client.get(f"/api/reservations/check-availability/{day}/19:00", params={"guests": 2}).json()["available"]
+    assert client.get("/api/reservations/search", params={"phone": "123"}).json()["id"] == reservation["id"]
+    assert client.patch(f"/api/reservations/{reservation['id']}/status", json={"status": "confirmed"}).status_code == 200
+    assert len(client.get("/api/reservations/").json()) == 1
+
+    assert client.delete(f"/api/menu/{item['id']}", headers=admin).status_code == 204
+
+
+def test_adapter_sessions_keep_attributes_after_commit():
+    async def scenario():
+        async with async_session_scope() as db:
+            # Like AsyncSession, or a commit would leave attributes to lazy-load on the event loop
+            assert db.sync_session.expire_on_commit is False
+
+    asyncio.run(scenario())
@@ -0,0 +1,122 @@
+# tests/test_auth.py
+from passlib.context import CryptContext
+from sqlalchemy import update
+
+from app.config import settings
+from app.models import User, UserRole
+from app.utils.auth import password_pool
+from app.utils.principal_cache import PrincipalCache, principal_cache
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def user_lookups(statements):
+    return [s for s in statements if "FROM users" in s]
+
+
+def test_authenticated_requests_skip_user_lookup(client, customer_token, query_counter):
+    assert client.get("/api/auth/me", headers=auth_headers(customer_token)).status_code == 200
+    assert len(user_lookups(query_counter)) == 1
+
+    query_counter.clear()
+    for _ in range(5):
+        response = client.get("/api/auth/me", headers=auth_headers(customer_token))
+        assert response.json()["email"] == "customer@test.com"
+    assert user_lookups(query_counter) == []
+    assert principal_cache.stats()["hits"] == 5
+
+
+def test_deactivation_invalidates_cached_principal(client, customer_token, customer_user, db_session):
+    assert client.get("/api/auth/me", headers=auth_headers(customer_token)).status_code == 200
+
+    customer_user.is_active = False
+    db_session.commit()
+
+    assert client.get("/api/auth/me", headers=auth_headers(customer_token)).status_code == 400
+
+
+def test_role_change_invalidates_cached_principal(client, customer_token, customer_user, db_session):
+    assert client.get("/api/orders/my-orders", headers=auth_headers(customer_token)).status_code == 200
+    assert client.get("/api/auth/principal-cache/stats", headers=auth_headers(customer_token)).status_code == 403
+
+    customer_user.role = UserRole.ADMIN
+    db_session.commit()
+
+    stats = client.get("/api/auth/principal-cache/stats", headers=auth_headers(customer_token))
+    assert stats.status_code == 200
+    assert stats.json()["invalidations"] == 1
+
+
+def test_bulk_user_update_invalidates_cached_principals(client, customer_token, customer_user, db_session):
+    assert client.get("/api/auth/me", headers=auth_headers(customer_token)).status_code == 200
+
+    db_session.execute(update(User).where(User.id == customer_user.id).values(is_active=False))
+    db_session.commit()
+
+    assert client.get("/api/auth/me", headers=auth_headers(customer_token)).status_code == 400
+
+
+def test_profile_update_with_cached_principal(client, customer_token):
+    client.get("/api/auth/me", headers=auth_headers(customer_token))
+
+    response = client.put("/api/auth/profile", json={"full_name": "Renamed"}, headers=auth_headers(customer_token))
+    assert response.status_code == 200
+    assert client.get("/api/auth/me", headers=auth_headers(customer_token)).json()["full_name"] == "Renamed"
+
+
+def test_principal_cache_is_bounded(customer_user):
+    cache = PrincipalCache(ttl_seconds=60, max_size=2)
+    for token in ("a", "b", "c"):
+        cache.put(cache.key(token), customer_user)
+
+    assert cache.get(cache.key("a")) is None
+    assert cache.get(cache.key("c")).email == "customer@test.com"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_principal_cache_respects_token_expiry(customer_user):
+    cache = PrincipalCache(ttl_seconds=60, max_size=10)
+    cache.put(cache.key("expired"), customer_user, token_expires_at=0)
+
+    assert cache.get(cache.key("expired")) is None
+
+
+def test_register_and_login(client):
+    response = client.post("/api/auth/register", json={
+        "email": "new@test.com", "username": "newbie", "password": "secret123"
+    })
+    assert response.status_code == 201
+
+    login = client.post("/api/auth/login", json={"email": "new@test.com", "password": "secret123"})
+    assert login.status_code == 200
+    assert client.post("/api/auth/login", json={"email": "new@test.com", "password": "wrong"}).status_code == 401
+
+
+def test_login_rehashes_when_cost_changes(client, db_session):
+    old_cost = 4 if settings.BCRYPT_ROUNDS != 4 else 5
+    user = User(
+        email="legacy@test.com",
+        username="legacy",
+        hashed_password=CryptContext(schemes=["bcrypt"], bcrypt__rounds=old_cost).hash("legacy123"),
+        role="customer",
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.commit()
+
+    response = client.post("/api/auth/login", json={"email": "legacy@test.com", "password": "legacy123"})
+    assert response.status_code == 200
+
+    db_session.refresh(user)
+    assert user.hashed_password.split("$")[2] == f"{settings.BCRYPT_ROUNDS:02d}"
+    assert client.post("/api/auth/login", json={"email": "legacy@test.com", "password": "legacy123"}).status_code == 200
+
+
+def test_login_rejected_when_password_pool_saturated(client, customer_user, monkeypatch):
+    monkeypatch.setattr(password_pool, "max_pending", 0)
+
+    response = client.post("/api/auth/login", json={"email": "customer@test.com", "password": "customer123"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,154 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import tracemalloc
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from main import app
+from app.database import SyncSessionAdapter, get_async_db, get_db
+from app.models import Order, OrderStatus, Reservation
+from app.routers.orders import ORDER_EXPORT_COLUMNS
+from app.utils.exports import stream_export
+from tests.conftest import TestingSessionLocal
+
+# Small by default; set e.g. EXPORT_STRESS_ORDERS=1000000 to check the claim at full scale (about four minutes)
+STRESS_ORDERS = int(os.environ.get("EXPORT_STRESS_ORDERS", 2_000))
+# Rows per batch in the memory test, small enough for the default size to span many batches
+STRESS_BATCH_SIZE = 100
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def seed_export_orders(db_session, count, start=datetime(2026, 3, 1)):
+    statuses = list(OrderStatus)
+    for first in range(0, count, 50_000):
+        db_session.execute(insert(Order), [
+            {
+                "order_number": f"ORD-EXP-{i:07d}",
+                "status": statuses[i % len(statuses)],
+                "total_amount": 12.5,
+                "table_number": str(i % 20),
+                "notes": 'extra "spicy", no onions' if i % 7 == 0 else None,
+                "created_at": start + timedelta(minutes=i),
+            }
+            for i in range(first, min(first + 50_000, count))
+        ])
+    db_session.commit()
+
+
+def test_order_export_ndjson_with_filters(client, admin_token, db_session):
+    seed_export_orders(db_session, 3 * 24 * 60)  # three days, one order a minute
+
+    response = client.get("/api/orders/export", params={
+        "date_from": "2026-03-02", "date_to": "2026-03-02", "status": "delivered"
+    }, headers=auth_headers(admin_token))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert 'filename="orders-2026-03-02-2026-03-02.ndjson"' in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows and all(row["status"] == "delivered" for row in rows)
+    assert all(row["created_at"].startswith("2026-03-02") for row in rows)
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+    expected = db_session.query(Order).filter(
+        Order.status == OrderStatus.DELIVERED,
+        Order.created_at >= datetime(2026, 3, 2), Order.created_at < datetime(2026, 3, 3)
+    ).count()
+    assert len(rows) == expected
+
+
+def test_order_export_csv(client, admin_token, db_session):
+    seed_export_orders(db_session, 30)
+
+    response = client.get("/api/orders/export", params={"format": "csv"}, headers=auth_headers(admin_token))
+
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == [column.key for column in ORDER_EXPORT_COLUMNS]
+    assert len(rows) == 31
+    assert rows[1][rows[0].index("notes")] == 'extra "spicy", no onions'
+
+
+def test_reservation_export(client, admin_token, customer_token, db_session):
+    start = date.today()
+    db_session.execute(insert(Reservation), [
+        {"name": f"Guest {i}", "email": "g@test.com", "phone": "555", "date": start + timedelta(days=i % 5),
+         "time": "19:00", "guests": 2, "status": "cancelled" if i % 3 == 0 else "confirmed"}
+        for i in range(50)
+    ])
+    db_session.commit()
+
+    response = client.get("/api/reservations/export", params={
+        "date_from": start.isoformat(), "date_to": (start + timedelta(days=1)).isoformat(), "status": "confirmed"
+    }, headers=auth_headers(admin_token))
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == len([i for i in range(50) if i % 5 < 2 and i % 3 != 0])
+    assert [row["date"] for row in rows] == sorted(row["date"] for row in rows)
+
+    assert client.get("/api/reservations/export", headers=auth_headers(customer_token)).status_code == 403
+    assert client.get("/api/orders/export", headers=auth_headers(customer_token)).status_code == 403
+    bad = client.get("/api/orders/export", params={"format": "xlsx"}, headers=auth_headers(admin_token))
+    assert bad.status_code == 422
+
+
+def test_exports_hold_no_request_session(client, admin_token, db_session):
+    seed_export_orders(db_session, 5)
+
+    async def no_request_session():
+        raise AssertionError("exports must not open a request-scoped session")
+        yield
+
+    app.dependency_overrides[get_async_db] = no_request_session
+    app.dependency_overrides[get_db] = no_request_session
+    response = client.get("/api/orders/export", headers=auth_headers(admin_token))
+    assert len(response.text.splitlines()) == 5
+    assert client.get("/api/reservations/export", headers=auth_headers(admin_token)).status_code == 200
+    # Tokens in query strings end up in access logs; only the SSE route takes one
+    assert client.get("/api/reservations/export", params={"token": admin_token}).status_code == 401
+    assert client.get("/api/orders/export").status_code == 401
+
+
+def test_order_export_memory_stays_flat(db_session):
+    seed_export_orders(db_session, STRESS_ORDERS)
+
+    @asynccontextmanager
+    async def session_scope():
+        session = TestingSessionLocal()
+        try:
+            yield SyncSessionAdapter(session)
+        finally:
+            session.close()
+
+    columns = [column.key for column in ORDER_EXPORT_COLUMNS]
+    statement = select(*ORDER_EXPORT_COLUMNS).order_by(Order.created_at, Order.id)
+
+    async def export(rows_wanted):
+        rows = size = 0
+        tracemalloc.start()
+        try:
+            async for chunk in stream_export(
+                session_scope, statement.limit(rows_wanted), columns, "ndjson", STRESS_BATCH_SIZE
+            ):
+                rows += chunk.count("\n")
+                size += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return rows, size, peak
+
+    # Warm up imports, compiled statement caches and the threadpool outside the measurement
+    asyncio.run(export(10))
+    _, _, tenth_peak = asyncio.run(export(STRESS_ORDERS // 10))
+    rows, size, peak = asyncio.run(export(STRESS_ORDERS))
+    assert rows == STRESS_ORDERS
+    # One batch of rows and its encoded chunk at a time: ten times the rows, no more memory
+    assert peak < 4 * 1024 * 1024, f"peak {peak / 1e6:.1f}MB for a {size / 1e6:.1f}MB export"
+    assert peak < tenth_peak * 1.5, f"peak {peak / 1e6:.2f}MB, {tenth_peak / 1e6:.2f}MB for a tenth of the rows"
+    assert peak < size / 2
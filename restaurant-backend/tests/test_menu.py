@@ -0,0 +1,158 @@
+# tests/test_menu.py
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from app.database import SyncSessionAdapter
+from app.utils import menu_cache as menu_cache_module
+from app.utils.menu_cache import CatalogSnapshot, EncodedBody, LocalInvalidationChannel, MenuCatalogCache
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_menu_served_from_cache(client, sample_menu_item, query_counter):
+    first = client.get("/api/menu")
+    assert first.status_code == 200
+    assert [i["name"] for i in first.json()] == ["Test Burger"]
+
+    query_counter.clear()
+    second = client.get("/api/menu")
+    categories = client.get("/api/menu/categories/all")
+
+    assert second.json() == first.json()
+    assert [c["name"] for c in categories.json()] == ["Test Category"]
+    assert query_counter == []
+
+
+def test_menu_filters(client, sample_menu_item, admin_token):
+    client.post("/api/menu", json={
+        "name": "Salad", "price": 6.5, "category_id": sample_menu_item.category_id, "is_vegetarian": True
+    }, headers=auth_headers(admin_token))
+
+    vegetarian = client.get("/api/menu", params={"is_vegetarian": True}).json()
+    by_category = client.get("/api/menu", params={"category_id": sample_menu_item.category_id}).json()
+    paged = client.get("/api/menu", params={"skip": 1, "limit": 1}).json()
+
+    assert [i["name"] for i in vegetarian] == ["Salad"]
+    assert len(by_category) == 2
+    assert [i["name"] for i in paged] == ["Salad"]
+
+
+def test_menu_cursor_pagination(client, sample_menu_item, admin_token):
+    for name in ("Salad", "Soup", "Pie"):
+        client.post("/api/menu", json={
+            "name": name, "price": 6.5, "category_id": sample_menu_item.category_id
+        }, headers=auth_headers(admin_token))
+
+    first = client.get("/api/menu", params={"limit": 3})
+    second = client.get("/api/menu", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+    assert [i["name"] for i in first.json()] == ["Test Burger", "Salad", "Soup"]
+    assert [i["name"] for i in second.json()] == ["Pie"]
+    assert "X-Next-Cursor" not in second.headers
+    # Cached bodies keep their cursor header
+    assert client.get("/api/menu", params={"limit": 3}).headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+    assert client.get("/api/menu", params={"cursor": "bad"}).status_code == 400
+
+
+def test_menu_etag_not_modified(client, sample_menu_item):
+    response = client.get("/api/menu")
+    etag = response.headers["ETag"]
+
+    cached = client.get("/api/menu", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+    categories = client.get("/api/menu/categories/all")
+    assert categories.headers["ETag"] == etag
+    assert client.get("/api/menu/categories/all", headers={"If-None-Match": etag}).status_code == 304
+    # Lists of tags, weak tags and "*" match too
+    for header in (f'"stale", {etag}', f"W/{etag}", "*"):
+        assert client.get("/api/menu", headers={"If-None-Match": header}).status_code == 304
+    assert client.get("/api/menu", headers={"If-None-Match": '"stale", W/"other"'}).status_code == 200
+
+
+def test_menu_writes_invalidate_cache(client, sample_menu_item, admin_token):
+    etag = client.get("/api/menu").headers["ETag"]
+
+    client.put(f"/api/menu/{sample_menu_item.id}", json={"price": 14.5}, headers=auth_headers(admin_token))
+    updated = client.get("/api/menu", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()[0]["price"] == 14.5
+    assert updated.headers["ETag"] != etag
+
+    client.post("/api/menu/categories", json={"name": "Drinks"}, headers=auth_headers(admin_token))
+    assert "Drinks" in [c["name"] for c in client.get("/api/menu/categories/all").json()]
+
+    client.delete(f"/api/menu/{sample_menu_item.id}", headers=auth_headers(admin_token))
+    assert client.get("/api/menu").json() == []
+
+
+def test_invalidation_reaches_other_workers(db_session, sample_menu_item):
+    channel = LocalInvalidationChannel()
+    worker_a, worker_b = MenuCatalogCache(channel), MenuCatalogCache(channel)
+    db = SyncSessionAdapter(db_session)
+    version = asyncio.run(worker_b.get(db)).version
+
+    sample_menu_item.price = 20.0
+    db_session.commit()
+    assert asyncio.run(worker_b.get(db)).version == version
+
+    worker_a.invalidate()
+    refreshed = asyncio.run(worker_b.get(db))
+    assert refreshed.version != version
+    assert refreshed.items[0]["price"] == 20.0
+
+
+def test_menu_compressed_variants(client, sample_menu_item):
+    plain = client.get("/api/menu", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/api/menu", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["Vary"] == "Accept-Encoding"
+    assert gzipped.json() == plain.json()
+
+
+def test_encoded_body_negotiation():
+    body = EncodedBody([{"name": "Café", "price": 4.5}])
+
+    assert json.loads(body.identity) == [{"name": "Café", "price": 4.5}]
+    assert gzip.decompress(body.gzip) == body.identity
+    assert body.select("") == (body.identity, None)
+    assert body.select("gzip, deflate") == (body.gzip, "gzip")
+    assert body.select("gzip;q=0, identity") == (body.identity, None)
+
+
+def test_encoded_body_brotli():
+    brotli = pytest.importorskip("brotli")
+    body = EncodedBody({"a": 1})
+
+    assert brotli.decompress(body.br) == body.identity
+    assert body.select("gzip, br") == (body.br, "br")
+
+
+def test_encoded_body_compresses_only_negotiated_encoding():
+    body = EncodedBody({"a": 1})
+
+    assert body.select("identity") == (body.identity, None)
+    assert "gzip" not in vars(body) and "br" not in vars(body)
+    body.select("gzip")
+    assert "gzip" in vars(body) and "br" not in vars(body)
+
+
+def test_rendered_bodies_evict_least_recently_used(monkeypatch):
+    monkeypatch.setattr(menu_cache_module, "MAX_RENDERED_BODIES", 2)
+    snapshot = CatalogSnapshot([], [])
+    builds = []
+
+    def render(key):
+        return snapshot.rendered(key, lambda: builds.append(key) or EncodedBody(key))
+
+    render("a"), render("b"), render("a"), render("c")
+    render("a")
+    render("b")
+    assert builds == ["a", "b", "c", "b"]
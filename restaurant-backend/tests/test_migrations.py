@@ -0,0 +1,81 @@
+import importlib.util
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
+
+from app.database import Base
+import app.models  # noqa: F401
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+VERSIONS = ALEMBIC_INI.parent / "alembic" / "versions"
+
+
+def migration_indexes():
+    """Indexes created by the INDEXES lists of every migration."""
+    names = set()
+    for path in sorted(VERSIONS.glob("*.py")):
+        spec = importlib.util.spec_from_file_location(path.stem, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        names.update(name for name, _, _ in getattr(module, "INDEXES", ()))
+    return names
+
+
+def model_indexes():
+    return {index.name for table in Base.metadata.sorted_tables for index in table.indexes if index.name}
+
+
+def database_indexes(engine):
+    inspector = inspect(engine)
+    return {index["name"] for table in inspector.get_table_names() for index in inspector.get_indexes(table)}
+
+
+def run_alembic(engine, action, revision):
+    config = Config(str(ALEMBIC_INI))
+    with engine.connect() as connection:
+        config.attributes["connection"] = connection
+        getattr(command, action)(config, revision)
+        connection.commit()
+
+
+def test_migrations_add_hot_query_indexes_to_existing_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'existing.db'}")
+    Base.metadata.create_all(engine)
+    # An existing database predates the indexes: create_all never adds them to existing tables
+    hot_indexes = migration_indexes()
+    assert hot_indexes <= model_indexes()
+    with engine.begin() as connection:
+        for name in hot_indexes:
+            connection.exec_driver_sql(f"DROP INDEX {name}")
+    assert not hot_indexes & database_indexes(engine)
+
+    run_alembic(engine, "upgrade", "head")
+    assert model_indexes() <= database_indexes(engine)
+
+    # Running again (or on a fresh create_all database) is a no-op
+    run_alembic(engine, "downgrade", "0002_hot_query_indexes")
+    run_alembic(engine, "upgrade", "head")
+
+    run_alembic(engine, "downgrade", "0001_baseline")
+    assert not hot_indexes & database_indexes(engine)
+    engine.dispose()
+
+
+def test_order_changes_migration_backfills_updated_at(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'existing.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO orders (order_number, total_amount, created_at, updated_at)"
+            " VALUES ('ORD-1', 1.0, '2026-01-01 10:00:00', NULL)"
+        )
+    run_alembic(engine, "upgrade", "head")
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT updated_at FROM orders").scalar() == "2026-01-01 10:00:00"
+    with engine.begin() as connection:
+        # New rows are stamped by the database clock
+        connection.exec_driver_sql("INSERT INTO orders (order_number, total_amount) VALUES ('ORD-2', 1.0)")
+        assert connection.exec_driver_sql("SELECT updated_at FROM orders WHERE order_number = 'ORD-2'").scalar()
+    engine.dispose()
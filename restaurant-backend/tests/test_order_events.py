@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+from app.utils.order_events import OrderEventLog
+
+
+def parse_sse(text):
+    """Split a text/event-stream body into dicts of its fields (comments dropped)."""
+    events = []
+    for block in text.split("\n\n"):
+        fields = {}
+        for line in block.splitlines():
+            if line.startswith(":"):
+                continue
+            name, _, value = line.partition(": ")
+            fields[name] = value
+        if fields:
+            events.append(fields)
+    return events
+
+
+async def collect(log, last_event_id):
+    return parse_sse("".join([chunk async for chunk in log.stream(last_event_id, follow=False)]))
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_replay_after_last_event_id():
+    async def scenario():
+        log = OrderEventLog(size=10)
+        ids = [log.append(json.dumps({"n": n})) for n in range(5)]
+        events = await collect(log, ids[1])
+        assert events[0] == {"retry": "3000"}
+        assert [event["id"] for event in events[1:]] == ids[2:]
+        assert [json.loads(event["data"])["n"] for event in events[1:]] == [2, 3, 4]
+        assert await collect(log, ids[-1]) == [{"retry": "3000"}]
+
+    asyncio.run(scenario())
+
+
+def test_fresh_client_gets_the_current_position_only():
+    async def scenario():
+        log = OrderEventLog(size=10)
+        log.append("{}")
+        head = log.append("{}")
+        assert await collect(log, None) == [{"retry": "3000"}, {"id": head}]
+
+    asyncio.run(scenario())
+
+
+def test_unreplayable_ids_get_a_reset():
+    async def scenario():
+        log = OrderEventLog(size=3)
+        first = log.append("{}")
+        for _ in range(5):
+            head = log.append("{}")
+        for stale in (first, "otherworker-3", "garbage", f"{log.epoch}-999"):
+            events = await collect(log, stale)
+            assert events[1]["event"] == "reset"
+            assert events[1]["id"] == head
+            assert len(events) == 2
+        # The oldest retained event can still be resumed from the one before it
+        assert len(await collect(log, f"{log.epoch}-3")) == 1 + 3
+
+    asyncio.run(scenario())
+
+
+def test_live_stream_receives_new_events_and_heartbeats():
+    async def scenario():
+        log = OrderEventLog(size=10)
+        stream = log.stream(None, heartbeat_seconds=0.05)
+        assert (await anext(stream)).startswith("retry")
+        await anext(stream)  # current position
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        event_id = log.append('{"type":"new_order"}')
+        assert await asyncio.wait_for(pending, 1) == f'id: {event_id}\ndata: {{"type":"new_order"}}\n\n'
+        assert await asyncio.wait_for(anext(stream), 1) == ": keep-alive\n\n"
+        assert log.stats()["streams"] == 1
+        await stream.aclose()
+        assert log.stats()["streams"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_event_stream_replays_order_events(client, admin_token, customer_token, sample_menu_item):
+    headers = auth_headers(admin_token)
+    created = client.post(
+        "/api/orders", json={"items": [{"menu_item_id": sample_menu_item.id, "quantity": 1}]},
+        headers=auth_headers(customer_token),
+    ).json()
+    guest = client.post("/api/orders/guest", json={
+        "table_number": 4, "guest_name": "Sam", "total_amount": 12.0,
+        "items": [{"menu_item_id": sample_menu_item.id, "quantity": 1, "price": 12.0}],
+    }).json()
+    client.patch(f"/api/orders/{created['id']}/status", json={"status": "confirmed"}, headers=headers)
+    client.delete(f"/api/orders/{guest['id']}", headers=headers)
+
+    response = client.get("/api/orders/events", params={"follow": False}, headers=headers)
+    assert response.headers["content-type"].startswith("text/event-stream")
+    head = parse_sse(response.text)[1]["id"]
+
+    first_id = head.rsplit("-", 1)[0] + "-1"
+    response = client.get("/api/orders/events", params={"follow": False}, headers={**headers, "Last-Event-ID": first_id})
+    events = [json.loads(event["data"]) for event in parse_sse(response.text)[1:]]
+    assert [(event["type"], event["order"]["id"], event["order"]["status"]) for event in events] == [
+        ("new_order", guest["id"], "pending"),
+        ("order_status_updated", created["id"], "confirmed"),
+        ("order_status_updated", guest["id"], "cancelled"),
+    ]
+    assert parse_sse(response.text)[-1]["id"] == head
+
+
+def test_event_stream_is_admin_only(client, admin_token, customer_token):
+    assert client.get("/api/orders/events", params={"follow": False}).status_code == 401
+    response = client.get("/api/orders/events", params={"follow": False}, headers=auth_headers(customer_token))
+    assert response.status_code == 403
+    # EventSource clients pass the token in the query string
+    response = client.get("/api/orders/events", params={"follow": False, "token": admin_token})
+    assert response.status_code == 200
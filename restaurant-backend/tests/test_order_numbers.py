@@ -0,0 +1,97 @@
+# tests/test_order_numbers.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, event, exc, func
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Order, OrderStatus
+from app.utils.order_numbers import OrderNumberAllocator, format_order_number
+
+# Enough to cross dozens of allocator blocks; set e.g. ORDER_NUMBER_STRESS_ORDERS=50000 for a long soak
+STRESS_ORDERS = int(os.environ.get("ORDER_NUMBER_STRESS_ORDERS", 2_000))
+
+
+def test_order_numbers_are_sequential_per_day(db_session):
+    allocator = OrderNumberAllocator(block_size=5)
+    engine = db_session.get_bind()
+
+    today = [allocator.next_value(engine, date(2026, 3, 1)) for _ in range(12)]
+    tomorrow = [allocator.next_value(engine, date(2026, 3, 2)) for _ in range(3)]
+
+    assert today == list(range(1, 13))
+    assert tomorrow == [1, 2, 3]
+    assert format_order_number(date(2026, 3, 1), 7) == "ORD-20260301-0007"
+
+
+def test_order_numbers_unique_under_concurrency(tmp_path):
+    """Create many orders from a thread pool through two allocators (two simulated workers)."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'orders.db'}",
+        connect_args={"check_same_thread": False, "timeout": 60},
+        pool_size=16,
+        max_overflow=0,
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.close()
+
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    workers = [OrderNumberAllocator(block_size=50), OrderNumberAllocator(block_size=50)]
+    day = date(2026, 3, 1)
+
+    def create_orders(worker_index, count):
+        allocator = workers[worker_index % len(workers)]
+        session = Session()
+        try:
+            for _ in range(count):
+                session.add(Order(
+                    order_number=format_order_number(day, allocator.next_value(engine, day)),
+                    total_amount=1.0,
+                    status=OrderStatus.PENDING
+                ))
+                session.commit()
+        finally:
+            session.close()
+
+    threads = 16
+    per_thread = STRESS_ORDERS // threads
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(create_orders, i, per_thread) for i in range(threads)]:
+            future.result()  # Any duplicate would surface here as an IntegrityError
+
+    session = Session()
+    total = session.query(func.count(Order.id)).scalar()
+    distinct = session.query(func.count(func.distinct(Order.order_number))).scalar()
+    session.close()
+    engine.dispose()
+
+    assert total == per_thread * threads
+    assert distinct == total
+
+
+def test_block_reservation_does_not_wait_on_an_exhausted_request_pool(tmp_path):
+    url = f"sqlite:///{tmp_path / 'orders.db'}"
+    options = {"connect_args": {"check_same_thread": False}, "pool_size": 1, "max_overflow": 0, "pool_timeout": 0.2}
+    request_engine = create_engine(url, **options)
+    sequence_engine = create_engine(url, **options)
+    Base.metadata.create_all(bind=request_engine)
+    allocator = OrderNumberAllocator(block_size=5)
+    day = date(2026, 3, 1)
+
+    # Every request connection is checked out by sessions that each need a new block
+    with request_engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            allocator.next_value(request_engine, day)
+        assert allocator.next_value(sequence_engine, day) == 1
+
+    request_engine.dispose()
+    sequence_engine.dispose()
@@ -0,0 +1,224 @@
+# tests/test_orders.py
+from datetime import datetime, timedelta
+
+from app.models import MenuItem, Order, OrderItem, OrderStatus
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def seed_orders(db_session, customer, menu_item, count, lines=3):
+    """Insert `count` orders with `lines` items each for customer, two per second."""
+    existing = db_session.query(Order).count()
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    orders = []
+    for i in range(existing, existing + count):
+        order = Order(
+            order_number=f"ORD-TEST-{i:05d}",
+            customer_id=customer.id,
+            created_at=start + timedelta(seconds=i // 2),
+            total_amount=menu_item.price * lines,
+            status=OrderStatus.PENDING
+        )
+        order.order_items = [OrderItem(menu_item_id=menu_item.id, quantity=1, price=menu_item.price)
+                             for _ in range(lines)]
+        orders.append(order)
+    db_session.add_all(orders)
+    db_session.commit()
+    return orders
+
+
+def test_create_order_computes_total(client, customer_token, sample_menu_item, db_session):
+    side = MenuItem(name="Fries", price=3.5, category_id=sample_menu_item.category_id, is_available=True)
+    db_session.add(side)
+    db_session.commit()
+
+    response = client.post("/api/orders", json={
+        "items": [
+            {"menu_item_id": sample_menu_item.id, "quantity": 2},
+            {"menu_item_id": side.id, "quantity": 1, "special_instructions": "extra salt"},
+        ]
+    }, headers=auth_headers(customer_token))
+
+    assert response.status_code == 201
+    data = response.json()
+    assert data["total_amount"] == round(12.99 * 2 + 3.5, 2)
+    assert len(data["order_items"]) == 2
+    assert {i["special_instructions"] for i in data["order_items"]} == {None, "extra salt"}
+
+
+def test_create_order_unknown_item(client, customer_token, sample_menu_item):
+    response = client.post("/api/orders", json={
+        "items": [
+            {"menu_item_id": sample_menu_item.id, "quantity": 1},
+            {"menu_item_id": 9999, "quantity": 1},
+        ]
+    }, headers=auth_headers(customer_token))
+
+    assert response.status_code == 404
+    assert "9999" in response.json()["detail"]
+
+
+def test_create_order_unavailable_item(client, customer_token, sample_menu_item, db_session):
+    sample_menu_item.is_available = False
+    db_session.commit()
+
+    response = client.post("/api/orders", json={
+        "items": [{"menu_item_id": sample_menu_item.id, "quantity": 1}]
+    }, headers=auth_headers(customer_token))
+
+    assert response.status_code == 400
+
+
+def test_create_order_query_count_independent_of_size(client, customer_token, sample_menu_item, db_session,
+                                                     query_counter):
+    items = [MenuItem(name=f"Dish {i}", price=5.0, category_id=sample_menu_item.category_id, is_available=True)
+             for i in range(15)]
+    db_session.add_all(items)
+    db_session.commit()
+    item_ids = [item.id for item in items]
+    # Warm up so neither measured request has to reserve an order-number block
+    client.post("/api/orders", json={"items": [{"menu_item_id": item_ids[0], "quantity": 1}]},
+                headers=auth_headers(customer_token))
+
+    counts = []
+    for size in (1, 15):
+        query_counter.clear()
+        response = client.post("/api/orders", json={
+            "items": [{"menu_item_id": item_id, "quantity": 1} for item_id in item_ids[:size]]
+        }, headers=auth_headers(customer_token))
+        assert response.status_code == 201
+        assert len(response.json()["order_items"]) == size
+        counts.append(len(query_counter))
+
+    assert counts[0] == counts[1]
+    inserts = [s for s in query_counter if s.lstrip().startswith("INSERT INTO order_items")]
+    assert len(inserts) == 1
+
+
+def test_my_orders_fixed_query_budget(client, customer_token, customer_user, sample_menu_item, db_session,
+                                      query_counter):
+    client.get("/api/orders/my-orders", headers=auth_headers(customer_token))  # Warm the principal cache
+    counts = []
+    for count in (2, 40):
+        seed_orders(db_session, customer_user, sample_menu_item, count)
+        query_counter.clear()
+        response = client.get("/api/orders/my-orders", headers=auth_headers(customer_token))
+        assert response.status_code == 200
+        assert all(order["items"][0]["name"] == "Test Burger" for order in response.json())
+        counts.append(len(query_counter))
+
+    # Pages by default: 42 orders do not come back in one response
+    assert len(response.json()) == 20
+    assert response.headers["X-Next-Cursor"]
+    assert counts[0] == counts[1]
+    assert counts[1] <= 3  # orders, order_items + menu_items
+
+
+def test_next_cursor_is_readable_cross_origin(client, customer_token):
+    # The browser frontend runs on another origin and follows this header to page
+    response = client.get(
+        "/api/orders/my-orders", headers={**auth_headers(customer_token), "Origin": "http://localhost:3000"}
+    )
+    assert "x-next-cursor" in response.headers["access-control-expose-headers"].lower()
+
+
+def test_my_orders_cursor_pagination(client, customer_token, customer_user, sample_menu_item, db_session):
+    orders = seed_orders(db_session, customer_user, sample_menu_item, 7, lines=1)
+    expected = sorted(((o.created_at, o.id) for o in orders), reverse=True)
+
+    seen = []
+    cursor = None
+    for _ in range(len(orders)):
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/orders/my-orders", params=params, headers=auth_headers(customer_token))
+        assert response.status_code == 200
+        seen.extend(order["id"] for order in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == [order_id for _, order_id in expected]
+
+
+def test_admin_orders_cursor_pagination(client, admin_token, customer_user, sample_menu_item, db_session):
+    orders = seed_orders(db_session, customer_user, sample_menu_item, 9, lines=1)
+    expected = [order.id for order in sorted(orders, key=lambda o: (o.created_at, o.id), reverse=True)]
+
+    seen, cursor = [], None
+    for _ in range(10):
+        params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/orders", params=params, headers=auth_headers(admin_token))
+        assert response.status_code == 200
+        page = [order["id"] for order in response.json()]
+        seen.extend(page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        # An order placed between pages lands before the cursor and does not shift later pages
+        seed_orders(db_session, customer_user, sample_menu_item, 1, lines=1)
+
+    assert seen == expected
+    assert client.get("/api/orders", params={"limit": 3, "skip": 3}, headers=auth_headers(admin_token)).status_code == 200
+    bad = client.get("/api/orders", params={"cursor": "nope"}, headers=auth_headers(admin_token))
+    assert bad.status_code == 400
+
+
+def test_my_orders_rejects_bad_cursor(client, customer_token):
+    response = client.get("/api/orders/my-orders", params={"cursor": "not-a-cursor", "limit": 5},
+                          headers=auth_headers(customer_token))
+    assert response.status_code == 400
+
+
+def test_track_order_fixed_query_budget(client, customer_user, sample_menu_item, db_session, query_counter):
+    small, large = seed_orders(db_session, customer_user, sample_menu_item, 1, lines=1) + \
+        seed_orders(db_session, customer_user, sample_menu_item, 1, lines=25)
+    small_number, large_number = small.order_number, large.order_number
+
+    counts = []
+    for order_number, lines in ((small_number, 1), (large_number, 25)):
+        query_counter.clear()
+        response = client.get(f"/api/orders/track/{order_number}")
+        assert response.status_code == 200
+        assert len(response.json()["items"]) == lines
+        counts.append(len(query_counter))
+
+    assert counts[0] == counts[1]
+
+
+def test_order_changes_returns_only_new_changes(client, admin_token, customer_user, sample_menu_item, db_session,
+                                                monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "ORDER_CHANGES_SETTLE_SECONDS", 0)
+    orders = seed_orders(db_session, customer_user, sample_menu_item, 5, lines=2)
+    headers = auth_headers(admin_token)
+
+    first = client.get("/api/orders/changes", params={"limit": 3}, headers=headers).json()
+    assert [change["id"] for change in first["changes"]] == [order.id for order in orders[:3]]
+    assert first["has_more"] is True
+    assert first["changes"][0]["items"] == [[sample_menu_item.id, 1], [sample_menu_item.id, 1]]
+    rest = client.get("/api/orders/changes", params={"since": first["cursor"]}, headers=headers).json()
+    assert [change["id"] for change in rest["changes"]] == [order.id for order in orders[3:]]
+    assert rest["has_more"] is False
+
+    idle = client.get("/api/orders/changes", params={"since": rest["cursor"]}, headers=headers).json()
+    assert idle == {"changes": [], "cursor": rest["cursor"], "has_more": False}
+
+    client.patch(f"/api/orders/{orders[1].id}/status", json={"status": "confirmed"}, headers=headers)
+    changed = client.get("/api/orders/changes", params={"since": rest["cursor"]}, headers=headers).json()
+    assert [(change["id"], change["status"]) for change in changed["changes"]] == [(orders[1].id, "confirmed")]
+
+
+def test_order_changes_holds_back_unsettled_rows(client, admin_token, customer_user, sample_menu_item, db_session):
+    seed_orders(db_session, customer_user, sample_menu_item, 2)
+    response = client.get("/api/orders/changes", headers=auth_headers(admin_token)).json()
+    assert response == {"changes": [], "cursor": None, "has_more": False}
+
+
+def test_order_changes_is_admin_only(client, customer_token, admin_token):
+    assert client.get("/api/orders/changes", headers=auth_headers(customer_token)).status_code == 403
+    response = client.get("/api/orders/changes", params={"since": "garbage"}, headers=auth_headers(admin_token))
+    assert response.status_code == 400
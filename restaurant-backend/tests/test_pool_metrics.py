@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool
+
+from app.config import settings
+from app.database import pool_options
+from app.pool_metrics import PoolMetrics, WAIT_BUCKETS_MS, instrumented_pool_class
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def metered_engine(tmp_path):
+    metrics = PoolMetrics("test")
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool_class(QueuePool, metrics),
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    metrics.attach(engine)
+    yield engine, metrics
+    engine.dispose()
+
+
+def test_pool_metrics_track_checkouts_overflow_and_timeouts(metered_engine):
+    engine, metrics = metered_engine
+
+    first = engine.connect()
+    second = engine.connect()  # beyond pool_size, so opened as overflow
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["pool_class"] == "InstrumentedQueuePool"
+    assert snapshot["size"] == 1
+    assert snapshot["checked_out"] == 2
+    assert snapshot["overflow"] == 1
+    assert snapshot["overflow_events"] == 1
+    assert snapshot["connects"] == 2
+    assert snapshot["checkouts"] == 2
+    assert snapshot["timeouts"] == 1
+
+    wait = snapshot["wait"]
+    assert wait["count"] == 3
+    assert wait["max_ms"] >= 50  # the timed-out checkout waited pool_timeout
+    histogram = wait["histogram_ms"]
+    assert len(histogram) == len(WAIT_BUCKETS_MS) + 1
+    assert histogram[-1] == {"le_ms": "+Inf", "count": 3}
+    assert [b["count"] for b in histogram] == sorted(b["count"] for b in histogram)
+
+    first.close()
+    second.close()
+    snapshot = metrics.snapshot()
+    assert snapshot["checked_out"] == 0
+    assert snapshot["idle"] == 1
+    assert snapshot["checkins"] == 2
+
+    metrics.reset()
+    assert metrics.snapshot()["checkouts"] == 0
+    assert metrics.snapshot()["wait"]["count"] == 0
+
+
+def test_pool_options_apply_settings_except_for_sqlite():
+    metrics = PoolMetrics("options")
+    assert pool_options("sqlite://", QueuePool, metrics) == {}
+
+    options = pool_options("postgresql://user:pw@localhost/db", QueuePool, metrics)
+    assert issubclass(options["poolclass"], QueuePool)
+    assert options["pool_size"] == settings.DB_POOL_SIZE
+    assert options["max_overflow"] == settings.DB_MAX_OVERFLOW
+    assert options["pool_timeout"] == settings.DB_POOL_TIMEOUT
+    assert options["pool_recycle"] == settings.DB_POOL_RECYCLE
+
+
+def test_db_pool_metrics_endpoint_is_admin_only(client, admin_token, customer_token):
+    response = client.get("/api/restaurant/metrics/db-pool", headers=auth_headers(customer_token))
+    assert response.status_code == 403
+
+    response = client.get("/api/restaurant/metrics/db-pool", headers=auth_headers(admin_token))
+    assert response.status_code == 200
+    body = response.json()
+    assert "sync" in body
+    assert {"checkouts", "overflow_events", "timeouts", "wait"} <= body["sync"].keys()
+    assert body["sync"]["wait"]["histogram_ms"][-1]["le_ms"] == "+Inf"
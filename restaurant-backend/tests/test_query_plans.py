@@ -0,0 +1,168 @@
+"""
+EXPLAIN-based guard for hot endpoint queries.
+
+Seeds a large dataset, records every SELECT the hot endpoints issue and runs
+EXPLAIN QUERY PLAN on it. Any "SCAN <table>" step on a large table fails the
+test: a full table scan, or an index walked end to end while filtering rows
+(how SQLite degrades when the filter columns lack an index). Requests that
+legitimately walk an index in order under a LIMIT list that step explicitly.
+"""
+import random
+import re
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert
+
+from app.models import MenuItem, Order, OrderItem, OrderStatus, Reservation, User, UserRole
+from app.utils.cooccurrence import cooccurrence_index
+from tests.conftest import engine
+
+LARGE_TABLES = ("orders", "order_items", "reservations")
+SCAN = re.compile(rf"^SCAN ({'|'.join(LARGE_TABLES)})(_\d+)?\b")
+
+ORDERS = 20000
+CUSTOMERS = 200
+RESERVATIONS = 5000
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def large_dataset(db_session, customer_user, sample_menu_item):
+    rng = random.Random(42)
+    category_id = sample_menu_item.category_id
+    db_session.execute(insert(MenuItem), [
+        {"name": f"Dish {i}", "price": 5.0, "category_id": category_id, "is_available": i % 5 != 0}
+        for i in range(100)
+    ])
+    menu_ids = [sample_menu_item.id] + [row.id for row in db_session.query(MenuItem.id).filter(MenuItem.id != sample_menu_item.id)]
+    db_session.execute(insert(User), [
+        {"email": f"c{i}@test.com", "username": f"c{i}", "hashed_password": "x", "role": UserRole.CUSTOMER}
+        for i in range(CUSTOMERS)
+    ])
+    customer_ids = [customer_user.id] + [row.id for row in db_session.query(User.id).filter(User.email.like("c%@test.com"))]
+
+    start = datetime.now() - timedelta(days=400)
+    db_session.execute(insert(Order), [
+        {
+            "id": i,
+            "order_number": f"ORD-PLAN-{i:06d}",
+            "customer_id": customer_ids[i % len(customer_ids)],
+            "status": rng.choice(list(OrderStatus)),
+            "total_amount": 10.0,
+            "created_at": start + timedelta(minutes=30 * i),
+            "updated_at": start + timedelta(minutes=30 * i),
+        }
+        for i in range(1, ORDERS + 1)
+    ])
+    db_session.execute(insert(OrderItem), [
+        {"order_id": i, "menu_item_id": rng.choice(menu_ids), "quantity": 1, "price": 5.0}
+        for i in range(1, ORDERS + 1)
+        for _ in range(rng.randint(1, 4))
+    ])
+    db_session.execute(insert(Reservation), [
+        {
+            "name": f"Guest {i}",
+            "email": f"g{i}@test.com",
+            "phone": f"555{i:06d}",
+            "date": date.today() + timedelta(days=i % 60),
+            "time": f"{12 + i % 10}:00",
+            "guests": 2,
+            "status": "pending",
+            "created_at": start + timedelta(hours=i),
+        }
+        for i in range(RESERVATIONS)
+    ])
+    db_session.commit()
+    db_session.connection().exec_driver_sql("ANALYZE")
+    db_session.commit()
+    # Built once per worker in the background, not per request
+    cooccurrence_index.rebuild(db_session)
+
+
+@pytest.fixture
+def captured_selects():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def scans(db_session, statement, parameters):
+    plan = db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in plan if SCAN.match(row[-1])]
+
+
+def hot_requests(client, admin_token, customer_token, customer_user):
+    """Yield (name, response, allowed scan steps) for each hot request."""
+    customer, admin = auth_headers(customer_token), auth_headers(admin_token)
+    first_page = client.get("/api/orders/my-orders", params={"limit": 20}, headers=customer)
+    yield "my orders", first_page, ()
+    yield "my orders, next page", client.get(
+        "/api/orders/my-orders",
+        params={"limit": 20, "cursor": first_page.headers["X-Next-Cursor"]},
+        headers=customer,
+    ), ()
+    yield "admin orders by status", client.get(
+        "/api/orders", params={"status": "pending", "limit": 20}, headers=admin
+    ), ()
+    # Unfiltered newest-first list: walks the created_at index and stops at the LIMIT
+    admin_page = client.get("/api/orders", params={"limit": 20}, headers=admin)
+    yield "admin orders", admin_page, (
+        "SCAN orders USING INDEX ix_orders_created_at",
+    )
+    yield "admin orders, next page", client.get(
+        "/api/orders", params={"limit": 20, "cursor": admin_page.headers["X-Next-Cursor"]}, headers=admin
+    ), ()
+    changes = client.get("/api/orders/changes", params={"limit": 100}, headers=admin)
+    yield "order changes", changes, ()
+    yield "order changes, next page", client.get(
+        "/api/orders/changes", params={"limit": 100, "since": changes.json()["cursor"]}, headers=admin
+    ), ()
+    order_id = first_page.json()[0]["id"]
+    yield "order detail", client.get(f"/api/orders/{order_id}", headers=customer), ()
+    yield "track order", client.get(f"/api/orders/track/ORD-PLAN-{order_id:06d}"), ()
+    yield "hourly sales", client.get("/api/analytics/sales-trends", params={"days": 2, "granularity": "hour"}), ()
+    yield "user recommendations", client.get(f"/api/analytics/recommendations/user/{customer_user.id}"), ()
+    slot = (date.today() + timedelta(days=3)).isoformat()
+    yield "availability", client.get(
+        f"/api/reservations/check-availability/{slot}/13:00", params={"guests": 2}
+    ), ()
+    # Admin reservation list: walks the listing index from the latest slot and stops at the LIMIT
+    reservations = client.get("/api/reservations/", params={"limit": 50})
+    yield "reservations", reservations, ("SCAN reservations USING INDEX ix_reservations_date_time_id",)
+    yield "reservations, next page", client.get(
+        "/api/reservations/", params={"limit": 50, "cursor": reservations.headers["X-Next-Cursor"]}
+    ), ()
+    yield "reservation by phone", client.get("/api/reservations/search", params={"phone": "555000042"}), ()
+
+
+def test_hot_queries_avoid_full_table_scans(
+    client, db_session, large_dataset, admin_token, customer_token, customer_user, captured_selects
+):
+    failures = []
+    for name, response, allowed in hot_requests(client, admin_token, customer_token, customer_user):
+        assert response.status_code == 200, (name, response.text)
+        for statement, parameters in captured_selects:
+            found = [step for step in scans(db_session, statement, parameters) if step not in allowed]
+            if found:
+                failures.append(f"{name}: {found} in\n{statement}")
+        captured_selects.clear()
+
+    assert not failures, "\n\n".join(failures)
+
+
+def test_harness_flags_unindexed_queries(db_session, large_dataset):
+    # A filter on a column without an index must be reported
+    statement = "SELECT id FROM orders WHERE total_amount > ?"
+    assert scans(db_session, statement, (5.0,)) == ["SCAN orders"]
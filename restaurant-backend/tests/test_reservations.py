@@ -0,0 +1,142 @@
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from app.config import settings
+from app.models import Reservation, Table
+from app.utils.availability import parse_time
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def seed_reservations(db_session, days, times, per_slot=2):
+    """Insert per_slot reservations for every (day offset, time) combination."""
+    start = date.today() + timedelta(days=1)
+    db_session.execute(insert(Reservation), [
+        {
+            "name": f"Guest {day}-{time}-{n}", "email": "g@test.com", "phone": "555",
+            "date": start + timedelta(days=day), "time": time, "guests": 2, "status": "pending",
+        }
+        for day in range(days)
+        for time in times
+        for n in range(per_slot)
+    ])
+    db_session.commit()
+
+
+def test_reservations_cursor_pagination(client, db_session):
+    seed_reservations(db_session, days=3, times=["12:00", "19:30"])
+    expected = [
+        (r.date.isoformat(), r.time, r.id)
+        for r in db_session.query(Reservation).order_by(
+            Reservation.date.desc(), Reservation.time.desc(), Reservation.id.desc()
+        )
+    ]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 5, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/reservations/", params=params)
+        assert response.status_code == 200
+        seen.extend((r["date"], r["time"], r["id"]) for r in response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == expected
+    assert pages == 3
+
+
+def test_reservations_list_is_bounded(client, db_session):
+    seed_reservations(db_session, days=60, times=["18:00", "20:00"])
+    response = client.get("/api/reservations/")
+    assert len(response.json()) == 100
+    assert response.headers["X-Next-Cursor"]
+    assert client.get("/api/reservations/", params={"cursor": "bad"}).status_code == 400
+
+
+def day_grid(client, day, guests):
+    response = client.get(f"/api/reservations/availability/{day.isoformat()}", params={"guests": guests})
+    assert response.status_code == 200
+    return {slot["time"]: slot["remaining_tables"] for slot in response.json()["slots"]}
+
+
+def book(client, day, time, guests):
+    return client.post("/api/reservations/", json={
+        "name": "Sam", "email": "sam@test.com", "phone": "555", "date": day.isoformat(), "time": time, "guests": guests
+    }).json()
+
+
+def test_day_availability_respects_table_sizes_and_duration(client, db_session):
+    db_session.add_all([Table(number="1", capacity=2), Table(number="2", capacity=2), Table(number="3", capacity=6)])
+    db_session.commit()
+    day = date.today() + timedelta(days=2)
+    book(client, day, "19:00", 5)
+
+    large = day_grid(client, day, 5)
+    # The six-top is taken for 90 minutes from 19:00
+    assert (large["17:30"], large["18:00"], large["19:00"], large["20:00"], large["20:30"]) == (1, 0, 0, 0, 1)
+    small = day_grid(client, day, 2)
+    assert small["19:00"] == 2 and small["12:00"] == 3
+    assert set(day_grid(client, day, 8).values()) == {0}
+    assert list(large)[0] == "11:00" and list(large)[-1] == "21:30"
+
+
+def test_day_availability_updates_in_place(client, db_session, query_counter):
+    db_session.add_all([Table(number="1", capacity=4), Table(number="2", capacity=4)])
+    db_session.commit()
+    day = date.today() + timedelta(days=3)
+    assert day_grid(client, day, 4)["13:00"] == 2
+
+    first = book(client, day, "1:00 PM", 3)
+    book(client, day, "13:30", 2)
+    query_counter.clear()
+    grid = day_grid(client, day, 2)
+    assert (grid["12:00"], grid["13:00"], grid["14:00"], grid["15:00"]) == (1, 0, 0, 2)
+    assert not [q for q in query_counter if "FROM reservations" in q]  # served from the index
+
+    client.patch(f"/api/reservations/{first['id']}/status", json={"status": "cancelled"})
+    assert day_grid(client, day, 2)["13:00"] == 1
+    response = client.get(f"/api/reservations/check-availability/{day.isoformat()}/13:00", params={"guests": 4})
+    assert response.json()["available"] is True
+    assert response.json()["remaining_tables"] == 1
+
+
+def test_table_changes_refresh_capacities(client, db_session, admin_token):
+    db_session.add(Table(number="1", capacity=2))
+    db_session.commit()
+    day = date.today() + timedelta(days=1)
+    assert day_grid(client, day, 4)["19:00"] == 0
+
+    client.post("/api/tables/", json={"number": "2", "capacity": 4}, headers=auth_headers(admin_token))
+    assert day_grid(client, day, 4)["19:00"] == 1
+
+
+def test_availability_without_tables_keeps_the_flat_limit(client, db_session):
+    seed_reservations(db_session, days=1, times=["19:00"], per_slot=9)
+    day = date.today() + timedelta(days=1)
+    assert day_grid(client, day, 12)["19:00"] == 1
+    assert day_grid(client, day, 2)["21:00"] == 10
+    bad = client.get(f"/api/reservations/check-availability/{day.isoformat()}/dinner", params={"guests": 2})
+    assert bad.status_code == 400
+
+
+def test_party_size_is_bounded(client, db_session):
+    day = (date.today() + timedelta(days=1)).isoformat()
+    too_many = settings.RESERVATION_MAX_GUESTS + 1
+    assert client.get(f"/api/reservations/availability/{day}", params={"guests": too_many}).status_code == 422
+    response = client.get(f"/api/reservations/check-availability/{day}/19:00", params={"guests": too_many})
+    assert response.status_code == 422
+    response = client.post("/api/reservations/", json={
+        "name": "Crowd", "email": "c@test.com", "phone": "1", "date": day, "time": "19:00", "guests": too_many
+    })
+    assert response.status_code == 422
+
+
+def test_parse_time():
+    assert parse_time("19:30") == parse_time("7:30 PM") == 19 * 60 + 30
+    assert parse_time("12:00 AM") == 0 and parse_time("12:15 pm") == 12 * 60 + 15
+    assert parse_time("25:00") is None and parse_time("13:00 PM") is None and parse_time("") is None
@@ -0,0 +1,100 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from app.models import MenuItem, Order, OrderStatus
+from app.utils.stats_cache import StaleWhileRevalidateCache, stats_cache
+
+
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_restaurant_stats_in_one_query_and_cached(
+    client, db_session, admin_token, customer_user, sample_menu_item, query_counter
+):
+    db_session.add(MenuItem(name="Off menu", price=1.0, category_id=sample_menu_item.category_id, is_available=False))
+    for index, (order_status, amount) in enumerate([
+        (OrderStatus.PENDING, 5.0),
+        (OrderStatus.PENDING, 7.0),
+        (OrderStatus.DELIVERED, 20.0),
+        (OrderStatus.DELIVERED, 30.5),
+        (OrderStatus.CANCELLED, 99.0),
+    ]):
+        db_session.add(Order(
+            order_number=f"ORD-STATS-{index}", customer_id=customer_user.id, status=order_status, total_amount=amount
+        ))
+    db_session.commit()
+
+    client.get("/api/restaurant/stats", headers=auth_headers(admin_token))  # warm the principal cache
+    stats_cache.clear()
+    query_counter.clear()
+    response = client.get("/api/restaurant/stats", headers=auth_headers(admin_token))
+    assert response.status_code == 200
+    assert response.json() == {
+        "total_orders": 5,
+        "pending_orders": 2,
+        "completed_orders": 2,
+        "total_menu_items": 2,
+        "available_items": 1,
+        "total_revenue": 50.5,
+    }
+    assert len(query_counter) == 1
+    assert "FILTER (WHERE" in query_counter[0]
+
+    # Within the TTL the dashboard is served from memory
+    query_counter.clear()
+    assert client.get("/api/restaurant/stats", headers=auth_headers(admin_token)).json()["total_orders"] == 5
+    assert query_counter == []
+    assert stats_cache.hits == 1
+
+
+def test_restaurant_stats_admin_only(client, customer_token):
+    response = client.get("/api/restaurant/stats", headers=auth_headers(customer_token))
+    assert response.status_code == 403
+
+
+def test_stale_while_revalidate_cache():
+    sessions = []
+
+    @asynccontextmanager
+    async def session_scope():
+        sessions.append("own")
+        yield "own"
+
+    async def scenario():
+        cache = StaleWhileRevalidateCache(ttl_seconds=60, stale_seconds=60, session_scope=session_scope)
+        loads = []
+
+        async def load(db):
+            loads.append(db)
+            await asyncio.sleep(0.01)
+            return len(loads)
+
+        # Concurrent misses share one load, in a session of its own rather than a caller's
+        assert await asyncio.gather(*(cache.get("k", load) for _ in range(5))) == [1] * 5
+        assert loads == ["own"]
+        assert await cache.get("k", load) == 1
+        assert cache.hits == 1
+
+        # Past the TTL: the stale value is returned at once and one refresh runs in its own session
+        cache._values["k"] = (1, cache._values["k"][1] - 61)
+        assert await asyncio.gather(*(cache.get("k", load) for _ in range(3))) == [1, 1, 1]
+        await asyncio.sleep(0.05)
+        assert loads == ["own", "own"]
+        assert await cache.get("k", load) == 2
+
+        # A failing refresh keeps the stale value
+        async def broken(db):
+            raise RuntimeError("database down")
+
+        cache._values["k"] = (2, cache._values["k"][1] - 61)
+        assert await cache.get("k", broken) == 2
+        await asyncio.sleep(0.01)
+        assert cache._values["k"][0] == 2
+
+        # Past TTL + stale window the caller waits for a fresh value
+        cache._values["k"] = (2, cache._values["k"][1] - 500)
+        assert await cache.get("k", load) == 3
+        assert cache.misses == 6
+
+    asyncio.run(scenario())
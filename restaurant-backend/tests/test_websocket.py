@@ -0,0 +1,370 @@
+import asyncio
+import time
+from contextlib import ExitStack, asynccontextmanager
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from starlette.websockets import WebSocketDisconnect
+
+from main import app
+from app.database import Base, SyncSessionAdapter, get_session_scope
+from app.models import User
+from app.utils.auth import create_access_token
+from app.utils.principal_cache import principal_cache
+from app.websocket import COALESCE, DISCONNECT, DROP_OLDEST, SLOW_CONSUMER_CLOSE_CODE, ConnectionManager, manager
+
+
+class FakeSocket:
+    """Records what the manager writes; every send takes delay seconds and waits for gate."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.sent = []
+        self.received_at = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        await self.gate.wait()
+        await asyncio.sleep(self.delay)
+        self.sent.append(payload)
+        self.received_at.append(time.perf_counter())
+
+    async def close(self, code=1000, reason=None):
+        self.closed_with = code
+
+
+async def connected(manager, role="admin", **kwargs):
+    websocket = FakeSocket(**kwargs)
+    await manager.connect(websocket, role)
+    return websocket
+
+
+def test_broadcast_is_queued_per_connection_and_serialized_once():
+    async def scenario():
+        manager = ConnectionManager(send_timeout=1.0, max_timeouts=3)
+        slow = await connected(manager, delay=0.3)
+        fast = [await connected(manager) for _ in range(20)]
+        start = time.perf_counter()
+        await manager.broadcast_new_order({"type": "new_order", "order": {"id": 1}})
+        assert time.perf_counter() - start < 0.01  # the caller never waits on a socket
+        await manager.drain(timeout=0.1)
+        # Every fast socket got the message long before the slow one finished
+        assert max(socket.received_at[0] for socket in fast) - start < 0.1
+        assert slow.sent == []
+        await manager.drain()
+        assert slow.sent == [fast[0].sent[0]]
+        assert all(socket.sent[0] is fast[0].sent[0] for socket in fast)
+        assert fast[0].sent[0] == '{"type":"new_order","order":{"id":1}}'
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_is_evicted_after_consecutive_timeouts():
+    async def scenario():
+        manager = ConnectionManager(send_timeout=0.05, max_timeouts=2)
+        stalled = await connected(manager, delay=10)
+        healthy = await connected(manager)
+
+        await manager.broadcast_to_all({"n": 1})
+        await manager.drain(timeout=0.2)
+        assert stalled in manager.connections  # one timeout is tolerated
+        await manager.broadcast_to_all({"n": 2})
+        await manager.drain(timeout=0.2)
+        await asyncio.sleep(0)  # let the background close run
+
+        assert stalled not in manager.active_connections["all"]
+        assert stalled.closed_with == SLOW_CONSUMER_CLOSE_CODE
+        assert healthy.sent == ['{"n":1}', '{"n":2}']
+        stats = manager.stats()
+        assert stats["send_timeouts"] == 2
+        assert stats["evictions"] == 1
+        assert stats["connections"]["admin"] == 1
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_successful_send_resets_timeout_count():
+    async def scenario():
+        manager = ConnectionManager(send_timeout=0.05, max_timeouts=2)
+        flaky = await connected(manager, delay=10)
+        for n, delay in enumerate((10, 0, 10)):
+            flaky.delay = delay
+            await manager.broadcast_to_all({"n": n})
+            await manager.drain(timeout=0.2)
+        assert flaky in manager.connections
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_send_disconnects_with_registered_role():
+    async def scenario():
+        manager = ConnectionManager()
+        broken = await connected(manager, role="admin", fail=True)
+        await manager.broadcast_to_all({"n": 1})
+        await manager.drain(timeout=0.1)
+        assert broken not in manager.active_connections["admin"]
+        assert manager.stats()["send_errors"] == 1
+        manager.disconnect(broken, "admin")  # the socket's own handler may disconnect again
+
+    asyncio.run(scenario())
+
+
+def test_connect_checks_role_before_registering():
+    async def scenario():
+        manager = ConnectionManager()
+        staff = await connected(manager, role="staff")
+        assert staff in manager.active_connections["staff"]
+        with pytest.raises(ValueError):
+            await connected(manager, role="chef")
+        # Nothing left behind for the rejected socket: no entry, no writer task
+        assert len(manager.connections) == 1
+        assert len(asyncio.all_tasks()) == 2  # this scenario and the staff writer
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_order_update_reaches_subscribers_and_admins_once():
+    async def scenario():
+        manager = ConnectionManager()
+        admin = await connected(manager, role="admin")
+        customer = await connected(manager, role="customer")
+        other = await connected(manager, role="customer")
+        manager.subscribe_to_order(customer, 7)
+        manager.subscribe_to_order(admin, 7)
+        await manager.broadcast_order_update(7, {"type": "order_status_updated"})
+        await manager.drain(timeout=0.1)
+        assert len(admin.sent) == 1
+        assert len(customer.sent) == 1
+        assert other.sent == []
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_only_touches_the_sockets_own_subscriptions():
+    async def scenario():
+        manager = ConnectionManager()
+        leaving = await connected(manager, role="customer")
+        staying = await connected(manager, role="customer")
+        for order_id in range(1000):
+            manager.subscribe_to_order(staying, order_id)
+        manager.subscribe_to_order(leaving, 1)
+        manager.subscribe_to_order(leaving, 5000)
+
+        manager.disconnect(leaving)
+        assert manager.order_subscriptions[1] == {staying}
+        assert 5000 not in manager.order_subscriptions
+        assert len(manager.order_subscriptions) == 1000
+        assert manager.connections[staying].orders == set(range(1000))
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_final_update_is_delivered_then_subscriptions_released():
+    async def scenario():
+        manager = ConnectionManager()
+        customer = await connected(manager, role="customer")
+        manager.subscribe_to_order(customer, 7)
+        manager.subscribe_to_order(customer, 8)
+        await manager.broadcast_order_update(7, {"status": "delivered"}, final=True)
+        await manager.drain(timeout=0.1)
+        assert customer.sent == ['{"status":"delivered"}']
+        assert 7 not in manager.order_subscriptions
+        assert manager.connections[customer].orders == {8}
+
+        await manager.broadcast_order_update(7, {"status": "late echo"})
+        await manager.drain(timeout=0.1)
+        assert len(customer.sent) == 1
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+async def stalled_client(policy):
+    """A manager with a 3-message queue and a client whose first send is stuck in flight."""
+    manager = ConnectionManager(send_timeout=10, max_queue=3, policy=policy)
+    websocket = await connected(manager)
+    websocket.gate.clear()
+    await manager.broadcast_to_all({"n": 0})
+    await asyncio.sleep(0)  # the writer takes n=0 and blocks on it
+    return manager, websocket
+
+
+def test_drop_oldest_keeps_the_newest_messages():
+    async def scenario():
+        manager, websocket = await stalled_client(DROP_OLDEST)
+        for n in range(1, 6):
+            await manager.broadcast_to_all({"n": n})
+        stats = manager.stats()
+        assert stats["max_queue_depth"] == 3
+        assert stats["dropped"] == 2
+        websocket.gate.set()
+        await manager.drain(timeout=0.1)
+        assert websocket.sent == ['{"n":0}', '{"n":3}', '{"n":4}', '{"n":5}']
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_coalesce_replaces_queued_updates_for_the_same_order():
+    async def scenario():
+        manager, websocket = await stalled_client(COALESCE)
+        for status in ("confirmed", "preparing", "ready"):
+            await manager.broadcast_order_update(1, {"order": 1, "status": status})
+        await manager.broadcast_order_update(2, {"order": 2, "status": "confirmed"})
+        assert manager.stats()["queued_messages"] == 2
+        assert manager.stats()["coalesced"] == 2
+        websocket.gate.set()
+        await manager.drain(timeout=0.1)
+        assert websocket.sent[1:] == ['{"order":1,"status":"ready"}', '{"order":2,"status":"confirmed"}']
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_coalesce_falls_back_to_dropping_the_oldest():
+    async def scenario():
+        manager, websocket = await stalled_client(COALESCE)
+        for order_id in range(1, 6):
+            await manager.broadcast_order_update(order_id, {"order": order_id})
+        assert manager.stats()["dropped"] == 2
+        # A dropped entry no longer absorbs updates for its order
+        await manager.broadcast_order_update(1, {"order": 1, "again": True})
+        websocket.gate.set()
+        await manager.drain(timeout=0.1)
+        assert websocket.sent[1:] == ['{"order":4}', '{"order":5}', '{"order":1,"again":true}']
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_policy_evicts_on_overflow():
+    async def scenario():
+        manager, websocket = await stalled_client(DISCONNECT)
+        for n in range(1, 5):
+            await manager.broadcast_to_all({"n": n})
+        await asyncio.sleep(0.01)  # let the background close run
+        assert websocket not in manager.connections
+        assert websocket.closed_with == SLOW_CONSUMER_CLOSE_CODE
+        assert manager.stats()["evictions"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_unknown_queue_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ConnectionManager(policy="block")
+
+
+def test_websocket_metrics_are_admin_only(client, admin_token, customer_token):
+    response = client.get("/api/restaurant/metrics/websocket", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert {"queue_policy", "queued_messages", "dropped", "coalesced", "evictions"} <= response.json().keys()
+
+    response = client.get("/api/restaurant/metrics/websocket", headers={"Authorization": f"Bearer {customer_token}"})
+    assert response.status_code == 403
+
+
+def test_admin_socket_receives_new_order(client, admin_token, customer_token, sample_menu_item):
+    with client.websocket_connect(f"/api/ws/ws?token={admin_token}") as websocket:
+        assert websocket.receive_json()["type"] == "connection_established"
+        response = client.post(
+            "/api/orders",
+            json={"items": [{"menu_item_id": sample_menu_item.id, "quantity": 1}]},
+            headers={"Authorization": f"Bearer {customer_token}"},
+        )
+        assert response.status_code == 201
+        message = websocket.receive_json()
+        assert message["type"] == "new_order"
+        assert message["order"]["id"] == response.json()["id"]
+
+
+def test_cancelling_an_order_notifies_and_releases_subscribers(client, customer_token, sample_menu_item):
+    headers = {"Authorization": f"Bearer {customer_token}"}
+    order_id = client.post(
+        "/api/orders", json={"items": [{"menu_item_id": sample_menu_item.id, "quantity": 1}]}, headers=headers
+    ).json()["id"]
+    with client.websocket_connect(f"/api/ws/ws?token={customer_token}") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "subscribe_order", "order_id": order_id})
+        assert websocket.receive_json()["type"] == "subscribed"
+        assert order_id in manager.order_subscriptions
+
+        assert client.delete(f"/api/orders/{order_id}", headers=headers).status_code == 204
+        message = websocket.receive_json()
+        assert message["order"] == {**message["order"], "id": order_id, "status": "cancelled"}
+        assert order_id not in manager.order_subscriptions
+
+
+@pytest.fixture
+def pooled_sessions(client, tmp_path):
+    """Point WebSocket auth at a file database behind a real connection pool; yield the engine."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'ws.db'}", pool_size=5, max_overflow=0, pool_timeout=1)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        session.add_all(
+            User(email=f"guest{i}@test.com", username=f"guest{i}", hashed_password="x", role="customer", is_active=True)
+            for i in range(30)
+        )
+        session.commit()
+
+    @asynccontextmanager
+    async def session_scope():
+        db = SyncSessionAdapter(Session())
+        try:
+            yield db
+        finally:
+            await db.close()
+
+    app.dependency_overrides[get_session_scope] = lambda: session_scope
+    yield engine
+    engine.dispose()
+
+
+def test_open_sockets_hold_no_db_connections(client, pooled_sessions):
+    checkouts = []
+    event.listen(pooled_sessions, "checkout", lambda *args: checkouts.append(1))
+    tokens = [create_access_token({"sub": f"guest{i}@test.com"}) for i in range(30)]
+
+    # More sockets than the pool has connections
+    with ExitStack() as stack:
+        for token in tokens:
+            websocket = stack.enter_context(client.websocket_connect(f"/api/ws/ws?token={token}"))
+            assert websocket.receive_json()["type"] == "connection_established"
+        assert pooled_sessions.pool.checkedout() == 0
+        assert len(checkouts) == 30
+        assert len(manager.connections) == 30
+
+    # Reconnects are served from the principal cache without touching the pool
+    principal_cache.hits = 0
+    with client.websocket_connect(f"/api/ws/ws?token={tokens[0]}") as websocket:
+        assert websocket.receive_json()["user"]["username"] == "guest0"
+    assert len(checkouts) == 30
+    assert principal_cache.hits == 1
+
+
+def test_websocket_rejects_invalid_and_inactive_users(client, pooled_sessions):
+    with pooled_sessions.begin() as connection:
+        connection.exec_driver_sql("UPDATE users SET is_active = 0 WHERE username = 'guest1'")
+    for token in ("not-a-jwt", create_access_token({"sub": "nobody@test.com"}),
+                  create_access_token({"sub": "guest1@test.com"})):
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect(f"/api/ws/ws?token={token}") as websocket:
+                websocket.receive_json()
+        assert closed.value.code == 1008
+    assert pooled_sessions.pool.checkedout() == 0
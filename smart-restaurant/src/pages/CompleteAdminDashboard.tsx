@@ -9,6 +9,7 @@ import {
 import { useNavigate } from 'react-router-dom';
 import { API_BASE_URL } from '../config/api';
 import axios from 'axios';
+import { fetchAllPages } from '../services/pagination';
 import {
   BarChart,
   Bar,
@@ -72,9 +73,10 @@ const CompleteAdminDashboard: React.FC = () => {
       });
 
       // Fetch reservations
-      const reservationsRes = await axios.get(`${API_BASE_URL}/api/reservations/`, {
+      // Paged by the API; follow the cursor so the counts cover every booking
+      const reservations = await fetchAllPages<any>(`${API_BASE_URL}/api/reservations/`, {
         headers: { Authorization: `Bearer ${token}` }
-      });
+      }, 500);
 
       // Fetch Analytics
       try {
@@ -104,7 +106,6 @@ const CompleteAdminDashboard: React.FC = () => {
       }
 
       const orders = ordersRes.data || [];
-      const reservations = reservationsRes.data || [];
 
       // Calculate stats
       const totalOrders = orders.length;
@@ -1,8 +1,8 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { API_BASE_URL } from '../config/api';
-import axios from 'axios';
 import LiveOrderTimer from '../components/LiveOrderTimer';
+import { fetchAllPages } from '../services/pagination';
 
 interface OrderItem {
   menu_item_id: number;
@@ -47,19 +47,13 @@ const MyOrders: React.FC = () => {
         return;
       }
 
-      const response = await axios.get(`${API_BASE_URL}/api/orders/my-orders`, {
+      // The endpoint pages its results; follow the cursor to get the full history
+      const allOrders = await fetchAllPages<Order>(`${API_BASE_URL}/api/orders/my-orders`, {
         headers: { Authorization: `Bearer ${token}` }
       });
 
-      console.log('Orders response:', response.data);
-
-      // Check if response is an array
-      if (Array.isArray(response.data)) {
-        setOrders(response.data);
-      } else {
-        console.error('Expected array, got:', response.data);
-        setError('Invalid response format from server');
-      }
+      console.log('Orders response:', allOrders);
+      setOrders(allOrders);
 
       setError(null);
     } catch (err: any) {
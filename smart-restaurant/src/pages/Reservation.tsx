@@ -56,6 +56,13 @@ const Reservation: React.FC = () => {
     '8:00 PM', '8:30 PM', '9:00 PM', '9:30 PM'
   ];
 
+  // "19:00" -> "7:00 PM", the labels used by timeSlots
+  const toDisplayTime = (time: string) => {
+    const [hours, minutes] = time.split(':').map(Number);
+    const suffix = hours >= 12 ? 'PM' : 'AM';
+    return `${hours % 12 || 12}:${String(minutes).padStart(2, '0')} ${suffix}`;
+  };
+
   const validateForm = () => {
     const errors: ValidationErrors = {};
     const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
@@ -102,16 +109,29 @@ const Reservation: React.FC = () => {
     if (!formData.date || !formData.guests) return;
 
     setIsCheckingAvailability(true);
-    // Simulate API call to check table availability
-    setTimeout(() => {
-      const availability = timeSlots.map(time => ({
+    try {
+      // One request for the whole day; slots come back as 24-hour "HH:MM"
+      const response = await fetch(
+        `${API_BASE_URL}/api/reservations/availability/${formData.date}?guests=${formData.guests}`
+      );
+      const data = await response.json();
+      const byTime = new Map<string, { available: boolean; remaining_tables: number }>(
+        (data.slots || []).map((slot: { time: string; available: boolean; remaining_tables: number }) => [
+          toDisplayTime(slot.time),
+          slot,
+        ])
+      );
+      setTableAvailability(timeSlots.map(time => ({
         time,
-        available: Math.random() > 0.3,
-        remainingTables: Math.floor(Math.random() * 5) + 1
-      }));
-      setTableAvailability(availability);
+        available: byTime.get(time)?.available ?? false,
+        remainingTables: byTime.get(time)?.remaining_tables ?? 0
+      })));
+    } catch (error) {
+      console.error("❌ Failed to load availability:", error);
+      setTableAvailability([]);
+    } finally {
       setIsCheckingAvailability(false);
-    }, 1000);
+    }
   };
 
   useEffect(() => {
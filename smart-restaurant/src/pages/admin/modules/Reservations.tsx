@@ -1,6 +1,7 @@
 import { API_BASE_URL } from "../../../config/api";
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { fetchAllPages } from '../../../services/pagination';
 
 interface Reservation {
   id: number;
@@ -29,10 +30,11 @@ const Reservations: React.FC = () => {
     try {
       setLoading(true);
       const token = localStorage.getItem('token');
-      const response = await axios.get(`${API_BASE_URL}/api/reservations/`, {
+      // The list is paged; follow the cursor so older bookings are not cut off
+      const allReservations = await fetchAllPages<Reservation>(`${API_BASE_URL}/api/reservations/`, {
         headers: { Authorization: `Bearer ${token}` }
-      });
-      setReservations(response.data);
+      }, 500);
+      setReservations(allReservations);
       setError(null);
     } catch (err: any) {
       setError(err.message || 'Failed to fetch reservations');
@@ -0,0 +1,28 @@
+// src/services/pagination.ts
+import axios, { AxiosRequestConfig } from 'axios';
+
+/**
+ * Fetch every row of a cursor-paginated listing.
+ * The backend returns one page at a time and puts the cursor of the next
+ * page in the X-Next-Cursor header; follow it until it is absent.
+ */
+export const fetchAllPages = async <T>(
+  url: string,
+  config: AxiosRequestConfig = {},
+  pageSize = 100
+): Promise<T[]> => {
+  const rows: T[] = [];
+  let cursor: string | undefined;
+  do {
+    const response = await axios.get<T[]>(url, {
+      ...config,
+      params: { ...config.params, limit: pageSize, cursor },
+    });
+    if (!Array.isArray(response.data)) {
+      throw new Error('Invalid response format from server');
+    }
+    rows.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return rows;
+};